@@ -0,0 +1,59 @@
+"""
+Times each Fig. 1 panel, and populations of 1 to 10^6 cells, under each
+available simulator, and writes the results to a JSON report (see
+izhikevich/benchmark.py) that can be compared across releases.
+
+For every case, the report gives the wall-clock time of the setup, build, run
+and get_data phases, the total, and the peak memory use of the process.
+
+Usage:
+
+	python benchmark.py [<simulator> ...] [--panels A B ... | --no-panels] [--sizes N ...]
+	                    [--duration MS] [--spikes-only] [--output FILE]
+
+"""
+
+import argparse
+
+from izhikevich.benchmark import (available_simulators, benchmark_cases, run_benchmarks, write_report,
+	SIMULATORS, SIZES, PHASES)
+from izhikevich.panels import TIMESTEP
+
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("simulators", nargs="*", metavar="simulator", default=list(SIMULATORS),
+					help="simulators to benchmark, if available (default: %s)" % " ".join(SIMULATORS))
+parser.add_argument("--panels", nargs="+", metavar="LABEL", help="only these panels (default: A to T)")
+parser.add_argument("--no-panels", action="store_true", help="only benchmark populations")
+parser.add_argument("--sizes", nargs="*", type=int, default=list(SIZES), metavar="N",
+					help="population sizes, none to only benchmark panels (default: %s)" % " ".join(map(str, SIZES)))
+parser.add_argument("--duration", type=float, default=100.0, help="simulated time of the populations (ms)")
+parser.add_argument("--timestep", type=float, default=TIMESTEP)
+parser.add_argument("--spikes-only", action="store_true", help="record only spikes in the panels too")
+parser.add_argument("--output", default="benchmark.json", metavar="FILE", help="report file (default: %(default)s)")
+args = parser.parse_args()
+
+simulators = available_simulators(args.simulators)
+missing = [name for name in args.simulators if name not in simulators]
+if missing:
+	print("Not available, skipped: %s" % ", ".join(missing))
+
+cases = benchmark_cases(simulators, args.panels, args.sizes, args.duration, args.timestep,
+	'spikes' if args.spikes_only else 'v')
+if args.no_panels:
+	cases = [case for case in cases if case['case'] != 'panel']
+
+
+def progress(record):
+	name = "panel %s" % record['panel'] if record['case'] == 'panel' else "%d cells" % record['size']
+	if 'error' in record:
+		print("%-8s %-12s failed: %s" % (record['simulator'], name, record['error']))
+		return
+	phases = "  ".join("%s %.3f" % (phase, record[phase]) for phase in PHASES)
+	print("%-8s %-12s %s  total %.3f s  peak %.0f MB" % (record['simulator'], name, phases,
+		record['total'], record['peak_memory'] / 1024.0 ** 2))
+
+
+report = run_benchmarks(cases, progress)
+write_report(report, args.output)
+print("Report written to %s" % args.output)
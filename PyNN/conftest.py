@@ -0,0 +1,2 @@
+# test_Izhikevich.py and test_IF_cond_exp.py are demonstration scripts, not tests
+collect_ignore = ['test_Izhikevich.py', 'test_IF_cond_exp.py']
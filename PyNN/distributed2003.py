@@ -0,0 +1,65 @@
+"""
+Strong and weak scaling of the distributed simulation of the random network of
+Izhikevich (2003) (see izhikevich/distributed.py).
+
+Usage:
+
+	python distributed2003.py [--ranks R ...] [--size N] [--weak] [--duration MS] [--fanin K]
+	                          [--timestep MS] [--min-delay MS] [--seed S] [--output FILE]
+
+	mpirun -n R python distributed2003.py [--size N] ...
+
+Without MPI, the network is simulated on each number of --ranks in turn, by
+processes of this machine: with --size cells in all (strong scaling), or with
+--weak, --size cells per rank (weak scaling). For strong scaling, the spikes
+and final state are checked to be identical whatever the number of ranks.
+
+Under mpirun (with mpi4py installed), the network is simulated once, on the
+ranks started by mpirun.
+"""
+
+import argparse
+
+from izhikevich.benchmark import write_report
+from izhikevich.distributed import benchmark_scaling, mpi_communicator, simulate, DEFAULT_FANIN, MIN_DELAY
+from izhikevich.network import TIMESTEP
+
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--ranks", nargs="+", type=int, default=[1, 2, 4], metavar="R",
+					help="numbers of processes (default: 1 2 4)")
+parser.add_argument("--size", type=int, default=100000, help="number of cells, or per rank with --weak")
+parser.add_argument("--weak", action="store_true", help="weak rather than strong scaling")
+parser.add_argument("--duration", type=float, default=1000.0, help="simulated time (ms)")
+parser.add_argument("--fanin", type=int, default=DEFAULT_FANIN, help="synapses onto each cell (default: %(default)s)")
+parser.add_argument("--timestep", type=float, default=TIMESTEP)
+parser.add_argument("--min-delay", type=float, default=MIN_DELAY,
+					help="interval between spike exchanges (ms, default: %(default)s)")
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--output", metavar="FILE", help="write the results to FILE as JSON")
+args = parser.parse_args()
+
+
+def progress(record):
+	print("%3d ranks  %9d cells  build %7.2f s  run %8.2f s  %9.1f steps/s  speedup %5.2f  efficiency %4.0f%%  %s" % (
+		record['ranks'], record['size'], record['build'], record['wall'], record['steps_per_second'],
+		record['speedup'], 100 * record['efficiency'], record['digest'][:16]))
+
+
+communicator = mpi_communicator()
+if communicator is not None and communicator.size > 1:
+	record = simulate(communicator, args.size * communicator.size if args.weak else args.size, args.duration,
+					  args.fanin, args.timestep, args.min_delay, args.seed)
+	records = [record] if communicator.rank == 0 else []
+	for record in records:
+		record['speedup'] = record['efficiency'] = 1.0
+		progress(record)
+else:
+	records = benchmark_scaling(args.ranks, args.size, args.duration, args.weak, args.fanin, args.timestep,
+								args.min_delay, args.seed, progress)
+	if not args.weak and not all(record['identical'] for record in records):
+		print("Warning: the results depend on the number of ranks")
+
+if args.output and records:
+	write_report({'scaling': 'weak' if args.weak else 'strong', 'results': records}, args.output)
+	print("Results written to %s" % args.output)
@@ -0,0 +1,143 @@
+"""
+Reproduces Fig. 1 of Izhikevich (2004) like izhikevich2004.py, but either
+
+	- simulates the 20 sub-plots as a single 20-cell Population in one run
+	  instead of 20 separate setup()/create()/run() cycles (the default), or
+	- with --processes, simulates each sub-plot in its own worker process,
+	  running up to that many at a time.
+
+One figure is drawn per simulator given. With --spikes-only, only spike times
+are recorded (and drawn) instead of v at every time step.
+
+Results are cached on disk (see izhikevich/cache.py), so that a panel is only
+simulated again when its parameters, stimulus, time step or simulator change.
+Use --no-cache to always simulate, and --clear-cache to empty the cache first.
+
+With --output, the figure is drawn off-screen once all panels are simulated and
+saved to a PNG or SVG file instead of being shown, so that the script can run
+unattended (e.g. --output fig1.png; with several simulators, fig1_nest.png,
+fig1_neuron.png, ...).
+
+With --profile PREFIX, the wall and CPU time and the memory used by each phase
+(cache lookup, setup, build, run, get_data, plotting) are written to
+PREFIX.json, PREFIX.csv and PREFIX.folded (see izhikevich/profiling.py).
+
+Usage:
+
+	python figure1.py <simulator> [<simulator> ...] [--panels A B ...] [--processes N] [--spikes-only]
+	                 [--cache-dir DIR] [--no-cache] [--clear-cache] [--output FILE]
+	                 [--profile PREFIX]
+
+"""
+
+import argparse
+import os
+
+import matplotlib.pyplot as plt
+
+from izhikevich import get_simulator
+from izhikevich.cache import ResultCache, DEFAULT_DIRECTORY
+from izhikevich.panels import get_panels, run_batched, TIMESTEP
+from izhikevich.parallel import run_panels_parallel
+from izhikevich.plotting import plot_figure, save_figure, use_offscreen_backend, FIGURE_SIZE
+from izhikevich.profiling import Profiler
+
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("simulators", nargs="+", metavar="simulator",
+					help="neuron, nest, brian or another PyNN backend, or numpy")
+parser.add_argument("--panels", nargs="+", metavar="LABEL", help="only simulate these panels (default: A to T)")
+parser.add_argument("--processes", type=int, default=None, metavar="N",
+					help="run each panel in a separate process, N at a time (0: one per CPU)")
+parser.add_argument("--spikes-only", action="store_true", help="record spike times only")
+parser.add_argument("--timestep", type=float, default=TIMESTEP)
+parser.add_argument("--cache-dir", default=DEFAULT_DIRECTORY, metavar="DIR", help="result cache (default: %(default)s)")
+parser.add_argument("--no-cache", action="store_true", help="neither read nor write cached results")
+parser.add_argument("--clear-cache", action="store_true", help="delete all cached results before running")
+parser.add_argument("--output", metavar="FILE", help="save the figure to FILE (.png, .svg, ...) instead of showing it")
+parser.add_argument("--profile", metavar="PREFIX", help="save the time spent in each phase to PREFIX.json/.csv/.folded")
+args = parser.parse_args()
+
+profiler = Profiler()
+
+if args.output:
+	use_offscreen_backend()
+
+panels = get_panels(args.panels)
+variable = 'spikes' if args.spikes_only else 'v'
+
+cache = None if args.no_cache else ResultCache(args.cache_dir)
+if args.clear_cache:
+	ResultCache(args.cache_dir).invalidate()
+
+# panels found in the cache are not simulated again
+profiler.begin('cache')
+all_results = dict((simulator_name, {}) for simulator_name in args.simulators)
+missing = dict((simulator_name, []) for simulator_name in args.simulators)
+for simulator_name in args.simulators:
+	for panel in panels:
+		result = None
+		if cache is not None:
+			result = cache.get_panel(simulator_name, panel, args.timestep, variable)
+		if result is None:
+			missing[simulator_name].append(panel)
+		else:
+			all_results[simulator_name][panel['label']] = result
+	if len(missing[simulator_name]) < len(panels):
+		print("%s: %d panel(s) loaded from %s" % (simulator_name, len(panels) - len(missing[simulator_name]), args.cache_dir))
+profiler.end()
+
+if args.processes is not None:
+	if any(missing.values()):
+		print("Starting PyNN with simulator(s): %s, in %s processes" % (", ".join(args.simulators), args.processes or "one per CPU"))
+	with profiler.phase('pool'):
+		new_results = run_panels_parallel(args.simulators, missing, processes=args.processes or None,
+			timestep=args.timestep, variable=variable)
+else:
+	new_results = {}
+	for simulator_name in args.simulators:
+		new_results[simulator_name] = {}
+		if missing[simulator_name]:
+			print("Starting PyNN with simulator: %s" % simulator_name)
+			with profiler.phase(simulator_name):
+				new_results[simulator_name] = run_batched(get_simulator(simulator_name), missing[simulator_name],
+					timestep=args.timestep, variable=variable, phases=profiler)
+
+for simulator_name in args.simulators:
+	for panel in missing[simulator_name]:
+		result = new_results[simulator_name][panel['label']]
+		if cache is not None:
+			cache.put_panel(simulator_name, panel, args.timestep, variable, result)
+		all_results[simulator_name][panel['label']] = result
+
+profiler.begin('plotting')
+if args.output:
+	root, extension = os.path.splitext(args.output)
+	for simulator_name in args.simulators:
+		fig = plt.figure(facecolor='white', figsize=FIGURE_SIZE)
+		filename = args.output
+		if len(args.simulators) > 1:
+			fig.suptitle(simulator_name)
+			filename = "%s_%s%s" % (root, simulator_name, extension)
+		plot_figure(panels, all_results[simulator_name], fig, variable)
+		save_figure(fig, filename)
+		plt.close(fig)
+		print("Figure saved to %s" % filename)
+	profiler.end()
+else:
+	plt.ion()
+	for number, simulator_name in enumerate(args.simulators):
+		fig = plt.figure(number + 1, facecolor='white')
+		if len(args.simulators) > 1:
+			fig.suptitle(simulator_name)
+		plot_figure(panels, all_results[simulator_name], fig, variable)
+		plt.show(block=False)
+		fig.canvas.draw()
+	profiler.end()
+
+if args.profile:
+	profiler.write(args.profile)
+	print(profiler.summary())
+
+if not args.output:
+	raw_input("Simulation finished... Press enter to exit...")
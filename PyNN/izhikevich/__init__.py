@@ -0,0 +1,54 @@
+"""
+Helpers shared by the PyNN scripts in this directory for reproducing Fig. 1 of
+Izhikevich (2004), "Which Model to Use for Cortical Spiking Neurons?".
+
+	panels		parameter sets and stimulus schedules of the 20 sub-plots (A-T),
+			and a batched runner simulating all of them as one Population
+	plotting	drawing of the 5x4 figure
+	decimate	min/max envelopes of traces for display and export, also
+			built incrementally from streamed chunks
+	numpysim	a pure NumPy simulator backend with the PyNN API used by the
+			scripts, built on the vectorized engine in engine.py
+	sources		current sources, including compact ramps
+	parallel	simulation of independent panels in worker processes
+	synapses	CSR connectivity and delayed spike delivery through ring buffers
+	network		the 80/20 random network of Izhikevich (2003) at any size
+	distributed	the same network split over processes (MPI or local), exchanging
+			spikes every min_delay, with results independent of their number
+	threshold	batched search of rheobase, pulse and bistability thresholds
+	fi		F-I curves of thousands of amplitudes in one run, refined near
+			the onset of firing and cached
+	fitting		fitting of a, b, c, d to target spike trains, each generation of
+			the optimizer (differential evolution or CMA-ES) simulated as
+			one population
+	sweep		parallel sweeps over a, b, c, d and i_offset with spike statistics
+	checkpoint	saving and restoring the complete state of a simulation, to
+			continue interrupted runs
+	cache		on-disk cache of simulation results, keyed by a hash of their inputs
+	benchmark	timing and peak memory of the panels and of large populations,
+			per simulator and per phase
+	precision	accuracy of float32 simulation against float64 for the 20
+			panels, and its speedup
+	profiling	opt-in wall/CPU time and memory per phase, with JSON, CSV and
+			flame graph (folded stacks) output
+	lems		compilation of LEMS/NeuroML2 models (NeuroML2/LEMS_WhichModel.xml)
+			into NumPy kernels, run in-process
+
+"""
+
+import importlib
+
+
+# Simulators implemented in this package rather than in PyNN, by script argument
+NATIVE_BACKENDS = {
+	'numpy': 'izhikevich.numpysim',
+}
+
+
+def backend_module(simulator_name):
+	"""Name of the module providing the PyNN API for `simulator_name` (e.g. 'nest', 'numpy')."""
+	return NATIVE_BACKENDS.get(simulator_name, "pyNN.%s" % simulator_name)
+
+
+def get_simulator(simulator_name):
+	return importlib.import_module(backend_module(simulator_name))
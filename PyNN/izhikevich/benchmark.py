@@ -0,0 +1,209 @@
+"""
+Benchmarks of the Fig. 1 panels and of population sizes, per simulator.
+
+Every case is run in a fresh worker process, one at a time, so that cases do
+not share simulator state and the peak memory use of the process (resident set
+size) is that of the case alone. The time spent in each phase of a case
+(setup, build, run and get_data, see panels.run_panel) is recorded.
+
+	panel		one Fig. 1 panel simulated on its own with panels.run_panel()
+	population	`size` cells of the 17 panels without ramps, one after another
+			repeatedly, simulated as one Population with their i_offset
+			schedules for `duration` ms (see run_population())
+
+run_benchmarks() returns a report (a dict) that write_report() saves as JSON.
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from timeit import default_timer
+
+import numpy as np
+
+from izhikevich import get_simulator
+from izhikevich.panels import PANELS, TIMESTEP, get_panels, i_offset_at, run_panel
+
+
+SIMULATORS = ('nest', 'neuron', 'brian', 'numpy')
+SIZES = (1, 10, 100, 1000, 10000, 100000, 1000000)
+PHASES = ('setup', 'build', 'run', 'get_data')
+
+
+class PhaseTimer(object):
+	"""Wall-clock time spent in each named phase, summed over repeated phases."""
+
+	def __init__(self):
+		self.times = dict((name, 0.0) for name in PHASES)
+
+	@contextmanager
+	def phase(self, name):
+		start = default_timer()
+		try:
+			yield
+		finally:
+			self.times[name] = self.times.get(name, 0.0) + default_timer() - start
+
+
+def peak_memory():
+	"""Largest resident set size of this process so far, in bytes."""
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == 'darwin':
+		return peak
+	return peak * 1024
+
+
+def run_population(sim, size, duration, timestep=TIMESTEP, variable='spikes', phases=None, **setup_options):
+	"""
+	Simulate `size` cells of the Fig. 1 panels without ramps, taken in turn, as
+	one Population for `duration` ms. Each cell follows its panel's i_offset
+	schedule. Returns the number of spikes. `setup_options` are passed on to
+	sim.setup().
+	"""
+	panels = [panel for panel in PANELS if not panel['ramps']]
+	kinds = np.arange(size) % len(panels)
+	phases = phases or PhaseTimer()
+
+	with phases.phase('setup'):
+		sim.setup(timestep=timestep, min_delay=0.5, **setup_options)
+
+	with phases.phase('build'):
+		neuronParameters = dict(
+			(name, np.array([panel['parameters'][name] for panel in panels])[kinds])
+			for name in ('a', 'b', 'c', 'd', 'i_offset'))
+		initialValues = dict(
+			(name, np.array([panel['initial_values'][name] for panel in panels])[kinds])
+			for name in ('u', 'v'))
+		population = sim.Population(size, sim.Izhikevich(**neuronParameters), label="benchmark")
+		population.initialize(**initialValues)
+		population.record(variable)
+
+	with phases.phase('run'):
+		change_times = sorted(set(time for panel in panels for time, amplitude in panel['steps']))
+		for time in change_times:
+			if time >= duration:
+				break
+			sim.run_until(time)
+			population.set(i_offset=np.array([i_offset_at(panel, time) for panel in panels])[kinds])
+		sim.run_until(duration)
+
+	with phases.phase('get_data'):
+		data = population.get_data().segments[0]
+		n_spikes = sum(len(spiketrain) for spiketrain in data.spiketrains)
+	sim.end()
+	return n_spikes
+
+
+def _run_case(case):
+	"""
+	Run one case and return its record. A case that fails, e.g. for lack of
+	memory or of a cell type in the simulator, is recorded with its 'error'
+	and the time of the phases it got through, so that the other cases still run.
+	"""
+	record = dict(case)
+	try:
+		sim = get_simulator(case['simulator'])
+	except ImportError as error:
+		record['error'] = str(error)
+		return record
+
+	phases = PhaseTimer()
+	start = default_timer()
+	try:
+		if case['case'] == 'panel':
+			panel = get_panels([case['panel']])[0]
+			result = run_panel(sim, panel, case['timestep'], case['variable'], phases=phases)
+			if case['variable'] == 'spikes':
+				record['n_spikes'] = len(result)
+		else:
+			record['n_spikes'] = run_population(sim, case['size'], case['duration'], case['timestep'],
+				case['variable'], phases=phases)
+	except Exception as error:
+		record['error'] = "%s: %s" % (type(error).__name__, error)
+	record['total'] = default_timer() - start
+	record.update(phases.times)
+	record['peak_memory'] = peak_memory()
+	return record
+
+
+def _simulator_available(simulator_name):
+	try:
+		get_simulator(simulator_name)
+	except ImportError:
+		return False
+	return True
+
+
+def available_simulators(simulator_names=SIMULATORS):
+	"""Those of `simulator_names` that can be imported, each checked in a separate process."""
+	pool = multiprocessing.Pool(1, maxtasksperchild=1)
+	try:
+		available = pool.map(_simulator_available, simulator_names, chunksize=1)
+	finally:
+		pool.close()
+		pool.join()
+	return [name for name, ok in zip(simulator_names, available) if ok]
+
+
+def benchmark_cases(simulator_names, panel_labels=None, sizes=SIZES, duration=100.0,
+		timestep=TIMESTEP, variable='v', population_variable='spikes'):
+	cases = []
+	for simulator_name in simulator_names:
+		for panel in get_panels(panel_labels):
+			cases.append({'simulator': simulator_name, 'case': 'panel', 'panel': panel['label'],
+				'duration': panel['duration'], 'timestep': timestep, 'variable': variable})
+		for size in sizes:
+			cases.append({'simulator': simulator_name, 'case': 'population', 'size': size,
+				'duration': duration, 'timestep': timestep, 'variable': population_variable})
+	return cases
+
+
+def _versions():
+	versions = {'python': platform.python_version(), 'numpy': np.__version__}
+	try:
+		versions['pyNN'] = importlib.import_module('pyNN').__version__
+	except ImportError:
+		pass
+	return versions
+
+
+def run_benchmarks(cases, progress=None):
+	"""
+	Run every case in `cases` (see benchmark_cases()) in its own process, one
+	after another, calling progress(record) after each if given.
+	"""
+	pool = multiprocessing.Pool(1, maxtasksperchild=1)
+	records = []
+	try:
+		for record in pool.imap(_run_case, cases, chunksize=1):
+			records.append(record)
+			if progress is not None:
+				progress(record)
+	finally:
+		pool.close()
+		pool.join()
+	return {
+		'date': time.strftime("%Y-%m-%dT%H:%M:%S"),
+		'machine': {
+			'platform': platform.platform(),
+			'processor': platform.processor(),
+			'cpu_count': multiprocessing.cpu_count(),
+		},
+		'versions': _versions(),
+		'phases': list(PHASES),
+		'results': records,
+	}
+
+
+def write_report(report, filename):
+	directory = os.path.dirname(filename)
+	if directory and not os.path.isdir(directory):
+		os.makedirs(directory)
+	with open(filename, 'w') as f:
+		json.dump(report, f, indent=1, sort_keys=True)
@@ -0,0 +1,181 @@
+"""
+Persistent, content-addressed cache of simulation results.
+
+Results are stored as .npz files named after a hash of everything that
+determines them: for a Fig. 1 panel, its cell parameters, initial values,
+stimulus schedule and duration, the time step, the recorded variable and the
+simulator name. The cache is bounded in size; when it grows beyond max_bytes,
+the least recently used entries are deleted.
+
+	python -m izhikevich.cache info  [--dir DIR]
+	python -m izhikevich.cache clear [--dir DIR]
+
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+# Part of every key, so that changing how results are produced or stored invalidates old entries
+FORMAT_VERSION = 1
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "izhikevich")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# age (s) after which a temporary file is taken to be left by a failed write, not one in progress
+STALE_SECONDS = 3600
+
+
+def hash_key(description):
+	"""Key of the result determined by `description`, a JSON-serializable structure."""
+	text = json.dumps({'version': FORMAT_VERSION, 'description': description}, sort_keys=True)
+	return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def panel_key(simulator_name, panel, timestep, variable='v'):
+	return hash_key({
+		'simulator': simulator_name,
+		'timestep': timestep,
+		'variable': variable,
+		'parameters': panel['parameters'],
+		'initial_values': panel['initial_values'],
+		'generalized_parameters': panel['generalized_parameters'],
+		'generalized_initial_values': panel['generalized_initial_values'],
+		'steps': panel['steps'],
+		'ramps': panel['ramps'],
+		'duration': panel['duration'],
+	})
+
+
+class ResultCache(object):
+
+	def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+		self.directory = directory
+		self.max_bytes = max_bytes
+
+	def _path(self, key):
+		return os.path.join(self.directory, key + ".npz")
+
+	def _entries(self):
+		if not os.path.isdir(self.directory):
+			return []
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.endswith(".npz"):
+				path = os.path.join(self.directory, name)
+				try:
+					stat = os.stat(path)
+				except OSError:  # removed by another process meanwhile
+					continue
+				entries.append((stat.st_mtime, stat.st_size, path))
+		return entries
+
+	def get(self, key):
+		"""The dict of arrays stored under `key`, or None if there is none."""
+		path = self._path(key)
+		try:
+			with np.load(path) as data:
+				arrays = dict((name, data[name]) for name in data.files)
+			os.utime(path, None)  # most recently used
+		except (IOError, OSError, ValueError):
+			return None
+		return arrays
+
+	def put(self, key, **arrays):
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		# write to a temporary file first, so that readers never see a partial entry
+		fd, tmp_path = tempfile.mkstemp(suffix=".npz.tmp", dir=self.directory)
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				np.savez(f, **arrays)
+			os.rename(tmp_path, self._path(key))
+		except BaseException:
+			os.remove(tmp_path)
+			raise
+		self.evict()
+
+	def _remove_stale(self):
+		"""Delete the temporary files of writes that failed without removing them, e.g. killed processes."""
+		if not os.path.isdir(self.directory):
+			return
+		now = time.time()
+		for name in os.listdir(self.directory):
+			if name.endswith(".tmp"):
+				path = os.path.join(self.directory, name)
+				try:
+					if now - os.stat(path).st_mtime > STALE_SECONDS:
+						os.remove(path)
+				except OSError:  # renamed or removed by another process meanwhile
+					pass
+
+	def evict(self):
+		"""
+		Delete least recently used entries until the cache holds at most
+		max_bytes, and the temporary files of failed writes.
+		"""
+		self._remove_stale()
+		entries = sorted(self._entries())
+		total = sum(size for mtime, size, path in entries)
+		for mtime, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			total -= size
+
+	def invalidate(self, key=None):
+		"""Delete the entry stored under `key`, or all entries and the temporary files of failed writes."""
+		if key is not None:
+			paths = [self._path(key)]
+		else:
+			self._remove_stale()
+			paths = [path for mtime, size, path in self._entries()]
+		for path in paths:
+			if os.path.exists(path):
+				os.remove(path)
+
+	def size(self):
+		return sum(size for mtime, size, path in self._entries())
+
+	def __len__(self):
+		return len(self._entries())
+
+	def get_panel(self, simulator_name, panel, timestep, variable='v'):
+		"""A panel's result as returned by panels.run_panel(), or None if not cached."""
+		arrays = self.get(panel_key(simulator_name, panel, timestep, variable))
+		if arrays is None:
+			return None
+		if variable == 'spikes':
+			return arrays['spikes']
+		return arrays['times'], arrays['v']
+
+	def put_panel(self, simulator_name, panel, timestep, variable, result):
+		key = panel_key(simulator_name, panel, timestep, variable)
+		if variable == 'spikes':
+			self.put(key, spikes=result)
+		else:
+			times, v = result
+			self.put(key, times=times, v=v)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Inspect or clear the simulation result cache.")
+	parser.add_argument("command", choices=["info", "clear"])
+	parser.add_argument("--dir", default=DEFAULT_DIRECTORY, help="cache directory (default: %(default)s)")
+	args = parser.parse_args()
+	cache = ResultCache(args.dir)
+	if args.command == "clear":
+		cache.invalidate()
+	print("%s: %d entries, %.1f MB" % (cache.directory, len(cache), cache.size() / 1024.0 ** 2))
+
+
+if __name__ == '__main__':
+	main()
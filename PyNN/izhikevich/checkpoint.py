@@ -0,0 +1,103 @@
+"""
+Checkpoints of simulations on the NumPy engine: the complete state, saved to a
+compact binary file (an .npz archive of arrays) between runs and loaded back
+into the same model, built again, so that a run interrupted by a crash or
+by preemption can be continued where it stopped rather than from t = 0.
+
+A checkpoint holds, for each engine.Engine, v, u and the parameters of its
+cells and its step count, which also gives the position in the schedule of
+its current sources (they are stateless), and the state of its inputs and
+recorders: spikes on their way in synaptic ring buffers, short-term plasticity,
+the random number generators of noise, and what the recorders have recorded
+so far (for a recording.StreamingRecorder, the number of samples in its
+files). Each of these provides checkpoint(), returning a dict of arrays, and
+restore(arrays).
+
+	>>> checkpoint.save("run.npz", [engine])
+	... later, in a new process, after building the same model again:
+	>>> checkpoint.load("run.npz", [engine])
+
+The numpy backend saves all its populations with
+sim.save_checkpoint(filename) and sim.restore_checkpoint(filename).
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+
+def rng_state(rng, prefix='rng'):
+	"""The state of a numpy.random.RandomState, as a dict of arrays."""
+	name, keys, position, has_gauss, cached_gaussian = rng.get_state()
+	return {
+		prefix + '.keys': keys,
+		prefix + '.position': np.int64(position),
+		prefix + '.has_gauss': np.int64(has_gauss),
+		prefix + '.cached_gaussian': np.float64(cached_gaussian),
+	}
+
+
+def set_rng_state(rng, arrays, prefix='rng'):
+	rng.set_state(('MT19937', arrays[prefix + '.keys'], int(arrays[prefix + '.position']),
+				   int(arrays[prefix + '.has_gauss']), float(arrays[prefix + '.cached_gaussian'])))
+
+
+def _objects(engines):
+	"""The engines, each followed by its inputs and recorders, each object once."""
+	objects = []
+	seen = set()
+	for engine in engines:
+		for obj in [engine] + list(engine.inputs) + list(engine.recorders):
+			if id(obj) not in seen:
+				seen.add(id(obj))
+				objects.append(obj)
+	return objects
+
+
+def save(filename, engines, compress=False, **extra):
+	"""
+	Save the state of `engines` and of their inputs and recorders to
+	`filename`, along with the arrays or scalars `extra`. The file is written
+	under another name first and then renamed, so that an interruption never
+	leaves a partial checkpoint.
+	"""
+	arrays = {'format_version': np.int64(FORMAT_VERSION)}
+	for i, obj in enumerate(_objects(engines)):
+		if not hasattr(obj, 'checkpoint'):
+			raise TypeError("%s can not be checkpointed: it has no checkpoint() method" % type(obj).__name__)
+		arrays['%d.class' % i] = np.array(type(obj).__name__)
+		for name, value in obj.checkpoint().items():
+			arrays['%d.%s' % (i, name)] = value
+	for name, value in extra.items():
+		arrays['extra.' + name] = value
+	directory = os.path.dirname(os.path.abspath(filename))
+	fd, tmp_path = tempfile.mkstemp(suffix=".npz.tmp", dir=directory)
+	with os.fdopen(fd, 'wb') as f:
+		(np.savez_compressed if compress else np.savez)(f, **arrays)
+	os.rename(tmp_path, filename)
+
+
+def load(filename, engines):
+	"""
+	Restore the state saved by save() into `engines`, which must be the same
+	model: the same engines, inputs and recorders, created in the same order.
+	Return the `extra` values.
+	"""
+	with np.load(filename) as data:
+		arrays = dict((name, data[name]) for name in data.files)
+	if int(arrays.get('format_version', -1)) != FORMAT_VERSION:
+		raise ValueError("%s is not a checkpoint of version %d" % (filename, FORMAT_VERSION))
+	objects = _objects(engines)
+	saved = [str(arrays['%d.class' % i]) for i in range(len(arrays)) if '%d.class' % i in arrays]
+	if saved != [type(obj).__name__ for obj in objects]:
+		raise ValueError("%s is a checkpoint of another model: %s, not %s" % (
+			filename, ", ".join(saved), ", ".join(type(obj).__name__ for obj in objects)))
+	for i, obj in enumerate(objects):
+		prefix = '%d.' % i
+		obj.restore(dict((name[len(prefix):], value) for name, value in arrays.items()
+						 if name.startswith(prefix) and name != prefix + 'class'))
+	return dict((name[len('extra.'):], value) for name, value in arrays.items() if name.startswith('extra.'))
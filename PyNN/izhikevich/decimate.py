@@ -0,0 +1,191 @@
+"""
+Reduction of recorded traces to their min/max envelope, for display and export.
+
+Drawn n pixels wide, a trace looks the same as the whole if, of the samples
+falling in each of n consecutive buckets, only the smallest and the largest are
+kept, in time order: every spike keeps its peak and every reset its trough.
+
+	decimate()		the envelope of a whole trace, or of one per cell
+	Envelope		the same, built incrementally from chunks of samples as
+				they arrive, with a bounded number of buckets whatever
+				the length of the trace
+	EnvelopeRecorder	an engine recorder (see recording.py) keeping the
+				envelope of 'v' or 'u' during a run, for live views
+	decimate_recording()	the envelope of a StreamedRecording, read chunk by chunk
+"""
+
+import numpy as np
+
+
+class Envelope(object):
+	"""
+	Min/max envelope of a trace, or of one trace per cell, given in chunks with
+	add(). Samples are grouped in buckets of `samples_per_bin` samples; when
+	2 * `n_bins` buckets are full, neighbouring buckets are merged in pairs and
+	the bucket size doubles, so that result() gives between `n_bins` and
+	2 * `n_bins` buckets (plus the first and last sample) at any time.
+	"""
+
+	def __init__(self, n_bins, samples_per_bin=1):
+		self.n_bins = n_bins
+		self.samples_per_bin = max(1, int(samples_per_bin))
+		self.n_samples = 0
+		self._count = 0
+		self._first = None
+		self._last = None
+		self._pending = None
+		self._flat = False
+
+	def _allocate(self, width, dtype):
+		shape = (2 * self.n_bins, width)
+		self._low_t = np.empty(shape)
+		self._high_t = np.empty(shape)
+		self._low = np.empty(shape, dtype=dtype)
+		self._high = np.empty(shape, dtype=dtype)
+
+	def add(self, times, values):
+		"""Append samples: `times` of shape (n,), `values` of shape (n,) or (n, cells)."""
+		times = np.asarray(times, dtype=float)
+		values = np.asarray(values)
+		if not len(times):
+			return
+		if self._first is None:
+			self._flat = values.ndim == 1
+		if values.ndim == 1:
+			values = values[:, np.newaxis]
+		if self._first is None:
+			self._allocate(values.shape[1], values.dtype)
+			self._first = (times[0], values[0].copy())
+		self._last = (times[-1], values[-1].copy())
+		self.n_samples += len(times)
+
+		if self._pending is not None:
+			times = np.concatenate([self._pending[0], times])
+			values = np.concatenate([self._pending[1], values])
+		start = 0
+		while len(times) - start >= self.samples_per_bin:
+			n_full = (len(times) - start) // self.samples_per_bin
+			n_buckets = min(n_full, 2 * self.n_bins - self._count)
+			stop = start + n_buckets * self.samples_per_bin
+			self._store(times[start:stop], values[start:stop], n_buckets)
+			start = stop
+			if self._count == 2 * self.n_bins:
+				self._merge()
+		self._pending = (times[start:], values[start:]) if start < len(times) else None
+
+	def _buckets(self, times, values, n_buckets):
+		"""(low times, low values, high times, high values) of consecutive buckets of samples."""
+		block = values.reshape(n_buckets, -1, values.shape[1])
+		time_block = times.reshape(n_buckets, -1)
+		rows = np.arange(n_buckets)[:, np.newaxis]
+		low = block.argmin(axis=1)
+		high = block.argmax(axis=1)
+		return (time_block[rows, low], np.take_along_axis(block, low[:, np.newaxis], 1)[:, 0],
+				time_block[rows, high], np.take_along_axis(block, high[:, np.newaxis], 1)[:, 0])
+
+	def _store(self, times, values, n_buckets):
+		at = slice(self._count, self._count + n_buckets)
+		self._low_t[at], self._low[at], self._high_t[at], self._high[at] = self._buckets(times, values, n_buckets)
+		self._count += n_buckets
+
+	def _merge(self):
+		n = self._count // 2
+		for t, v, keep_first in ((self._low_t, self._low, np.less_equal), (self._high_t, self._high, np.greater_equal)):
+			first = keep_first(v[0:2 * n:2], v[1:2 * n:2])
+			t[:n] = np.where(first, t[0:2 * n:2], t[1:2 * n:2])
+			v[:n] = np.where(first, v[0:2 * n:2], v[1:2 * n:2])
+		self._count = n
+		self.samples_per_bin *= 2
+
+	def result(self):
+		"""
+		(times, values) of the first sample, the smallest and largest sample of
+		every bucket in time order, and the last sample. For several cells both
+		have shape (samples, cells), as the extremes of each cell fall at their
+		own times. The envelope can be taken at any time and added to after.
+		"""
+		if self._first is None:
+			return np.zeros(0), np.zeros(0)
+		low_t, low, high_t, high = (self._low_t[:self._count], self._low[:self._count],
+									self._high_t[:self._count], self._high[:self._count])
+		if self._pending is not None:
+			pending = self._buckets(self._pending[0], self._pending[1], 1)
+			low_t, low, high_t, high = [np.concatenate([stored, extra]) for stored, extra in
+										zip((low_t, low, high_t, high), pending)]
+		n_buckets, width = low.shape
+		low_first = low_t <= high_t
+		times = np.empty((2 * n_buckets + 2, width))
+		values = np.empty((2 * n_buckets + 2, width), dtype=low.dtype)
+		times[0], values[0] = self._first
+		times[1:-1:2] = np.where(low_first, low_t, high_t)
+		values[1:-1:2] = np.where(low_first, low, high)
+		times[2:-1:2] = np.where(low_first, high_t, low_t)
+		values[2:-1:2] = np.where(low_first, high, low)
+		times[-1], values[-1] = self._last
+		if self._flat:
+			return times[:, 0], values[:, 0]
+		return times, values
+
+
+def decimate(times, values, n_bins):
+	"""
+	Keep, in order, only the first and last sample of a trace and the smallest
+	and largest value in each of `n_bins` consecutive runs of samples. Drawn
+	`n_bins` pixels wide, this looks the same as the whole trace. `values` may
+	also have one column per cell (see Envelope.result()).
+	"""
+	times = np.asarray(times)
+	values = np.asarray(values)
+	n = len(values)
+	if n <= 2 * n_bins + 2:
+		return times, values
+	envelope = Envelope(n_bins, -(-n // n_bins))
+	envelope.add(times, values)
+	return envelope.result()
+
+
+def decimate_recording(recording, variable, n_bins, cells=None, chunk_size=10000):
+	"""Envelope of `variable` in a recording.StreamedRecording, reading `chunk_size` samples at a time."""
+	envelope = Envelope(n_bins, -(-recording.n_samples // n_bins))
+	for times, samples in recording.iter_chunks(variable, chunk_size, cells):
+		envelope.add(times, samples)
+	return envelope.result()
+
+
+class EnvelopeRecorder(object):
+	"""
+	Keeps the envelope (see Envelope) of the state variable `variable` of the
+	cells `indices` (all cells by default) during a run, so that a live view
+	can draw result() between runs, at a cost independent of the run length.
+	Samples are passed on to the Envelope in chunks of `chunk_size` steps.
+	"""
+
+	def __init__(self, variable, n_bins, indices=None, chunk_size=1000):
+		self.variable = variable
+		self.indices = indices
+		self.chunk_size = chunk_size
+		self.envelope = Envelope(n_bins)
+		self._times = None
+		self._rows = 0
+
+	def reserve(self, engine, n_steps):
+		if self._times is None:
+			width = engine.size if self.indices is None else len(np.arange(engine.size)[self.indices])
+			self._times = np.empty(self.chunk_size)
+			self._values = np.empty((self.chunk_size, width), dtype=engine.v.dtype)
+
+	def sample(self, engine):
+		values = getattr(engine, self.variable)
+		self._times[self._rows] = engine.time
+		self._values[self._rows] = values if self.indices is None else values[self.indices]
+		self._rows += 1
+		if self._rows == self.chunk_size:
+			self.flush()
+
+	def flush(self):
+		if self._rows:
+			self.envelope.add(self._times[:self._rows], self._values[:self._rows])
+			self._rows = 0
+
+	def result(self):
+		return self.envelope.result()
@@ -0,0 +1,423 @@
+"""
+Distributed simulation of the random network of Izhikevich (2003) (see
+network.py) over several processes ("ranks"), MPI-style.
+
+Each rank owns a contiguous slice of the cells, simulates them on its own
+Engine and holds the synapses onto them. Every `min_delay` ms the ranks
+exchange the spikes of their cells (an allgather), and each schedules all of
+them onto its own cells: as no synapse is shorter than `min_delay`, no spike
+can arrive before the exchange that carries it.
+
+The results do not depend on the number of ranks, to the last bit:
+
+	- cells are grouped in blocks of BLOCK_SIZE, and ranks own whole blocks.
+	  The parameters, the incoming synapses and the thalamic noise of a block
+	  are drawn from random streams of their own, seeded with (seed, block),
+	  so the network and its input are the same however the blocks are
+	  distributed. Each cell receives `fanin` synapses from cells drawn at
+	  random (fixed fan-in, rather than the fixed fan-out of network.Network,
+	  so that a rank can draw the synapses onto its cells on its own), with
+	  the weights of network.Network.
+	- the spikes of a step are scheduled in order of cell, and added to the
+	  input of the cells in the same order (see synapses._accumulate()), so
+	  floating-point sums are the same too.
+
+Ranks communicate through a communicator with the methods allgather(),
+bcast() and barrier() and the attributes rank and size of mpi4py's: MPI's
+COMM_WORLD when run under mpirun (or mpiexec) with mpi4py installed,
+otherwise a LocalCommunicator between processes of this machine, started by
+launch():
+
+	mpirun -n 4 python -c "from izhikevich.distributed import *; print(simulate(mpi_communicator(), 100000, 1000.0))"
+
+	>>> results = launch(simulate, 4, 100000, 1000.0)
+	>>> results[0]['digest']	# the same with any number of ranks
+
+benchmark_scaling() measures strong scaling (the same network on more ranks)
+and weak scaling (the same number of cells per rank).
+"""
+
+import hashlib
+import multiprocessing
+import os
+from timeit import default_timer
+
+import numpy as np
+
+from izhikevich.checkpoint import rng_state, set_rng_state, save, load
+from izhikevich.engine import Engine
+from izhikevich.network import EXCITATORY_FRACTION, NOISE, NOISE_INTERVAL, DELAY, REFERENCE_SIZE, \
+	DEFAULT_FANOUT, TIMESTEP
+from izhikevich.synapses import Synapses
+
+
+BLOCK_SIZE = 1024
+MIN_DELAY = 0.5
+DEFAULT_FANIN = DEFAULT_FANOUT
+
+# random streams of a block
+PARAMETERS, CONNECTIONS, NOISE_STREAM = range(3)
+
+
+def mpi_communicator():
+	"""MPI's COMM_WORLD if mpi4py is installed, otherwise None."""
+	try:
+		from mpi4py import MPI
+	except ImportError:
+		return None
+	return MPI.COMM_WORLD
+
+
+class LocalCommunicator(object):
+	"""
+	The collective operations of an mpi4py communicator used here, between
+	`size` processes of this machine, each of which has an inbox (a
+	multiprocessing.Queue). Every process takes part in every operation, in
+	the same order, and operations are numbered so that messages of the next
+	operation, from ranks already past this one, wait until they are due.
+	"""
+
+	def __init__(self, rank, inboxes):
+		self.rank = rank
+		self.size = len(inboxes)
+		self.inboxes = inboxes
+		self._count = 0
+		self._early = {}
+
+	def allgather(self, value):
+		"""The `value` of every rank, in order of rank."""
+		self._count += 1
+		for rank, inbox in enumerate(self.inboxes):
+			if rank != self.rank:
+				inbox.put((self._count, self.rank, value))
+		values = [None] * self.size
+		values[self.rank] = value
+		for rank in range(self.size):
+			if rank == self.rank:
+				continue
+			key = (self._count, rank)
+			while key not in self._early:
+				count, source, message = self.inboxes[self.rank].get()
+				self._early[count, source] = message
+			values[rank] = self._early.pop(key)
+		return values
+
+	def bcast(self, value, root=0):
+		return self.allgather(value if self.rank == root else None)[root]
+
+	def barrier(self):
+		self.allgather(None)
+
+
+def _run_rank(function, rank, inboxes, results, args):
+	try:
+		results.put((rank, function(LocalCommunicator(rank, inboxes), *args)))
+	except BaseException as error:
+		results.put((rank, error))
+		raise
+
+
+def launch(function, n_ranks, *args):
+	"""
+	Call function(communicator, *args) in each of `n_ranks` new processes,
+	connected by LocalCommunicators; return their return values, in order of
+	rank.
+	"""
+	inboxes = [multiprocessing.Queue() for rank in range(n_ranks)]
+	results = multiprocessing.Queue()
+	processes = [multiprocessing.Process(target=_run_rank, args=(function, rank, inboxes, results, args))
+				 for rank in range(n_ranks)]
+	for process in processes:
+		process.start()
+	values = [None] * n_ranks
+	try:
+		for i in range(n_ranks):
+			rank, value = results.get()
+			if isinstance(value, BaseException):
+				raise value
+			values[rank] = value
+	finally:
+		for process in processes:
+			if values.count(None) and process.is_alive():
+				process.terminate()
+			process.join()
+	return values
+
+
+def partition(size, n_ranks, rank, block_size=BLOCK_SIZE):
+	"""First and last + 1 cell of `rank`, in whole blocks of `block_size` cells."""
+	n_blocks = -(-size // block_size)
+	first = rank * n_blocks // n_ranks
+	last = (rank + 1) * n_blocks // n_ranks
+	return min(first * block_size, size), min(last * block_size, size)
+
+
+def _blocks(start, stop, block_size=BLOCK_SIZE):
+	"""(block, first cell, last cell + 1) of the blocks from cell `start` to `stop`."""
+	return [(start // block_size + i, first, min(first + block_size, stop))
+			for i, first in enumerate(range(start, stop, block_size))]
+
+
+def _stream(seed, block, stream):
+	return np.random.RandomState([seed, block, stream])
+
+
+def block_parameters(seed, block, start, stop, n_excitatory):
+	"""a, b, c, d of cells `start` to `stop` of `block` (see network.cell_parameters())."""
+	r = _stream(seed, block, PARAMETERS).rand(stop - start)
+	excitatory = np.arange(start, stop) < n_excitatory
+	return {
+		'a': np.where(excitatory, 0.02, 0.02 + 0.08 * r),
+		'b': np.where(excitatory, 0.2, 0.25 - 0.05 * r),
+		'c': np.where(excitatory, -65.0 + 15.0 * r ** 2, -65.0),
+		'd': np.where(excitatory, 8.0 - 6.0 * r ** 2, 2.0),
+	}
+
+
+def block_connections(seed, block, start, stop, size, n_excitatory, fanin):
+	"""Sources (int64) and weights (float32) of the `fanin` synapses onto each of cells `start` to `stop`."""
+	rng = _stream(seed, block, CONNECTIONS)
+	sources = rng.randint(0, size, (stop - start, fanin)).astype(np.int64)
+	weights = rng.rand(stop - start, fanin).astype(np.float32)
+	scale = float(REFERENCE_SIZE) / fanin
+	weights *= np.where(sources < n_excitatory, 0.5 * scale, -scale).astype(np.float32)
+	return sources, weights
+
+
+class BlockNoise(object):
+	"""
+	Engine input: the thalamic noise of network.ThalamicNoise, drawn for each
+	block of cells from the block's own random stream. `blocks` are the
+	(block, first cell, last cell + 1) of the engine's cells, from `offset`.
+	"""
+
+	def __init__(self, blocks, sigma, offset=0, seed=None, interval=NOISE_INTERVAL):
+		self.sigma = np.asarray(sigma, dtype=float)
+		self.interval = interval
+		self.slices = [slice(first - offset, last - offset) for block, first, last in blocks]
+		self.rngs = [_stream(seed, block, NOISE_STREAM) for block, first, last in blocks]
+		self._current = None
+
+	def add_current(self, engine, I):
+		steps = max(1, int(round(self.interval / engine.timestep)))
+		if self._current is None or engine.step_count % steps == 0:
+			self._current = np.empty(engine.size)
+			for cells, rng in zip(self.slices, self.rngs):
+				self._current[cells] = rng.standard_normal(cells.stop - cells.start)
+			self._current *= self.sigma
+		I += self._current
+
+	def checkpoint(self):
+		arrays = {}
+		for i, rng in enumerate(self.rngs):
+			arrays.update(rng_state(rng, 'rng%d' % i))
+		if self._current is not None:
+			arrays['current'] = self._current
+		return arrays
+
+	def restore(self, arrays):
+		for i, rng in enumerate(self.rngs):
+			set_rng_state(rng, arrays, 'rng%d' % i)
+		self._current = arrays['current'] if 'current' in arrays else None
+
+
+class _SpikeLog(object):
+	"""Recorder of the spikes since the last exchange, as global cell indices."""
+
+	def __init__(self, offset):
+		self.offset = offset
+		self.clear()
+
+	def clear(self):
+		self.steps = []
+		self.cells = []
+
+	def reserve(self, engine, n_steps):
+		pass
+
+	def sample(self, engine):
+		if engine.spikes.size:
+			self.steps.append(engine.step_count)
+			self.cells.append(engine.spikes + self.offset)
+
+	def flush(self):
+		pass
+
+	def checkpoint(self):
+		# checkpoints are taken after an exchange, which empties the log
+		return {}
+
+	def restore(self, arrays):
+		self.clear()
+
+	def packed(self):
+		"""(steps, number of spikes at each, cells), as arrays."""
+		if not self.steps:
+			return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+		return (np.array(self.steps, dtype=np.int64), np.array([len(c) for c in self.cells], dtype=np.int64),
+				np.concatenate(self.cells).astype(np.int32))
+
+
+class DistributedNetwork(object):
+	"""The part of a network of `size` cells owned by the rank of `communicator`."""
+
+	def __init__(self, communicator, size, fanin=DEFAULT_FANIN, timestep=TIMESTEP, min_delay=MIN_DELAY, seed=1):
+		if DELAY < min_delay:
+			raise ValueError("min_delay (%g ms) is longer than the synaptic delay (%g ms)" % (min_delay, DELAY))
+		self.communicator = communicator
+		self.size = size
+		self.n_excitatory = int(round(size * EXCITATORY_FRACTION))
+		self.start, self.stop = partition(size, communicator.size, communicator.rank)
+		blocks = _blocks(self.start, self.stop)
+		n_cells = self.stop - self.start
+		self.exchange_steps = max(1, int(round(min_delay / timestep)))
+
+		parameters = [block_parameters(seed, block, first, last, self.n_excitatory) for block, first, last in blocks]
+		parameters = dict((name, np.concatenate([p[name] for p in parameters] or [np.zeros(0)]))
+						  for name in ('a', 'b', 'c', 'd'))
+		self.engine = Engine(n_cells, parameters, {'v': -65.0, 'u': -65.0 * parameters['b']}, timestep=timestep)
+		sigma = np.where(np.arange(self.start, self.stop) < self.n_excitatory, NOISE[0], NOISE[1])
+		self.noise = self.engine.add_input(BlockNoise(blocks, sigma, self.start, seed))
+
+		sources, weights = [], []
+		for block, first, last in blocks:
+			s, w = block_connections(seed, block, first, last, size, self.n_excitatory, fanin)
+			sources.append(s.reshape(-1))
+			weights.append(w.reshape(-1))
+		sources = np.concatenate(sources or [np.zeros(0, dtype=np.int64)])
+		targets = np.repeat(np.arange(n_cells, dtype=np.int32), fanin)
+		self.synapses = Synapses.from_connections(size, n_cells, sources, targets,
+												  np.concatenate(weights or [np.zeros(0, dtype=np.float32)]),
+												  DELAY, timestep, accumulation='bincount')
+		self.engine.add_input(self.synapses)
+		self.log = self.engine.add_recorder(_SpikeLog(self.start))
+		self.spike_steps = []
+		self.spike_cells = []
+
+	def save(self, directory):
+		"""Save a checkpoint of each rank's part of the network to `directory`/rank<rank>.npz."""
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		self.communicator.barrier()
+		save(os.path.join(directory, "rank%d.npz" % self.communicator.rank), [self.engine],
+			 n_ranks=self.communicator.size, spike_steps=np.concatenate(self.spike_steps or [np.zeros(0, dtype=np.int64)]),
+			 spike_cells=np.concatenate(self.spike_cells or [np.zeros(0, dtype=np.int32)]))
+
+	def restore(self, directory):
+		"""Continue from a checkpoint saved by save() on the same number of ranks."""
+		extra = load(os.path.join(directory, "rank%d.npz" % self.communicator.rank), [self.engine])
+		if int(extra['n_ranks']) != self.communicator.size:
+			raise ValueError("The checkpoint in %s is of %d ranks, not %d" % (
+				directory, extra['n_ranks'], self.communicator.size))
+		self.spike_steps = [extra['spike_steps']]
+		self.spike_cells = [extra['spike_cells']]
+
+	def run(self, duration):
+		"""Simulate for `duration` ms, exchanging spikes every min_delay."""
+		n_steps = int(round(duration / self.engine.timestep))
+		while n_steps > 0:
+			steps = min(self.exchange_steps, n_steps)
+			self.engine.run_steps(steps)
+			self.exchange()
+			n_steps -= steps
+
+	def exchange(self):
+		"""Gather the spikes of all ranks since the last exchange and schedule them, step by step."""
+		local = self.log.packed()
+		self.log.clear()
+		self.spike_steps.append(np.repeat(local[0], local[1]))
+		self.spike_cells.append(local[2])
+		by_step = {}
+		for steps, counts, cells in self.communicator.allgather(local):
+			# ranks own increasing slices of the cells: in order of rank, the spikes of a step are in order of cell
+			for step, spikes in zip(steps, np.split(cells, np.cumsum(counts)[:-1])):
+				by_step.setdefault(step, []).append(spikes)
+		for step in sorted(by_step):
+			self.synapses.schedule(np.concatenate(by_step[step]), step)
+
+	def gather(self):
+		"""
+		The spikes ((cells, times), in order of time then cell) and final v and u
+		of all cells, and a digest of them all, on every rank.
+		"""
+		local = (np.concatenate(self.spike_steps or [np.zeros(0, dtype=np.int64)]),
+				 np.concatenate(self.spike_cells or [np.zeros(0, dtype=np.int32)]), self.engine.v, self.engine.u)
+		parts = self.communicator.allgather(local)
+		steps, cells, v, u = [np.concatenate([part[i] for part in parts]) for i in range(4)]
+		order = np.lexsort((cells, steps))
+		steps, cells = steps[order], cells[order].astype(np.int32)
+		digest = hashlib.sha256()
+		for array in (steps, cells, v, u):
+			digest.update(np.ascontiguousarray(array).tobytes())
+		return {
+			'cells': cells,
+			'times': steps * self.engine.timestep,
+			'v': v,
+			'u': u,
+			'digest': digest.hexdigest(),
+		}
+
+
+def simulate(communicator, size, duration, fanin=DEFAULT_FANIN, timestep=TIMESTEP, min_delay=MIN_DELAY, seed=1,
+			 full=False):
+	"""
+	Build and run a network of `size` cells on all ranks of `communicator`.
+	Return the build and run times (the longest over ranks), the number of
+	spikes and their digest (see DistributedNetwork.gather()), and with
+	`full` the spikes and final state themselves.
+	"""
+	start = default_timer()
+	network = DistributedNetwork(communicator, size, fanin, timestep, min_delay, seed)
+	communicator.barrier()
+	build = default_timer() - start
+	start = default_timer()
+	network.run(duration)
+	communicator.barrier()
+	wall = default_timer() - start
+	build, wall = np.max(communicator.allgather((build, wall)), axis=0)
+	results = network.gather()
+	n_steps = int(round(duration / timestep))
+	record = {
+		'ranks': communicator.size,
+		'size': size,
+		'duration': duration,
+		'fanin': fanin,
+		'timestep': timestep,
+		'min_delay': min_delay,
+		'build': build,
+		'wall': wall,
+		'steps': n_steps,
+		'spikes': len(results['cells']),
+		'steps_per_second': n_steps / wall,
+		'spikes_per_second': len(results['cells']) / wall,
+		'rate': 1000.0 * len(results['cells']) / (duration * size),
+		'digest': results['digest'],
+	}
+	if full:
+		record.update(results)
+	return record
+
+
+def benchmark_scaling(ranks=(1, 2, 4), size=100000, duration=1000.0, weak=False, fanin=DEFAULT_FANIN,
+					  timestep=TIMESTEP, min_delay=MIN_DELAY, seed=1, progress=None):
+	"""
+	Run the network on each number of `ranks` with launch(): with `size`
+	cells whatever the number of ranks (strong scaling), or `size` cells per
+	rank (weak scaling). Speedup and efficiency are relative to the first
+	number of ranks.
+	"""
+	records = []
+	for n_ranks in ranks:
+		n_cells = size * n_ranks if weak else size
+		record = launch(simulate, n_ranks, n_cells, duration, fanin, timestep, min_delay, seed)[0]
+		reference = records[0] if records else record
+		record['speedup'] = reference['wall'] / record['wall']
+		if weak:
+			record['efficiency'] = record['speedup']
+		else:
+			record['efficiency'] = record['speedup'] * reference['ranks'] / n_ranks
+			record['identical'] = record['digest'] == reference['digest']
+		records.append(record)
+		if progress is not None:
+			progress(record)
+	return records
@@ -0,0 +1,263 @@
+"""
+Vectorized simulation of a population of Izhikevich (2003) cells with NumPy.
+
+	dv/dt = X v^2 + Y v + Z - u + I
+	du/dt = a (b v - u)		or, for cells with accommodation = 1,
+	du/dt = a b (v + 65)
+
+	if v >= 30 mV: v <- c, u <- u + d
+
+With the default X = 0.04, Y = 5, Z = 140 and accommodation = 0, this is the
+standard model. The other values give the variants of figure1.m used for
+panels G and L (X = 0.04, Y = 4.1, Z = 108) and R (accommodation), defined as
+generalizedIzhikevichCell and accomodationIzhikevichCell in
+NeuroML2/GeneralizedIzhikevichCell.xml, so that cells of all kinds can be
+simulated in the same population.
+
+The state of all cells is held in contiguous arrays and the whole population is
+advanced by one forward-Euler step at a time with array operations, using the
+values of v and u at the start of the step for both updates, as NEST's
+izhikevich model does. The input current I is i_offset plus the current of any
+injected sources and of any inputs added with add_input(), such as noise or
+synapses, which may give every cell its own current.
+
+checkpoint() and restore() save and load the state of the cells, and those of
+the inputs and recorders that have the same methods (see checkpoint.py).
+
+`dtype` is the floating-point type of the state, the parameters and the
+buffers of the input current, float64 by default. With float32, which halves
+the memory they take and read at every step, recordings of the state are
+float32 too; precision.py compares the spikes of the panels of Fig. 1 with
+both.
+"""
+
+import numpy as np
+
+
+DEFAULT_PARAMETERS = {
+	'a': 0.02,
+	'b': 0.2,
+	'c': -65.0,
+	'd': 2.0,
+	'i_offset': 0.0,
+	'X': 0.04,
+	'Y': 5.0,
+	'Z': 140.0,
+	'accommodation': 0.0,
+}
+
+DEFAULT_INITIAL_VALUES = {
+	'v': -70.0,
+	'u': -14.0,
+}
+
+THRESHOLD = 30.0
+
+
+class Engine(object):
+
+	def __init__(self, size, parameters=None, initial_values=None, timestep=0.01, threshold=THRESHOLD,
+				 dtype=np.float64):
+		self.size = size
+		self.dtype = np.dtype(dtype)
+		self.timestep = timestep
+		self.threshold = threshold
+		self.step_count = 0
+		self._accommodating = np.zeros(0, dtype=np.intp)
+		self._coefficients = {}
+
+		self.parameters = {}
+		for name, default in DEFAULT_PARAMETERS.items():
+			self.parameters[name] = np.full(size, default, dtype=self.dtype)
+		self.v = np.empty(size, dtype=self.dtype)
+		self.u = np.empty(size, dtype=self.dtype)
+		for name, value in DEFAULT_INITIAL_VALUES.items():
+			self.initialize(name, value)
+		self.set(**(parameters or {}))
+		for name, value in (initial_values or {}).items():
+			self.initialize(name, value)
+
+		self.sources = []
+		self.inputs = []
+		self.recorders = []
+		self.spikes = np.zeros(0, dtype=np.intp)
+		self.spike_v = np.zeros(0, dtype=self.dtype)
+		self.spike_u = np.zeros(0, dtype=self.dtype)
+
+		self._I = np.empty(size, dtype=self.dtype)
+		self._dv = np.empty(size, dtype=self.dtype)
+		self._du = np.empty(size, dtype=self.dtype)
+		self._fired = np.empty(size, dtype=bool)
+
+	@property
+	def time(self):
+		return self.step_count * self.timestep
+
+	def set(self, indices=None, **parameters):
+		"""Set parameters for the cells `indices` (all cells by default)."""
+		for name, value in parameters.items():
+			if name not in self.parameters:
+				raise ValueError("Izhikevich cells have no parameter '%s'" % name)
+			if indices is None:
+				self.parameters[name][:] = value
+			else:
+				self.parameters[name][indices] = value
+		if 'accommodation' in parameters:
+			self._accommodating = np.flatnonzero(self.parameters['accommodation'])
+		for name in ('X', 'Y', 'Z'):
+			if name in parameters or name not in self._coefficients:
+				# a scalar when all cells share the value, which makes step() faster
+				values = self.parameters[name]
+				uniform = values.size and (values == values[0]).all()
+				self._coefficients[name] = values[0] if uniform else values
+
+	def initialize(self, variable, value, indices=None):
+		if variable not in ('v', 'u'):
+			raise ValueError("Izhikevich cells have no state variable '%s'" % variable)
+		if indices is None:
+			getattr(self, variable)[:] = value
+		else:
+			getattr(self, variable)[indices] = value
+
+	def checkpoint(self):
+		"""The state of the cells, as a dict of arrays (see checkpoint.py)."""
+		arrays = {
+			'step_count': np.int64(self.step_count),
+			'timestep': np.float64(self.timestep),
+			'v': self.v,
+			'u': self.u,
+			'spikes': self.spikes,
+			'spike_v': self.spike_v,
+			'spike_u': self.spike_u,
+		}
+		for name, values in self.parameters.items():
+			arrays['parameters.' + name] = values
+		return arrays
+
+	def restore(self, arrays):
+		if arrays['v'].shape != self.v.shape or float(arrays['timestep']) != self.timestep:
+			raise ValueError("The checkpoint is of %d cells with a time step of %g ms, not %d cells with %g ms" % (
+				len(arrays['v']), arrays['timestep'], self.size, self.timestep))
+		self.step_count = int(arrays['step_count'])
+		self.v[:] = arrays['v']
+		self.u[:] = arrays['u']
+		self.spikes = arrays['spikes'].astype(np.intp)
+		self.spike_v = arrays['spike_v'].astype(self.dtype)
+		self.spike_u = arrays['spike_u'].astype(self.dtype)
+		self._coefficients = {}
+		self.set(**dict((name[len('parameters.'):], values) for name, values in arrays.items()
+						if name.startswith('parameters.')))
+
+	def fork(self, indices):
+		"""
+		A new engine of the cells `indices`, which may be repeated, in their
+		current state and with their parameters and current sources, e.g. to
+		continue from the state reached at the onset of a stimulus in several
+		ways without simulating what came before more than once. Inputs and
+		recorders are not copied.
+		"""
+		indices = np.asarray(indices, dtype=np.intp)
+		engine = Engine(len(indices), dict((name, values[indices]) for name, values in self.parameters.items()),
+						{'v': self.v[indices], 'u': self.u[indices]}, self.timestep, self.threshold, self.dtype)
+		engine.step_count = self.step_count
+		for source, source_indices in self.sources:
+			if source_indices is None:
+				engine.inject(source)
+			else:
+				selected = np.flatnonzero(np.isin(indices, np.arange(self.size)[source_indices]))
+				if selected.size:
+					engine.inject(source, selected)
+		spiked = np.isin(indices, self.spikes)
+		engine.spikes = np.flatnonzero(spiked)
+		return engine
+
+	def inject(self, source, indices=None):
+		self.sources.append((source, indices))
+
+	def add_input(self, input):
+		"""
+		Add an input whose add_current(engine, I) adds its current during the
+		coming time step to the array I, once per step. engine.spikes then still
+		holds the cells that spiked in the previous step.
+		"""
+		self.inputs.append(input)
+		return input
+
+	def add_recorder(self, recorder):
+		self.recorders.append(recorder)
+		return recorder
+
+	def run(self, duration):
+		"""Advance by `duration` ms, rounded to a whole number of time steps."""
+		self.run_steps(int(round(duration / self.timestep)))
+
+	def run_until(self, tstop):
+		self.run_steps(int(round(tstop / self.timestep)) - self.step_count)
+
+	def run_steps(self, n_steps):
+		if n_steps <= 0:
+			return
+		for recorder in self.recorders:
+			recorder.reserve(self, n_steps)
+		for i in range(n_steps):
+			self.step()
+		for recorder in self.recorders:
+			recorder.flush()
+
+	def current(self):
+		"""Total input current of each cell during the coming time step."""
+		I = self._I
+		np.copyto(I, self.parameters['i_offset'])
+		for source, indices in self.sources:
+			amplitude = source.amplitude_at(self.step_count, self.timestep)
+			if amplitude:
+				if indices is None:
+					I += amplitude
+				else:
+					I[indices] += amplitude
+		for input in self.inputs:
+			input.add_current(self, I)
+		return I
+
+	def step(self):
+		p = self.parameters
+		v = self.v
+		u = self.u
+		h = self.timestep
+		I = self.current()
+
+		dv = self._dv
+		coefficients = self._coefficients
+		np.multiply(v, coefficients['X'], out=dv)
+		dv += coefficients['Y']
+		dv *= v
+		dv += coefficients['Z']
+		dv -= u
+		dv += I
+		dv *= h
+
+		du = self._du
+		np.multiply(p['b'], v, out=du)
+		du -= u
+		du *= p['a']
+		du *= h
+		accommodating = self._accommodating
+		if accommodating.size:
+			du[accommodating] = p['a'][accommodating] * p['b'][accommodating] * (v[accommodating] + 65.0) * h
+
+		v += dv
+		u += du
+
+		np.greater_equal(v, self.threshold, out=self._fired)
+		spikes = np.flatnonzero(self._fired)
+		if spikes.size:
+			# state of the spiking cells just before their reset, for recorders
+			self.spike_v = v[spikes]
+			self.spike_u = u[spikes]
+			v[spikes] = p['c'][spikes]
+			u[spikes] += p['d'][spikes]
+		self.spikes = spikes
+
+		self.step_count += 1
+		for recorder in self.recorders:
+			recorder.sample(self)
@@ -0,0 +1,232 @@
+"""
+Frequency-current (F-I) curves of Izhikevich cells, for thousands of
+amplitudes and many parameter sets at once.
+
+fi_curves() gives, for each parameter set, the firing rate in response to a
+step of current to each amplitude at `onset`: the steady-state rate, from the
+interspike intervals after `transient` ms of the step, and the first-ISI rate,
+the inverse of the first interval (both in Hz, 0 without two spikes). The
+amplitudes of all parameter sets are simulated as one population, in one run,
+forked from the state of each set at the onset (see engine.Engine.fork()).
+Then, as the curve changes fastest at the onset of firing (and jumps there
+for class 2 cells), each of `refinements` more runs adds `refine_points`
+amplitudes between the last that gives no firing and the first that does.
+
+Curves are cached (see cache.py), keyed by the parameters and initial values
+of the cell and the options of the curve, so that only parameter sets not
+seen before are simulated.
+
+	>>> parameters, initial_values = panel_parameters(get_panels())
+	>>> curves = fi_curves(parameters, initial_values, np.linspace(0.0, 40.0, 1000), cache=ResultCache())
+	>>> curves[0]['amplitude'], curves[0]['steady_rate'], curves[0]['first_isi_rate']
+
+Run as a script, this module draws the curves of the panels of Fig. 1:
+
+	python -m izhikevich.fi [--panels A B ...] [--amplitudes N] [--max-amplitude I] [--duration MS]
+	                        [--refinements N] [--no-cache] [--cache-dir DIR] [--output FILE]
+"""
+
+import argparse
+import hashlib
+from timeit import default_timer
+
+import numpy as np
+
+from izhikevich.cache import ResultCache, DEFAULT_DIRECTORY, hash_key
+from izhikevich.engine import Engine
+from izhikevich.threshold import panel_parameters
+
+
+ONSET = 20.0
+DURATION = 500.0
+TRANSIENT = 200.0
+TIMESTEP = 0.01
+
+
+class RateRecorder(object):
+	"""
+	Keeps what the rates need of the spikes of each cell: the times of its
+	first two spikes, and the number, first and last time of those after
+	`steady_start` ms.
+	"""
+
+	def __init__(self, size, steady_start):
+		self.steady_start = steady_start
+		self.first = np.full(size, np.nan)
+		self.second = np.full(size, np.nan)
+		self.count = np.zeros(size, dtype=np.int64)
+		self.steady_first = np.full(size, np.nan)
+		self.steady_last = np.full(size, np.nan)
+
+	def reserve(self, engine, n_steps):
+		pass
+
+	def sample(self, engine):
+		spikes = engine.spikes
+		if not spikes.size:
+			return
+		t = engine.time
+		self.second[spikes[np.isnan(self.second[spikes]) & ~np.isnan(self.first[spikes])]] = t
+		self.first[spikes[np.isnan(self.first[spikes])]] = t
+		if t >= self.steady_start:
+			self.count[spikes] += 1
+			self.steady_first[spikes[np.isnan(self.steady_first[spikes])]] = t
+			self.steady_last[spikes] = t
+
+	def flush(self):
+		pass
+
+	def rates(self):
+		"""Steady-state and first-ISI rates (Hz) of each cell."""
+		with np.errstate(invalid='ignore', divide='ignore'):
+			steady = np.where(self.count > 1, 1000.0 * (self.count - 1) / (self.steady_last - self.steady_first), 0.0)
+			first_isi = np.where(np.isnan(self.second), 0.0, 1000.0 / (self.second - self.first))
+		return steady, first_isi
+
+
+def _simulate(prefix, cells, amplitudes, onset, duration, transient):
+	"""Rates of the cells `cells` of `prefix`, at `onset`, each stepped to its amplitude."""
+	engine = prefix.fork(cells)
+	recorder = engine.add_recorder(RateRecorder(engine.size, onset + transient))
+	engine.set(i_offset=amplitudes)
+	engine.run_until(onset + duration)
+	return recorder.rates()
+
+
+def _onset_interval(amplitudes, steady, first_isi):
+	"""The amplitudes between which firing starts (steady firing if there is any), or None."""
+	fires = steady > 0 if (steady > 0).any() else first_isi > 0
+	if not fires.any() or fires[0]:
+		return None
+	j = np.argmax(fires)
+	return amplitudes[j - 1], amplitudes[j]
+
+
+def curve_key(parameters, initial_values, amplitudes, onset, duration, transient, refinements, refine_points, timestep):
+	"""Cache key of the F-I curve of one parameter set."""
+	return hash_key({
+		'kind': 'fi',
+		'parameters': dict((name, float(value)) for name, value in parameters.items()),
+		'initial_values': dict((name, float(value)) for name, value in initial_values.items()),
+		'amplitudes': hashlib.sha256(np.ascontiguousarray(amplitudes, dtype=float).tobytes()).hexdigest(),
+		'onset': onset,
+		'duration': duration,
+		'transient': transient,
+		'refinements': refinements,
+		'refine_points': refine_points,
+		'timestep': timestep,
+	})
+
+
+def fi_curves(parameters, initial_values, amplitudes, onset=ONSET, duration=DURATION, transient=TRANSIENT,
+			  refinements=3, refine_points=100, timestep=TIMESTEP, cache=None):
+	"""
+	F-I curves of each parameter set (`parameters` and `initial_values` are
+	dicts of arrays, e.g. from threshold.panel_parameters()), as a list of
+	dicts of the arrays 'amplitude' (increasing), 'steady_rate' and
+	'first_isi_rate'. The step lasts `duration` ms. `cache` is a
+	cache.ResultCache, or None not to cache.
+	"""
+	parameters = dict((name, np.atleast_1d(np.asarray(values, dtype=float))) for name, values in parameters.items())
+	size = len(parameters['a'])
+	initial_values = dict((name, np.broadcast_to(np.asarray(values, dtype=float), (size,)))
+						  for name, values in initial_values.items())
+	amplitudes = np.asarray(amplitudes, dtype=float)
+	keys = [curve_key(dict((name, values[i]) for name, values in parameters.items()),
+					  dict((name, values[i]) for name, values in initial_values.items()),
+					  amplitudes, onset, duration, transient, refinements, refine_points, timestep)
+			for i in range(size)]
+	curves = [None] * size
+	if cache is not None:
+		for i, key in enumerate(keys):
+			arrays = cache.get(key)
+			if arrays is not None:
+				curves[i] = arrays
+	missing = np.array([i for i in range(size) if curves[i] is None], dtype=np.intp)
+	if not missing.size:
+		return curves
+
+	prefix = Engine(len(missing), dict((name, values[missing]) for name, values in parameters.items()),
+					dict((name, values[missing]) for name, values in initial_values.items()), timestep)
+	prefix.run_until(onset)
+
+	n = len(amplitudes)
+	steady, first_isi = _simulate(prefix, np.repeat(np.arange(len(missing)), n), np.tile(amplitudes, len(missing)),
+								  onset, duration, transient)
+	results = [[amplitudes, steady[k * n:(k + 1) * n], first_isi[k * n:(k + 1) * n]] for k in range(len(missing))]
+
+	for refinement in range(refinements):
+		intervals = [_onset_interval(*result) for result in results]
+		refined = [k for k, interval in enumerate(intervals) if interval is not None]
+		if not refined:
+			break
+		added = [np.linspace(intervals[k][0], intervals[k][1], refine_points + 2)[1:-1] for k in refined]
+		steady, first_isi = _simulate(prefix, np.repeat(refined, refine_points), np.concatenate(added),
+									  onset, duration, transient)
+		for i, k in enumerate(refined):
+			new = slice(i * refine_points, (i + 1) * refine_points)
+			merged = [np.concatenate([old, extra]) for old, extra in zip(results[k], (added[i], steady[new], first_isi[new]))]
+			order = np.argsort(merged[0], kind='mergesort')
+			results[k] = [values[order] for values in merged]
+
+	for k, i in enumerate(missing):
+		curves[i] = dict(zip(('amplitude', 'steady_rate', 'first_isi_rate'), results[k]))
+		if cache is not None:
+			cache.put(keys[i], **curves[i])
+	return curves
+
+
+def plot_curves(panels, curves, fig=None):
+	"""Draw the F-I curve of each panel in its place of the 5x4 figure."""
+	import matplotlib.pyplot as plt
+	from izhikevich.plotting import FIGURE_SIZE
+	if fig is None:
+		fig = plt.figure(1, figsize=FIGURE_SIZE, facecolor='white')
+	for panel, curve in zip(panels, curves):
+		ax = fig.add_subplot(5, 4, panel['subplot'])
+		ax.plot(curve['amplitude'], curve['steady_rate'], label='steady state')
+		ax.plot(curve['amplitude'], curve['first_isi_rate'], label='first ISI')
+		ax.set_title(panel['title'], fontsize='small')
+		ax.tick_params(labelsize='x-small')
+	fig.axes[0].legend(fontsize='x-small')
+	fig.subplots_adjust(hspace=0.4)
+	return fig
+
+
+def main(argv=None):
+	from izhikevich.panels import get_panels
+
+	parser = argparse.ArgumentParser(description="F-I curves of the cells of the panels of Fig. 1")
+	parser.add_argument("--panels", nargs="+", metavar="LABEL", help="panels to include (default: all)")
+	parser.add_argument("--amplitudes", type=int, default=1000, help="number of amplitudes (default: %(default)s)")
+	parser.add_argument("--max-amplitude", type=float, default=40.0)
+	parser.add_argument("--duration", type=float, default=DURATION, help="duration of the step (ms)")
+	parser.add_argument("--refinements", type=int, default=3)
+	parser.add_argument("--timestep", type=float, default=TIMESTEP)
+	parser.add_argument("--no-cache", action="store_true", help="do not read or write the result cache")
+	parser.add_argument("--cache-dir", default=DEFAULT_DIRECTORY)
+	parser.add_argument("--output", metavar="FILE", help="draw the curves into FILE")
+	args = parser.parse_args(argv)
+
+	panels = get_panels(args.panels)
+	parameters, initial_values = panel_parameters(panels)
+	start = default_timer()
+	curves = fi_curves(parameters, initial_values, np.linspace(0.0, args.max_amplitude, args.amplitudes),
+					   duration=args.duration, refinements=args.refinements, timestep=args.timestep,
+					   cache=None if args.no_cache else ResultCache(args.cache_dir))
+	print("panel   points   onset of firing   max steady rate   max first-ISI rate")
+	for panel, curve in zip(panels, curves):
+		interval = _onset_interval(curve['amplitude'], curve['steady_rate'], curve['first_isi_rate'])
+		print("%-5s %8d %17.3f %14.1f Hz %17.1f Hz" % (
+			panel['label'], len(curve['amplitude']), np.nan if interval is None else interval[1],
+			curve['steady_rate'].max(), curve['first_isi_rate'].max()))
+	print("%.1f s" % (default_timer() - start))
+	if args.output:
+		from izhikevich.plotting import use_offscreen_backend, save_figure
+		use_offscreen_backend()
+		save_figure(plot_curves(panels, curves), args.output)
+		print("F-I curves saved to %s" % args.output)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,404 @@
+"""
+Fitting of the parameters a, b, c and d of the Izhikevich cell to target spike
+trains, recorded in response to step and ramp stimuli like those of the panels
+of Fig. 1.
+
+	stimulus(), panel_stimulus()	a stimulus: i_offset steps and ramps over
+					`duration` ms, from v_init
+	simulate_spikes()		the spike trains of many candidate parameter
+					sets under many stimuli, as one population
+	van_rossum()			the van Rossum distance of many spike trains to
+					a target, at once
+	DifferentialEvolution, CMAES	population-based optimizers, asked for a
+					whole generation of candidates at a time
+	fit()				the parameters minimizing the summed distance of
+					their spike trains to the targets
+
+Each generation of the optimizer is simulated as one population of
+candidates x stimuli cells, and split into chunks simulated by a pool of
+worker processes. Spike trains are compared with the van Rossum distance
+(van Rossum 2001), with an exponential kernel of time constant `tau`, in closed
+form over all pairs of spikes: trains are padded with NaN to the same number
+of spikes, so that the distances of all candidates are computed with array
+operations.
+
+Differential evolution, the default, is the more robust of the two: CMA-ES
+needs fewer evaluations near a fit, but may stop in a local minimum for
+bursting cells. Parameters that the targets do not constrain (e.g. with a
+single spike) are not recovered.
+
+	>>> stimuli = [panel_stimulus(panel) for panel in get_panels(['A', 'G'])]
+	>>> result = fit(stimuli, targets, method='cmaes', generations=60)
+	>>> result['parameters'], result['cost']
+
+Run as a script, this module fits the parameters of a panel to its own spike
+train (or to the spike times in FILE, recorded under the panel's stimulus),
+as a check of the fit:
+
+	python -m izhikevich.fitting [--panel LABEL] [--target FILE] [--method de|cmaes] [--generations N]
+	                             [--population N] [--processes N] [--seed S]
+"""
+
+import argparse
+import multiprocessing
+from timeit import default_timer
+
+import numpy as np
+
+from izhikevich.engine import Engine
+from izhikevich.panels import i_offset_at
+from izhikevich.recording import SpikeRecorder
+from izhikevich.sources import RampCurrentSource
+
+
+PARAMETERS = ('a', 'b', 'c', 'd')
+# range searched for each parameter, by default
+BOUNDS = {
+	'a': (0.001, 0.2),
+	'b': (-0.1, 0.3),
+	'c': (-70.0, -40.0),
+	'd': (-2.0, 10.0),
+}
+TAU = 20.0
+TIMESTEP = 0.01
+MAX_SPIKES = 200
+
+
+def stimulus(duration, steps=(), ramps=(), i_offset=0.0, v_init=-70.0):
+	"""
+	A stimulus: i_offset, changed to amplitude at each (time, amplitude) of
+	`steps`, plus `ramps` (dicts of the arguments of sources.RampCurrentSource),
+	for `duration` ms, from v = v_init, u = b * v_init.
+	"""
+	return {'duration': duration, 'steps': list(steps), 'ramps': list(ramps), 'i_offset': i_offset, 'v_init': v_init}
+
+
+def panel_stimulus(panel):
+	"""The stimulus of a panel of Fig. 1 (see panels.py)."""
+	return stimulus(panel['duration'], panel['steps'], panel['ramps'], panel['parameters']['i_offset'],
+					panel['initial_values']['v'])
+
+
+def padded(cells, times, n_cells, max_spikes=MAX_SPIKES):
+	"""
+	Spike times of each of `n_cells` cells, as rows padded with NaN, of at most
+	`max_spikes` spikes, and the number of spikes of each cell left out.
+	"""
+	order = np.argsort(cells, kind='mergesort')
+	cells = cells[order]
+	times = times[order]
+	counts = np.bincount(cells, minlength=n_cells)
+	width = max(1, min(int(counts.max()) if counts.size else 0, max_spikes))
+	trains = np.full((n_cells, width), np.nan)
+	rank = np.arange(len(cells)) - np.repeat(np.cumsum(counts) - counts, counts)
+	kept = rank < width
+	trains[cells[kept], rank[kept]] = times[kept]
+	return trains, np.maximum(counts - width, 0)
+
+
+def simulate_spikes(candidates, stimuli, timestep=TIMESTEP, max_spikes=MAX_SPIKES):
+	"""
+	Spike trains of the candidate parameter sets `candidates` (an array of
+	shape (n, 4) of a, b, c, d) under each of `stimuli`, simulated as one
+	population of n x len(stimuli) cells: a list with, for each stimulus, an
+	array of shape (n, spikes), padded with NaN, of at most `max_spikes`
+	spikes (see padded()).
+	"""
+	return [trains for trains, dropped in _simulate(candidates, stimuli, timestep, max_spikes)]
+
+
+def _simulate(candidates, stimuli, timestep, max_spikes):
+	"""The spike trains of simulate_spikes(), each with the number of spikes left out of each train."""
+	candidates = np.atleast_2d(np.asarray(candidates, dtype=float))
+	n = len(candidates)
+	parameters = dict((name, np.tile(candidates[:, i], len(stimuli))) for i, name in enumerate(PARAMETERS))
+	v_init = np.repeat([s['v_init'] for s in stimuli], n).astype(float)
+	parameters['i_offset'] = np.repeat([s['i_offset'] for s in stimuli], n).astype(float)
+	engine = Engine(n * len(stimuli), parameters, {'v': v_init, 'u': parameters['b'] * v_init}, timestep)
+	for k, s in enumerate(stimuli):
+		for ramp in s['ramps']:
+			engine.inject(RampCurrentSource(**ramp), np.arange(k * n, (k + 1) * n))
+	spikes = engine.add_recorder(SpikeRecorder())
+
+	schedules = [dict(parameters={'i_offset': s['i_offset']}, steps=s['steps']) for s in stimuli]
+	for time in sorted(set(time for s in stimuli for time, amplitude in s['steps'])):
+		engine.run_until(time)
+		engine.set(i_offset=np.repeat([i_offset_at(schedule, time) for schedule in schedules], n))
+	engine.run_until(max(s['duration'] for s in stimuli))
+
+	cells, times = spikes.data()
+	results = []
+	for k, s in enumerate(stimuli):
+		# spikes after the end of a shorter stimulus do not count
+		selected = (cells >= k * n) & (cells < (k + 1) * n) & (times <= s['duration'])
+		results.append(padded(cells[selected] - k * n, times[selected], n, max_spikes))
+	return results
+
+
+def _kernel_sum(x, y, tau):
+	"""Sum of exp(-|x_i - y_j| / tau) over all pairs of spikes, for each row of x and y (NaN padded)."""
+	with np.errstate(invalid='ignore'):
+		terms = np.exp(-np.abs(x[:, :, np.newaxis] - y[:, np.newaxis, :]) / tau)
+	return np.nansum(terms, axis=(1, 2))
+
+
+def van_rossum(trains, target, tau=TAU, dropped=0):
+	"""
+	van Rossum distance, with time constant `tau` (ms), of each row of
+	`trains` (spike times padded with NaN) to the spike times `target`. It is
+	sqrt(n) for trains differing by n isolated spikes, e.g. by one extra spike.
+	`dropped`, the number of spikes of each train left out of `trains` (see
+	padded()), are counted as that many more isolated spikes.
+	"""
+	trains = np.atleast_2d(trains)
+	target = np.asarray(target, dtype=float)[np.newaxis, :]
+	squared = (_kernel_sum(trains, trains, tau) + _kernel_sum(target, target, tau)[0]
+			   - 2.0 * _kernel_sum(trains, np.broadcast_to(target, (len(trains), target.shape[1])), tau))
+	return np.sqrt(np.maximum(squared + dropped, 0.0))
+
+
+def cost(candidates, stimuli, targets, tau=TAU, timestep=TIMESTEP, max_spikes=MAX_SPIKES):
+	"""
+	Summed van Rossum distance of the spike trains of each candidate to the
+	targets, one per stimulus. Only the first `max_spikes` spikes of a train
+	are compared with the target (at least as many as the longest target has);
+	each spike after them adds as much as an isolated extra spike, so that
+	candidates firing far more than the targets are not underestimated.
+	"""
+	max_spikes = max([max_spikes] + [len(target) for target in targets])
+	return sum(van_rossum(trains, target, tau, dropped)
+			   for (trains, dropped), target in zip(_simulate(candidates, stimuli, timestep, max_spikes), targets))
+
+
+def _cost_task(task):
+	return cost(*task)
+
+
+class DifferentialEvolution(object):
+	"""
+	Differential evolution (DE/rand/1/bin, Storn and Price 1997) within
+	`bounds` (arrays of the lower and upper bounds of each parameter), with
+	`size` candidates per generation. ask() gives a generation to evaluate and
+	tell() their costs.
+	"""
+
+	def __init__(self, bounds, size=40, mutation=0.7, crossover=0.9, seed=None):
+		self.lower, self.upper = [np.asarray(bound, dtype=float) for bound in bounds]
+		self.size = size
+		self.mutation = mutation
+		self.crossover = crossover
+		self.rng = np.random.RandomState(seed)
+		self.population = self.lower + (self.upper - self.lower) * self.rng.rand(size, len(self.lower))
+		self.costs = None
+		self._trials = None
+
+	def ask(self):
+		if self.costs is None:
+			self._trials = self.population
+			return self._trials
+		n, dim = self.population.shape
+		# three distinct other candidates for each
+		others = np.array([self.rng.choice(np.delete(np.arange(n), i), 3, replace=False) for i in range(n)])
+		mutants = self.population[others[:, 0]] + self.mutation * (self.population[others[:, 1]] - self.population[others[:, 2]])
+		crossed = self.rng.rand(n, dim) < self.crossover
+		crossed[np.arange(n), self.rng.randint(dim, size=n)] = True
+		trials = np.where(crossed, mutants, self.population)
+		# reflect into the bounds
+		trials = np.where(trials < self.lower, 2 * self.lower - trials, trials)
+		trials = np.where(trials > self.upper, 2 * self.upper - trials, trials)
+		self._trials = np.clip(trials, self.lower, self.upper)
+		return self._trials
+
+	def tell(self, costs):
+		costs = np.asarray(costs, dtype=float)
+		if self.costs is None:
+			self.costs = costs
+			return
+		better = costs <= self.costs
+		self.population[better] = self._trials[better]
+		self.costs[better] = costs[better]
+
+	@property
+	def best(self):
+		i = np.argmin(self.costs)
+		return self.population[i], self.costs[i]
+
+
+class CMAES(object):
+	"""
+	The covariance matrix adaptation evolution strategy (Hansen 2016, "The CMA
+	Evolution Strategy: A Tutorial"), with `size` candidates per generation,
+	searching the box `bounds` scaled to the unit cube, from its centre with
+	step size `sigma`. Candidates outside the box are evaluated clipped to it,
+	with a penalty of `penalty` times their squared distance to it.
+	"""
+
+	def __init__(self, bounds, size=None, sigma=0.3, penalty=100.0, seed=None):
+		self.lower, self.upper = [np.asarray(bound, dtype=float) for bound in bounds]
+		dim = len(self.lower)
+		self.size = size or 4 + int(3 * np.log(dim))
+		self.rng = np.random.RandomState(seed)
+		self.mean = np.full(dim, 0.5)
+		self.sigma = sigma
+		self.penalty = penalty
+		mu = self.size // 2
+		weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+		self.weights = weights / weights.sum()
+		self.mu_eff = 1.0 / (self.weights ** 2).sum()
+		self.c_c = (4 + self.mu_eff / dim) / (dim + 4 + 2 * self.mu_eff / dim)
+		self.c_s = (self.mu_eff + 2) / (dim + self.mu_eff + 5)
+		self.c_1 = 2 / ((dim + 1.3) ** 2 + self.mu_eff)
+		self.c_mu = min(1 - self.c_1, 2 * (self.mu_eff - 2 + 1 / self.mu_eff) / ((dim + 2) ** 2 + self.mu_eff))
+		self.damps = 1 + 2 * max(0, np.sqrt((self.mu_eff - 1) / (dim + 1)) - 1) + self.c_s
+		self.chi_n = np.sqrt(dim) * (1 - 1.0 / (4 * dim) + 1.0 / (21 * dim ** 2))
+		self.p_c = np.zeros(dim)
+		self.p_s = np.zeros(dim)
+		self.C = np.eye(dim)
+		self.generation = 0
+		self.best_candidate = None
+		self.best_cost = np.inf
+
+	def _scale(self, x):
+		return self.lower + (self.upper - self.lower) * np.clip(x, 0.0, 1.0)
+
+	def ask(self):
+		eigenvalues, self._B = np.linalg.eigh(self.C)
+		self._D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+		z = self.rng.standard_normal((self.size, len(self.mean)))
+		self._y = np.dot(z * self._D, self._B.T)
+		self._x = self.mean + self.sigma * self._y
+		return self._scale(self._x)
+
+	def tell(self, costs):
+		costs = np.asarray(costs, dtype=float)
+		if costs.min() < self.best_cost:
+			self.best_cost = costs.min()
+			self.best_candidate = self._scale(self._x[np.argmin(costs)])
+		outside = self._x - np.clip(self._x, 0.0, 1.0)
+		order = np.argsort(costs + self.penalty * (outside ** 2).sum(axis=1))
+		mu = len(self.weights)
+		dim = len(self.mean)
+		y = self._y[order[:mu]]
+		y_w = np.dot(self.weights, y)
+		self.mean = self.mean + self.sigma * y_w
+		self.generation += 1
+		C_inv_sqrt = np.dot(self._B / self._D, self._B.T)
+		self.p_s = (1 - self.c_s) * self.p_s + np.sqrt(self.c_s * (2 - self.c_s) * self.mu_eff) * np.dot(C_inv_sqrt, y_w)
+		h_s = (np.linalg.norm(self.p_s) / np.sqrt(1 - (1 - self.c_s) ** (2 * self.generation))
+			   < (1.4 + 2.0 / (dim + 1)) * self.chi_n)
+		self.p_c = (1 - self.c_c) * self.p_c + h_s * np.sqrt(self.c_c * (2 - self.c_c) * self.mu_eff) * y_w
+		rank_mu = np.dot((self.weights[:, np.newaxis] * y).T, y)
+		self.C = ((1 - self.c_1 - self.c_mu) * self.C
+				  + self.c_1 * (np.outer(self.p_c, self.p_c) + (1 - h_s) * self.c_c * (2 - self.c_c) * self.C)
+				  + self.c_mu * rank_mu)
+		self.sigma *= np.exp((self.c_s / self.damps) * (np.linalg.norm(self.p_s) / self.chi_n - 1))
+
+	@property
+	def best(self):
+		return self.best_candidate, self.best_cost
+
+
+def fit(stimuli, targets, method='de', generations=100, population=None, bounds=None, tau=TAU, timestep=TIMESTEP,
+		processes=None, chunk_size=None, seed=None, tolerance=0.0, progress=None):
+	"""
+	The a, b, c, d minimizing the summed van Rossum distance of the spike trains
+	under `stimuli` to `targets` (the spike times under each stimulus), found
+	with `method` 'de' (DifferentialEvolution) or 'cmaes' (CMAES) within
+	`bounds` (a dict of (lower, upper) per parameter, BOUNDS by default), with
+	`population` candidates per generation (40 for 'de', 24 for 'cmaes' by
+	default: as a generation is simulated as one population, its size adds
+	little to the time per generation).
+
+	Each generation is simulated in chunks of `chunk_size` candidates (by
+	default, one per worker) by `processes` worker processes (one per CPU by
+	default; 1 to simulate in this process). The search stops after
+	`generations`, or once the best cost is at most `tolerance`. Trains longer
+	than MAX_SPIKES are scored as described in cost(). `progress`,
+	if given, is called with the generation, the best candidate and its cost.
+
+	Returns a dict with the best 'parameters' (a dict), their 'cost', the
+	best cost of each generation ('history') and the number of 'evaluations'.
+	"""
+	bounds = dict(BOUNDS, **(bounds or {}))
+	limits = (np.array([bounds[name][0] for name in PARAMETERS]), np.array([bounds[name][1] for name in PARAMETERS]))
+	if method == 'de':
+		optimizer = DifferentialEvolution(limits, population or 40, seed=seed)
+	elif method == 'cmaes':
+		optimizer = CMAES(limits, population or 24, seed=seed)
+	else:
+		raise ValueError("Unknown method '%s'" % method)
+	targets = [np.asarray(target, dtype=float) for target in targets]
+
+	processes = processes or multiprocessing.cpu_count()
+	pool = multiprocessing.Pool(processes) if processes > 1 else None
+	history = []
+	evaluations = 0
+	try:
+		for generation in range(generations):
+			candidates = optimizer.ask()
+			size = chunk_size or -(-len(candidates) // processes)
+			tasks = [(candidates[start:start + size], stimuli, targets, tau, timestep)
+					 for start in range(0, len(candidates), size)]
+			if pool is None:
+				costs = np.concatenate([_cost_task(task) for task in tasks])
+			else:
+				costs = np.concatenate(pool.map(_cost_task, tasks, chunksize=1))
+			optimizer.tell(costs)
+			evaluations += len(candidates)
+			best, best_cost = optimizer.best
+			history.append(best_cost)
+			if progress is not None:
+				progress(generation, best, best_cost)
+			if best_cost <= tolerance:
+				break
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+	best, best_cost = optimizer.best
+	return {
+		'parameters': dict(zip(PARAMETERS, best)),
+		'cost': best_cost,
+		'history': np.array(history),
+		'evaluations': evaluations,
+	}
+
+
+def main(argv=None):
+	from izhikevich.panels import get_panels
+
+	parser = argparse.ArgumentParser(description="Fit a, b, c, d to the spike train of a panel of Fig. 1")
+	parser.add_argument("--panel", default='A', help="panel whose stimulus (and spike train) to use")
+	parser.add_argument("--target", metavar="FILE", help="target spike times (ms), one per line")
+	parser.add_argument("--method", choices=['de', 'cmaes'], default='de')
+	parser.add_argument("--generations", type=int, default=100)
+	parser.add_argument("--population", type=int, help="candidates per generation")
+	parser.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+	parser.add_argument("--timestep", type=float, default=TIMESTEP)
+	parser.add_argument("--seed", type=int, default=1)
+	args = parser.parse_args(argv)
+
+	panel = get_panels([args.panel])[0]
+	stimuli = [panel_stimulus(panel)]
+	if args.target:
+		target = np.loadtxt(args.target, ndmin=1)
+	else:
+		target = simulate_spikes([[panel['parameters'][name] for name in PARAMETERS]], stimuli, args.timestep)[0][0]
+		target = target[~np.isnan(target)]
+
+	def progress(generation, best, best_cost):
+		if generation % 10 == 0:
+			print("generation %4d  cost %8.4f  a %.4f  b %.4f  c %.2f  d %.3f" % ((generation, best_cost) + tuple(best)))
+
+	start = default_timer()
+	result = fit(stimuli, [target], args.method, args.generations, args.population, timestep=args.timestep,
+				 processes=args.processes, seed=args.seed, progress=progress)
+	print("%d spikes in the target, cost %.4f after %d evaluations in %.1f s" % (
+		len(target), result['cost'], result['evaluations'], default_timer() - start))
+	print("fitted:  " + "  ".join("%s %.4g" % (name, result['parameters'][name]) for name in PARAMETERS))
+	if not args.target:
+		print("panel:   " + "  ".join("%s %.4g" % (name, panel['parameters'][name]) for name in PARAMETERS))
+
+
+if __name__ == '__main__':
+	main()
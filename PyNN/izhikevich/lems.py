@@ -0,0 +1,663 @@
+"""
+Runs LEMS simulations of point neurons, such as NeuroML2/LEMS_WhichModel.xml,
+in-process with NumPy instead of with jLEMS.
+
+	python -m izhikevich.lems [NeuroML2/LEMS_WhichModel.xml] [--output FILE]
+
+The Dynamics of every ComponentType (StateVariable, DerivedVariable,
+TimeDerivative, OnStart and OnCondition) are compiled into Python functions
+made of NumPy array operations. The populations of the network are grouped by
+ComponentType, so that each group, e.g. all izhikevichCell cells of
+WhichModel.nml, is advanced one forward-Euler step at a time by a single call
+of its compiled function, whatever the number of populations and cells. Inputs
+(explicitInput) are compiled the same way and summed into the DerivedVariables
+that reduce over the "synapses" attachments.
+
+Quantities are in ms and mV: the units of parameter values are converted, so
+that constants such as MSEC = 1ms and MVOLT = 1mV are 1.
+
+The core NeuroML2 ComponentTypes used by WhichModel.nml (izhikevichCell,
+pulseGeneratorDL and rampGeneratorDL), normally included from Cells.xml and
+Inputs.xml, are defined in CORE_TYPES, as NeuroML2's core files are not part
+of this repository.
+"""
+
+import argparse
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from timeit import default_timer
+
+import numpy as np
+
+
+CORE_INCLUDES = ('Cells.xml', 'Networks.xml', 'Inputs.xml', 'Simulation.xml', 'Synapses.xml',
+	'Channels.xml', 'PyNN.xml', 'NeuroMLCoreDimensions.xml', 'NeuroMLCoreCompTypes.xml')
+
+CORE_TYPES = """
+<Lems>
+	<ComponentType name="izhikevichCell" extends="baseCellMembPot">
+		<Parameter name="v0" dimension="voltage"/>
+		<Parameter name="a" dimension="none"/>
+		<Parameter name="b" dimension="none"/>
+		<Parameter name="c" dimension="none"/>
+		<Parameter name="d" dimension="none"/>
+		<Parameter name="thresh" dimension="voltage"/>
+		<Constant name="MSEC" dimension="time" value="1ms"/>
+		<Constant name="MVOLT" dimension="voltage" value="1mV"/>
+		<Attachments name="synapses" type="basePointCurrentDL"/>
+		<Exposure name="U" dimension="none"/>
+		<Dynamics>
+			<StateVariable name="v" dimension="voltage" exposure="v"/>
+			<StateVariable name="U" dimension="none" exposure="U"/>
+			<DerivedVariable name="ISyn" dimension="none" select="synapses[*]/I" reduce="add"/>
+			<TimeDerivative variable="v" value="(0.04 * v^2 / MVOLT + 5 * v + (140.0 - U + ISyn) * MVOLT)/MSEC"/>
+			<TimeDerivative variable="U" value="a * (b * v / MVOLT - U) / MSEC"/>
+			<OnStart>
+				<StateAssignment variable="v" value="v0"/>
+				<StateAssignment variable="U" value="v0 * b / MVOLT"/>
+			</OnStart>
+			<OnCondition test="v .gt. thresh">
+				<StateAssignment variable="v" value="c * MVOLT"/>
+				<StateAssignment variable="U" value="U + d"/>
+				<EventOut port="spike"/>
+			</OnCondition>
+		</Dynamics>
+	</ComponentType>
+
+	<ComponentType name="pulseGeneratorDL" extends="basePointCurrentDL">
+		<Parameter name="delay" dimension="time"/>
+		<Parameter name="duration" dimension="time"/>
+		<Parameter name="amplitude" dimension="none"/>
+		<Dynamics>
+			<StateVariable name="I" dimension="none" exposure="I"/>
+			<OnCondition test="t .lt. delay">
+				<StateAssignment variable="I" value="0"/>
+			</OnCondition>
+			<OnCondition test="t .geq. delay .and. t .lt. duration + delay">
+				<StateAssignment variable="I" value="amplitude"/>
+			</OnCondition>
+			<OnCondition test="t .geq. duration + delay">
+				<StateAssignment variable="I" value="0"/>
+			</OnCondition>
+		</Dynamics>
+	</ComponentType>
+
+	<ComponentType name="rampGeneratorDL" extends="basePointCurrentDL">
+		<Parameter name="delay" dimension="time"/>
+		<Parameter name="duration" dimension="time"/>
+		<Parameter name="startAmplitude" dimension="none"/>
+		<Parameter name="finishAmplitude" dimension="none"/>
+		<Parameter name="baselineAmplitude" dimension="none"/>
+		<Dynamics>
+			<StateVariable name="I" dimension="none" exposure="I"/>
+			<OnCondition test="t .lt. delay">
+				<StateAssignment variable="I" value="baselineAmplitude"/>
+			</OnCondition>
+			<OnCondition test="t .geq. delay .and. t .lt. duration + delay">
+				<StateAssignment variable="I" value="startAmplitude + (finishAmplitude - startAmplitude) * (t - delay) / duration"/>
+			</OnCondition>
+			<OnCondition test="t .geq. duration + delay">
+				<StateAssignment variable="I" value="baselineAmplitude"/>
+			</OnCondition>
+		</Dynamics>
+	</ComponentType>
+</Lems>
+"""
+
+# Factors converting quantities to ms, mV and the units derived from them
+UNITS = {
+	'': 1.0,
+	's': 1e3, 'ms': 1.0, 'us': 1e-3,
+	'V': 1e3, 'mV': 1.0, 'uV': 1e-3,
+	'Hz': 1e-3, 'per_s': 1e-3, 'per_ms': 1.0,
+}
+
+FUNCTIONS = ('exp', 'log', 'sqrt', 'sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh', 'abs', 'ceil', 'floor')
+
+_QUANTITY = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([A-Za-z_]*)\s*$")
+
+
+def quantity(text):
+	"""Value of a LEMS quantity such as "-70mV" or "0.01ms", in ms/mV units."""
+	match = _QUANTITY.match(text)
+	if match is None:
+		raise ValueError("Not a quantity: '%s'" % text)
+	value, unit = match.groups()
+	if unit not in UNITS:
+		raise ValueError("Unknown unit '%s' in '%s'" % (unit, text))
+	return float(value) * UNITS[unit]
+
+
+def _tag(element):
+	return element.tag.rsplit('}', 1)[-1]
+
+
+# Expressions
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|(\.[a-z]+\.)|([A-Za-z_]\w*)|(.))")
+
+_COMPARISONS = {'.gt.': '>', '.lt.': '<', '.geq.': '>=', '.leq.': '<=', '.eq.': '==', '.neq.': '!='}
+
+
+class _ExpressionCompiler(object):
+	"""
+	Recursive-descent translation of a LEMS expression into Python source
+	operating on NumPy arrays, every operation explicitly parenthesized.
+	`rename` maps each variable name to the source that evaluates it.
+	"""
+
+	def __init__(self, text, rename):
+		self.text = text
+		self.rename = rename
+		self.tokens = []
+		for number, operator, name, symbol in _TOKEN.findall(text):
+			if number:
+				self.tokens.append(('number', number))
+			elif operator:
+				self.tokens.append(('operator', operator))
+			elif name:
+				self.tokens.append(('name', name))
+			elif symbol.strip():
+				self.tokens.append(('symbol', symbol))
+		self.position = 0
+
+	def _peek(self):
+		if self.position < len(self.tokens):
+			return self.tokens[self.position]
+		return (None, None)
+
+	def _next(self):
+		token = self._peek()
+		self.position += 1
+		return token
+
+	def _expect(self, value):
+		kind, token = self._next()
+		if token != value:
+			raise ValueError("Expected '%s' in expression '%s'" % (value, self.text))
+
+	def compile(self):
+		source = self._or()
+		if self.position != len(self.tokens):
+			raise ValueError("Unexpected '%s' in expression '%s'" % (self._peek()[1], self.text))
+		return source
+
+	def _or(self):
+		source = self._and()
+		while self._peek()[1] == '.or.':
+			self._next()
+			source = "np.logical_or(%s, %s)" % (source, self._and())
+		return source
+
+	def _and(self):
+		source = self._not()
+		while self._peek()[1] == '.and.':
+			self._next()
+			source = "np.logical_and(%s, %s)" % (source, self._not())
+		return source
+
+	def _not(self):
+		if self._peek()[1] == '.not.':
+			self._next()
+			return "np.logical_not(%s)" % self._not()
+		return self._comparison()
+
+	def _comparison(self):
+		source = self._sum()
+		if self._peek()[1] in _COMPARISONS:
+			operator = _COMPARISONS[self._next()[1]]
+			source = "(%s %s %s)" % (source, operator, self._sum())
+		return source
+
+	def _sum(self):
+		source = self._product()
+		while self._peek()[1] in ('+', '-'):
+			operator = self._next()[1]
+			source = "(%s %s %s)" % (source, operator, self._product())
+		return source
+
+	def _product(self):
+		source = self._unary()
+		while self._peek()[1] in ('*', '/'):
+			operator = self._next()[1]
+			source = "(%s %s %s)" % (source, operator, self._unary())
+		return source
+
+	def _unary(self):
+		if self._peek()[1] in ('-', '+'):
+			operator = self._next()[1]
+			return "(%s%s)" % (operator, self._unary())
+		return self._power()
+
+	def _power(self):
+		source = self._atom()
+		if self._peek()[1] == '^':
+			self._next()
+			source = "(%s ** %s)" % (source, self._unary())
+		return source
+
+	def _atom(self):
+		kind, token = self._next()
+		if kind == 'number':
+			return token
+		if token == '(':
+			source = self._or()
+			self._expect(')')
+			return source
+		if kind == 'name':
+			if self._peek()[1] == '(':
+				if token not in FUNCTIONS:
+					raise ValueError("Unknown function '%s' in expression '%s'" % (token, self.text))
+				self._next()
+				argument = self._or()
+				self._expect(')')
+				return "np.%s(%s)" % ('absolute' if token == 'abs' else token, argument)
+			if token not in self.rename:
+				raise ValueError("Unknown variable '%s' in expression '%s'" % (token, self.text))
+			return self.rename[token]
+		raise ValueError("Unexpected '%s' in expression '%s'" % (token, self.text))
+
+
+def compile_expression(text, rename):
+	"""
+	Python source evaluating the LEMS expression `text`, with each variable
+	replaced by rename[variable]. Raises ValueError if the expression is not
+	well formed, or uses a function or variable that is not known.
+	"""
+	return _ExpressionCompiler(text, rename).compile()
+
+
+# Model
+
+class ComponentType(object):
+
+	def __init__(self, element):
+		self.name = element.get('name')
+		self.extends = element.get('extends')
+		self.parameters = []
+		self.constants = {}
+		self.state_variables = []
+		self.derived_variables = []
+		self.reductions = {}
+		self.time_derivatives = []
+		self.on_start = []
+		self.on_conditions = []
+		for child in element:
+			tag = _tag(child)
+			if tag == 'Parameter':
+				self.parameters.append(child.get('name'))
+			elif tag == 'Constant':
+				self.constants[child.get('name')] = quantity(child.get('value'))
+			elif tag == 'Dynamics':
+				self._read_dynamics(child)
+
+	def _read_dynamics(self, dynamics):
+		for child in dynamics:
+			tag = _tag(child)
+			if tag == 'StateVariable':
+				self.state_variables.append(child.get('name'))
+			elif tag == 'DerivedVariable':
+				if child.get('select'):
+					# e.g. select="synapses[*]/I" reduce="add": sum of I over the attached inputs
+					attachments, variable = child.get('select').split('/')
+					if child.get('reduce', 'add') != 'add' or not attachments.endswith('[*]'):
+						raise ValueError("Only select=\"<attachments>[*]/<variable>\" reduce=\"add\" is supported")
+					self.reductions[child.get('name')] = (attachments[:-3], variable)
+				else:
+					self.derived_variables.append((child.get('name'), child.get('value')))
+			elif tag == 'TimeDerivative':
+				self.time_derivatives.append((child.get('variable'), child.get('value')))
+			elif tag == 'OnStart':
+				self.on_start = [(assignment.get('variable'), assignment.get('value')) for assignment in child
+								 if _tag(assignment) == 'StateAssignment']
+			elif tag == 'OnCondition':
+				assignments = [(assignment.get('variable'), assignment.get('value')) for assignment in child
+							   if _tag(assignment) == 'StateAssignment']
+				emits = any(_tag(action) == 'EventOut' for action in child)
+				self.on_conditions.append((child.get('test'), assignments, emits))
+
+	def arrays(self):
+		"""Names of the per-cell values of a component of this type."""
+		return (self.parameters + self.state_variables + [name for name, value in self.derived_variables]
+				+ sorted(self.reductions))
+
+	def kernel_source(self):
+		"""
+		Python source of the functions start(parameters, state) and
+		update(t, dt, parameters, state, reduced), which initialize and advance
+		by one time step the arrays of a group of components of this type.
+		update() returns the indices of the components that emitted an event.
+		"""
+		lines = ["def start(parameters, state):"]
+		lines += self._bind(with_state=False)
+		for variable, value in self.on_start:
+			lines.append("\tstate[%r][:] = %s" % (variable, self._compile(value)))
+		lines.append("")
+
+		lines.append("def update(t, dt, parameters, state, reduced):")
+		lines += self._bind(with_state=True)
+		for name, value in self.derived_variables:
+			lines.append("\t%s = %s" % (name, self._compile(value)))
+		for variable, value in self.time_derivatives:
+			lines.append("\td_%s = %s" % (variable, self._compile(value)))
+		for variable, value in self.time_derivatives:
+			lines.append("\t%s += dt * d_%s" % (variable, variable))
+		lines.append("\tevents = None")
+		for number, (test, assignments, emits) in enumerate(self.on_conditions):
+			index = "fired%d" % number
+			lines.append("\t%s = np.flatnonzero(%s)" % (index, self._compile(test)))
+			lines.append("\tif %s.size:" % index)
+			# all values are computed before any is assigned
+			for variable, value in assignments:
+				lines.append("\t\tnew_%s = %s" % (variable, self._compile(value, index)))
+			for variable, value in assignments:
+				lines.append("\t\t%s[%s] = new_%s" % (variable, index, variable))
+			if emits:
+				lines.append("\t\tevents = %s if events is None else np.union1d(events, %s)" % (index, index))
+		lines.append("\treturn events")
+		return "\n".join(lines) + "\n"
+
+	def _bind(self, with_state):
+		lines = ["\t%s = %r" % (name, value) for name, value in sorted(self.constants.items())]
+		lines += ["\t%s = parameters[%r]" % (name, name) for name in self.parameters]
+		if with_state:
+			lines += ["\t%s = state[%r]" % (name, name) for name in self.state_variables]
+			lines += ["\t%s = reduced[%r]" % (name, name) for name in sorted(self.reductions)]
+		return lines
+
+	def _compile(self, text, index=None):
+		rename = dict((name, name) for name in self.constants)
+		rename['t'] = 't'
+		for name in self.arrays():
+			rename[name] = name if index is None else "%s[%s]" % (name, index)
+		return compile_expression(text, rename)
+
+	def compile(self):
+		namespace = {'np': np}
+		exec(compile(self.kernel_source(), "<LEMS %s>" % self.name, 'exec'), namespace)
+		return namespace['start'], namespace['update']
+
+
+class Model(object):
+	"""ComponentTypes, Components, networks and simulations read from LEMS/NeuroML2 files."""
+
+	def __init__(self):
+		self.component_types = {}
+		self.components = {}
+		self.networks = {}
+		self.simulations = {}
+		self.target = None
+		self._included = set()
+
+	def load(self, filename):
+		filename = os.path.abspath(filename)
+		if filename in self._included:
+			return self
+		self._included.add(filename)
+		self._read(ElementTree.parse(filename).getroot(), os.path.dirname(filename))
+		return self
+
+	def load_core(self):
+		if 'core' not in self._included:
+			self._included.add('core')
+			self._read(ElementTree.fromstring(CORE_TYPES), None)
+
+	def _read(self, root, directory):
+		for element in root:
+			tag = _tag(element)
+			if tag == 'Include':
+				name = element.get('file') or element.get('href')
+				path = os.path.join(directory or '', name)
+				if os.path.exists(path):
+					self.load(path)
+				elif os.path.basename(name) in CORE_INCLUDES:
+					self.load_core()
+				else:
+					raise IOError("Included file not found: %s" % path)
+			elif tag == 'Target':
+				self.target = element.get('component')
+			elif tag == 'ComponentType':
+				self.component_types[element.get('name')] = ComponentType(element)
+			elif tag == 'network':
+				self.networks[element.get('id')] = element
+			elif tag == 'Simulation':
+				self.simulations[element.get('id')] = element
+			elif element.get('id') is not None:
+				type_name = element.get('type') if tag == 'Component' else tag
+				self.components[element.get('id')] = (type_name, dict(element.attrib))
+
+	def component_type(self, component_id):
+		type_name = self.components[component_id][0]
+		if type_name not in self.component_types:
+			self.load_core()
+		if type_name not in self.component_types:
+			raise ValueError("Unknown ComponentType '%s' of component '%s'" % (type_name, component_id))
+		return self.component_types[type_name]
+
+
+def load(filename):
+	return Model().load(filename)
+
+
+# Simulation
+
+class _Group(object):
+	"""All instances of the components of one ComponentType, as arrays."""
+
+	def __init__(self, component_type):
+		self.component_type = component_type
+		self.start, self.update = component_type.compile()
+		self.values = dict((name, []) for name in component_type.parameters)
+		self.size = 0
+
+	def add(self, attributes, count=1):
+		for name in self.component_type.parameters:
+			if name not in attributes:
+				raise ValueError("Parameter '%s' of %s missing" % (name, self.component_type.name))
+			self.values[name].extend([quantity(attributes[name])] * count)
+		first = self.size
+		self.size += count
+		return first
+
+	def build(self):
+		self.parameters = dict((name, np.array(values, dtype=float)) for name, values in self.values.items())
+		self.state = dict((name, np.zeros(self.size)) for name in self.component_type.state_variables)
+		self.reduced = dict((name, np.zeros(self.size)) for name in self.component_type.reductions)
+		self.start(self.parameters, self.state)
+
+
+class Results(object):
+
+	def __init__(self, times, traces, spikes):
+		self.times = times
+		self.traces = traces
+		self.spikes = spikes
+
+	def trace(self, quantity):
+		"""Recorded values of a quantity such as "popA[0]/v" or "popA[0]/iA/I"."""
+		return self.traces[quantity]
+
+	def spike_times(self, population, index=0):
+		cells, times = self.spikes[population]
+		return times[cells == index]
+
+
+class Simulation(object):
+	"""
+	A network of a Model, compiled into one group of arrays per ComponentType.
+
+		>>> simulation = Simulation(load("NeuroML2/LEMS_WhichModel.xml"))
+		>>> results = simulation.run()
+		>>> v = results.trace("popA[0]/v")
+	"""
+
+	def __init__(self, model, simulation_id=None):
+		simulation_id = simulation_id or model.target or sorted(model.simulations)[0]
+		element = model.simulations[simulation_id]
+		self.length = quantity(element.get('length'))
+		self.timestep = quantity(element.get('step'))
+		self.quantities = [line.get('quantity') for line in element.iter()
+						   if _tag(line) in ('Line', 'OutputColumn')]
+
+		self.groups = {}
+		self.populations = {}
+		self.inputs = []
+		network = model.networks[element.get('target')]
+		for child in network:
+			if _tag(child) == 'population':
+				component_id = child.get('component')
+				group = self._group(model, component_id)
+				size = int(child.get('size', 1))
+				self.populations[child.get('id')] = (group, group.add(model.components[component_id][1], size), size)
+		for child in network:
+			if _tag(child) == 'explicitInput':
+				population, index = re.match(r"^(\w+)\[(\d+)\]$", child.get('target')).groups()
+				component_id = child.get('input')
+				group = self._group(model, component_id)
+				position = group.add(model.components[component_id][1])
+				cells, first, size = self.populations[population]
+				self.inputs.append((child.get('destination', 'synapses'), component_id, population, int(index),
+									group, position, cells, first + int(index)))
+		for group in self.groups.values():
+			group.build()
+
+		# the inputs summed into each reduction, as (input group, input indices, target indices)
+		self.reductions = []
+		for cells in self.groups.values():
+			for name, (attachments, variable) in sorted(cells.component_type.reductions.items()):
+				for group in self.groups.values():
+					attached = [(position, target) for destination, component_id, population, index, input_group,
+								position, target_group, target in self.inputs
+								if input_group is group and target_group is cells and destination == attachments]
+					if attached:
+						positions, targets = [np.array(values, dtype=np.intp) for values in zip(*attached)]
+						self.reductions.append((cells, name, group, variable, positions, targets))
+
+	def _group(self, model, component_id):
+		component_type = model.component_type(component_id)
+		if component_type.name not in self.groups:
+			self.groups[component_type.name] = _Group(component_type)
+		return self.groups[component_type.name]
+
+	def _locate(self, quantity):
+		"""(group, variable, index) of a recorded quantity."""
+		parts = quantity.split('/')
+		population, index = re.match(r"^(\w+)\[(\d+)\]$", parts[0]).groups()
+		group, first, size = self.populations[population]
+		if len(parts) == 2:
+			return group, parts[1], first + int(index)
+		for destination, component_id, input_population, input_index, input_group, position, cells, target in self.inputs:
+			if input_population == population and input_index == int(index) and component_id == parts[1]:
+				return input_group, parts[2], position
+		raise ValueError("No input '%s' on %s[%s]" % (parts[1], population, index))
+
+	def run(self, quantities=None):
+		"""Simulate for the length of the Simulation, recording `quantities` (those displayed by default)."""
+		if quantities is None:
+			quantities = self.quantities
+		n_steps = int(round(self.length / self.timestep))
+		timestep = self.timestep
+
+		# one gather per (group, variable) and time step, whatever the number of quantities
+		recorded = {}
+		for name in quantities:
+			group, variable, index = self._locate(name)
+			recorded.setdefault((id(group), variable), (group, variable, []))[2].append((name, index))
+		recordings = []
+		for group, variable, entries in recorded.values():
+			indices = np.array([index for name, index in entries], dtype=np.intp)
+			recordings.append((group, variable, indices, [name for name, index in entries],
+							   np.empty((n_steps + 1, len(indices)))))
+
+		cell_groups = [group for group in self.groups.values() if group.component_type.reductions]
+		input_groups = [group for group in self.groups.values() if not group.component_type.reductions]
+		events = dict((name, []) for name in self.groups)
+
+		def sample(row):
+			for group, variable, indices, names, values in recordings:
+				source = group.state[variable] if variable in group.state else group.reduced[variable]
+				values[row] = source[indices]
+
+		for group in input_groups:
+			group.update(0.0, timestep, group.parameters, group.state, group.reduced)
+		sample(0)
+		for step in range(n_steps):
+			t = step * timestep
+			for group in input_groups:
+				group.update(t, timestep, group.parameters, group.state, group.reduced)
+			for cells, name, group, variable, positions, targets in self.reductions:
+				cells.reduced[name][:] = 0.0
+			for cells, name, group, variable, positions, targets in self.reductions:
+				cells.reduced[name] += np.bincount(targets, weights=group.state[variable][positions],
+												   minlength=cells.size)
+			for group in cell_groups:
+				fired = group.update(t, timestep, group.parameters, group.state, group.reduced)
+				if fired is not None:
+					events[group.component_type.name].append((step + 1, fired))
+			sample(step + 1)
+
+		traces = {}
+		for group, variable, indices, names, values in recordings:
+			for column, name in enumerate(names):
+				traces[name] = values[:, column]
+		spikes = {}
+		for population, (group, first, size) in self.populations.items():
+			steps = [np.full(len(fired), step) for step, fired in events[group.component_type.name]]
+			cells = [fired for step, fired in events[group.component_type.name]]
+			steps = np.concatenate(steps) if steps else np.zeros(0, dtype=np.intp)
+			cells = np.concatenate(cells) if cells else np.zeros(0, dtype=np.intp)
+			mine = (cells >= first) & (cells < first + size)
+			spikes[population] = (cells[mine] - first, steps[mine] * timestep)
+		return Results(np.arange(n_steps + 1) * timestep, traces, spikes)
+
+
+def run(filename, simulation_id=None, quantities=None):
+	return Simulation(load(filename), simulation_id).run(quantities)
+
+
+def _plot(results, simulation, filename):
+	from izhikevich.decimate import decimate
+	from izhikevich.plotting import use_offscreen_backend, save_figure, FIGURE_SIZE
+	import matplotlib.pyplot as plt
+	use_offscreen_backend()
+	populations = sorted(simulation.populations)
+	fig = plt.figure(facecolor='white', figsize=FIGURE_SIZE)
+	columns = 4
+	rows = (len(populations) + columns - 1) // columns
+	fig.subplots_adjust(hspace=0.4)
+	for number, population in enumerate(populations):
+		ax = fig.add_subplot(rows, columns, number + 1)
+		ax.set_title(population)
+		for name in simulation.quantities:
+			if name.startswith(population + "[") and name.endswith("/v"):
+				ax.plot(*decimate(results.times, results.trace(name), 400))
+	save_figure(fig, filename)
+
+
+def main():
+	default = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+		'NeuroML2', 'LEMS_WhichModel.xml')
+	parser = argparse.ArgumentParser(description="Run a LEMS simulation with NumPy.")
+	parser.add_argument("filename", nargs="?", default=os.path.normpath(default))
+	parser.add_argument("--output", metavar="FILE", help="save the membrane potentials to FILE (.png, .svg, ...)")
+	args = parser.parse_args()
+
+	start = default_timer()
+	simulation = Simulation(load(args.filename))
+	compiled = default_timer()
+	results = simulation.run()
+	finished = default_timer()
+
+	print("Loaded and compiled %s in %.1f ms, ComponentTypes: %s" % (args.filename, 1e3 * (compiled - start),
+		", ".join("%s (%d)" % (name, group.size) for name, group in sorted(simulation.groups.items()))))
+	print("Simulated %g ms in steps of %g ms in %.2f s" % (simulation.length, simulation.timestep, finished - compiled))
+	for population in sorted(simulation.populations):
+		print("%s: %d spikes" % (population, len(results.spikes[population][1])))
+	if args.output:
+		_plot(results, simulation, args.output)
+		print("Figure saved to %s" % args.output)
+
+
+if __name__ == '__main__':
+	main()
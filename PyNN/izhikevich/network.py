@@ -0,0 +1,183 @@
+"""
+The random network of Izhikevich (2003), "Simple Model of Spiking Neurons"
+(spnet.m), at any size, on the NumPy engine.
+
+80% of the cells are excitatory, regular spiking cells with c = -65 + 15 r^2 and
+d = 8 - 6 r^2, and 20% inhibitory, fast spiking cells with a = 0.02 + 0.08 r and
+b = 0.25 - 0.05 r, r being uniform on [0, 1] and drawn for every cell. Every
+cell receives a random thalamic input, 5 * randn for excitatory and 2 * randn
+for inhibitory cells, redrawn every millisecond.
+
+The original network of 1000 cells is connected all-to-all. Here every cell
+instead projects onto `fanout` cells drawn at random (fixed fan-out), with the
+weights of the original scaled by 1000 / fanout, so that a cell receives the
+same mean synaptic input whatever the size of the network: uniform on
+[0, 0.5] for excitatory and on [-1, 0] for inhibitory synapses, before scaling.
+A weight is the jump in v of the target cell, 1 ms after the spike, as in the
+original, and synapses are stored and delivered as synapses.Synapses.
+With fanout = 1000 the cells fire at about 8 Hz, as in the original; fewer,
+larger synapses make the input fluctuate more, and the cells fire faster
+(about 20 Hz with the default fanout of 100).
+
+	>>> network = Network(100000, seed=1)
+	>>> performance = network.run(1000.0)
+	>>> performance['steps_per_second'], performance['spikes_per_second']
+
+"""
+
+import multiprocessing
+from timeit import default_timer
+
+import numpy as np
+
+from izhikevich.checkpoint import rng_state, set_rng_state, save, load
+from izhikevich.engine import Engine
+from izhikevich.recording import SpikeRecorder, SpikeStatisticsRecorder
+from izhikevich.synapses import Synapses
+
+
+EXCITATORY_FRACTION = 0.8
+NOISE = (5.0, 2.0)  # excitatory, inhibitory
+NOISE_INTERVAL = 1.0
+DELAY = 1.0
+REFERENCE_SIZE = 1000
+DEFAULT_FANOUT = 100
+TIMESTEP = 0.5
+SIZES = (1000, 10000, 100000, 1000000)
+
+# rows of the connectivity drawn at a time, to bound the memory of temporaries
+_BLOCK = 65536
+
+
+def cell_parameters(n_excitatory, n_inhibitory, rng):
+	"""a, b, c, d of the excitatory cells followed by the inhibitory cells."""
+	re = rng.rand(n_excitatory)
+	ri = rng.rand(n_inhibitory)
+	return {
+		'a': np.concatenate([np.full(n_excitatory, 0.02), 0.02 + 0.08 * ri]),
+		'b': np.concatenate([np.full(n_excitatory, 0.2), 0.25 - 0.05 * ri]),
+		'c': np.concatenate([-65.0 + 15.0 * re ** 2, np.full(n_inhibitory, -65.0)]),
+		'd': np.concatenate([8.0 - 6.0 * re ** 2, np.full(n_inhibitory, 2.0)]),
+	}
+
+
+def connect(size, n_excitatory, fanout, rng):
+	"""
+	Targets (int32) and weights (float32) of the `fanout` synapses of each
+	cell, as arrays of shape (size, fanout). Cells below `n_excitatory` are
+	excitatory.
+	"""
+	targets = np.empty((size, fanout), dtype=np.int32)
+	weights = np.empty((size, fanout), dtype=np.float32)
+	scale = float(REFERENCE_SIZE) / fanout
+	for start in range(0, size, _BLOCK):
+		stop = min(start + _BLOCK, size)
+		targets[start:stop] = rng.randint(0, size, (stop - start, fanout))
+		weights[start:stop] = rng.rand(stop - start, fanout)
+	weights[:n_excitatory] *= 0.5 * scale
+	weights[n_excitatory:] *= -scale
+	return targets, weights
+
+
+class ThalamicNoise(object):
+	"""
+	Engine input: a Gaussian current of standard deviation `sigma` (one value
+	per cell), drawn anew every `interval` ms.
+	"""
+
+	def __init__(self, sigma, interval=NOISE_INTERVAL, seed=None):
+		self.sigma = np.asarray(sigma, dtype=float)
+		self.interval = interval
+		self.rng = np.random.RandomState(seed)
+		self._current = None
+
+	def add_current(self, engine, I):
+		steps = max(1, int(round(self.interval / engine.timestep)))
+		if self._current is None or engine.step_count % steps == 0:
+			self._current = self.rng.standard_normal(engine.size)
+			self._current *= self.sigma
+		I += self._current
+
+	def checkpoint(self):
+		arrays = rng_state(self.rng)
+		if self._current is not None:
+			arrays['current'] = self._current
+		return arrays
+
+	def restore(self, arrays):
+		set_rng_state(self.rng, arrays)
+		self._current = arrays['current'] if 'current' in arrays else None
+
+
+class Network(object):
+
+	def __init__(self, size, fanout=DEFAULT_FANOUT, timestep=TIMESTEP, seed=None, record_spikes=False):
+		rng = np.random.RandomState(seed)
+		self.size = size
+		self.n_excitatory = int(round(size * EXCITATORY_FRACTION))
+		n_inhibitory = size - self.n_excitatory
+		parameters = cell_parameters(self.n_excitatory, n_inhibitory, rng)
+		self.engine = Engine(size, parameters, {'v': -65.0, 'u': -65.0 * parameters['b']}, timestep=timestep)
+		sigma = np.concatenate([np.full(self.n_excitatory, NOISE[0]), np.full(n_inhibitory, NOISE[1])])
+		self.noise = self.engine.add_input(ThalamicNoise(sigma, seed=rng.randint(2 ** 31)))
+		targets, weights = connect(size, self.n_excitatory, fanout, rng)
+		indptr = np.arange(size + 1, dtype=np.int64) * fanout
+		self.synapses = Synapses(indptr, targets.reshape(-1), weights.reshape(-1), size, DELAY, timestep)
+		self.synapses.connect(self.engine, self.engine)
+		self.statistics = self.engine.add_recorder(SpikeStatisticsRecorder(size))
+		self.spikes = self.engine.add_recorder(SpikeRecorder()) if record_spikes else None
+
+	def save(self, filename):
+		"""Save a checkpoint of the network to `filename` (see checkpoint.py)."""
+		save(filename, [self.engine])
+
+	def restore(self, filename):
+		"""Continue from a checkpoint saved by save(), of a network built with the same arguments."""
+		load(filename, [self.engine])
+
+	def run(self, duration):
+		"""Simulate for `duration` ms; return the number of steps and spikes and their rates per second."""
+		steps = self.engine.step_count
+		spikes = self.statistics.count.sum()
+		start = default_timer()
+		self.engine.run(duration)
+		wall = default_timer() - start
+		steps = self.engine.step_count - steps
+		spikes = int(self.statistics.count.sum() - spikes)
+		return {
+			'size': self.size,
+			'duration': duration,
+			'steps': steps,
+			'spikes': spikes,
+			'wall': wall,
+			'steps_per_second': steps / wall,
+			'spikes_per_second': spikes / wall,
+			'rate': 1000.0 * spikes / (duration * self.size),
+		}
+
+
+def _run_size(task):
+	from izhikevich.benchmark import peak_memory
+	size, duration, fanout, timestep, seed = task
+	start = default_timer()
+	network = Network(size, fanout, timestep, seed)
+	build = default_timer() - start
+	performance = network.run(duration)
+	performance.update(fanout=fanout, timestep=timestep, build=build, peak_memory=peak_memory())
+	return performance
+
+
+def benchmark_sizes(sizes=SIZES, duration=1000.0, fanout=DEFAULT_FANOUT, timestep=TIMESTEP, seed=1, progress=None):
+	"""Build and run a network of each size in its own process, one after another."""
+	pool = multiprocessing.Pool(1, maxtasksperchild=1)
+	records = []
+	try:
+		tasks = [(size, duration, fanout, timestep, seed) for size in sizes]
+		for record in pool.imap(_run_size, tasks, chunksize=1):
+			records.append(record)
+			if progress is not None:
+				progress(record)
+	finally:
+		pool.close()
+		pool.join()
+	return records
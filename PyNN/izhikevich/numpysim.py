@@ -0,0 +1,666 @@
+"""
+A pure NumPy simulator backend with the subset of the PyNN API used by the
+scripts in this directory, so that they can be run with
+
+	python izhikevich2004.py numpy
+
+The cell types are Izhikevich and its variants of figure1.m,
+GeneralizedIzhikevich and AccommodationIzhikevich. Each Population is backed by an
+engine.Engine, which holds v and u for all its cells in contiguous arrays and
+advances them together with array operations, so that populations of 10^6
+cells can be simulated on one core.
+
+Beyond the PyNN API, save_checkpoint() and restore_checkpoint() save and load
+the complete state of a simulation, and run() and run_until() can save a
+checkpoint at regular intervals (see checkpoint.py), and setup(dtype=np.float32)
+runs all populations in single precision (see engine.py).
+"""
+
+import os
+import warnings
+
+import numpy as np
+
+from izhikevich import checkpoint
+from izhikevich.engine import Engine, DEFAULT_PARAMETERS, DEFAULT_INITIAL_VALUES
+from izhikevich.recording import StateRecorder, StreamingRecorder, SpikeRecorder, AnalogSignal, SpikeTrain, Block, Segment
+from izhikevich.sources import DCSource, StepCurrentSource, PiecewiseLinearCurrentSource, RampCurrentSource
+from izhikevich.synapses import Synapses, STPSynapses
+
+
+__all__ = [
+	'setup', 'end', 'run', 'run_until', 'get_current_time', 'get_time_step',
+	'get_min_delay', 'num_processes', 'rank', 'create', 'initialize', 'record',
+	'Population', 'PopulationView', 'Izhikevich', 'GeneralizedIzhikevich',
+	'AccommodationIzhikevich', 'DCSource', 'StepCurrentSource',
+	'PiecewiseLinearCurrentSource', 'RampCurrentSource', 'Projection',
+	'StaticSynapse', 'TsodyksMarkramSynapse', 'AllToAllConnector', 'FixedProbabilityConnector',
+	'FixedNumberPostConnector', 'FromListConnector', 'save_checkpoint', 'restore_checkpoint',
+]
+
+
+class _State(object):
+
+	def __init__(self):
+		self.clear()
+
+	def clear(self, timestep=0.1, min_delay=0.1, dtype=np.float64):
+		self.timestep = timestep
+		self.min_delay = min_delay
+		self.dtype = dtype
+		self.step_count = 0
+		self.populations = []
+		self.projections = []
+		# (population, variables, filename) recorded by record() with a filename
+		self.write_on_end = []
+
+
+state = _State()
+
+
+def setup(timestep=0.1, min_delay=0.1, max_delay=10.0, dtype=np.float64, **extra_params):
+	"""`dtype` is the floating-point type of the state of the cells (see engine.Engine)."""
+	state.clear(timestep, min_delay, dtype)
+	return 0
+
+
+def end(compatible_output=True):
+	"""Write the data of the populations recorded with record(..., filename)."""
+	for source, variables, filename in state.write_on_end:
+		source.write_data(filename, variables)
+	state.write_on_end = []
+
+
+def _advance(step_count):
+	state.step_count = step_count
+	engines = [population._engine for population in state.populations]
+	if state.projections:
+		# populations exchange spikes: advance them together, by at most the shortest delay at a time
+		chunk = min(projection._synapses.min_delay_steps for projection in state.projections)
+	else:
+		chunk = state.step_count
+	while any(engine.step_count < state.step_count for engine in engines):
+		for engine in engines:
+			engine.run_steps(min(chunk, state.step_count - engine.step_count))
+
+
+def run_until(tstop, checkpoint=None, checkpoint_interval=None):
+	"""
+	Advance to `tstop` ms. With `checkpoint`, save a checkpoint to that file
+	every `checkpoint_interval` ms of simulated time and at `tstop` (see
+	save_checkpoint()).
+	"""
+	stop = int(round(tstop / state.timestep))
+	if checkpoint is None:
+		_advance(stop)
+		return get_current_time()
+	interval = int(round(checkpoint_interval / state.timestep)) if checkpoint_interval else stop
+	while state.step_count < stop:
+		_advance(min(state.step_count + max(1, interval), stop))
+		save_checkpoint(checkpoint)
+	return get_current_time()
+
+
+def run(simtime, checkpoint=None, checkpoint_interval=None):
+	return run_until(get_current_time() + simtime, checkpoint, checkpoint_interval)
+
+
+def save_checkpoint(filename):
+	"""
+	Save the state of all populations, their synapses, stimuli and recorders
+	to `filename` (see izhikevich/checkpoint.py).
+	"""
+	checkpoint.save(filename, [population._engine for population in state.populations],
+					timestep=state.timestep, min_delay=state.min_delay, step_count=state.step_count)
+
+
+def restore_checkpoint(filename):
+	"""
+	Continue from a checkpoint saved by save_checkpoint(), into the same
+	populations, projections, sources and recorders, created again in the same
+	order; return the time of the checkpoint.
+	"""
+	extra = checkpoint.load(filename, [population._engine for population in state.populations])
+	if float(extra['timestep']) != state.timestep:
+		raise ValueError("%s was saved with a time step of %g ms, not %g ms" % (
+			filename, extra['timestep'], state.timestep))
+	state.step_count = int(extra['step_count'])
+	return get_current_time()
+
+
+def get_current_time():
+	return state.step_count * state.timestep
+
+
+def get_time_step():
+	return state.timestep
+
+
+def get_min_delay():
+	return state.min_delay
+
+
+def num_processes():
+	return 1
+
+
+def rank():
+	return 0
+
+
+def _values(value, size):
+	"""Expand a parameter value (scalar, sequence or RandomDistribution) to `size` values."""
+	if hasattr(value, 'next') and not isinstance(value, (int, float)):
+		return np.asarray(value.next(size), dtype=float)
+	return value
+
+
+class Izhikevich(object):
+	"""Izhikevich (2003) cell. The parameters may be scalars or one value per cell."""
+
+	default_parameters = dict((name, DEFAULT_PARAMETERS[name]) for name in ('a', 'b', 'c', 'd', 'i_offset'))
+	default_initial_values = DEFAULT_INITIAL_VALUES
+	recordable = ['spikes', 'v', 'u']
+	fixed_parameters = {}
+
+	def __init__(self, **parameters):
+		unknown = set(parameters).difference(self.default_parameters)
+		if unknown:
+			raise ValueError("%s has no parameter(s) %s" % (self.__class__.__name__, ", ".join(sorted(unknown))))
+		self.parameter_space = dict(self.default_parameters)
+		self.parameter_space.update(parameters)
+		self.parameter_space.update(self.fixed_parameters)
+
+
+class GeneralizedIzhikevich(Izhikevich):
+	"""
+	Izhikevich cell with dv/dt = X v^2 + Y v + Z - u + I, and du/dt = a b (v + 65)
+	instead of a (b v - u) where accommodation is 1 (see engine.py). Cells of
+	every kind of Fig. 1 can thus be mixed in one Population.
+	"""
+
+	default_parameters = DEFAULT_PARAMETERS
+
+
+class AccommodationIzhikevich(Izhikevich):
+	"""Izhikevich cell with du/dt = a b (v + 65), as for panel R of Fig. 1."""
+
+	fixed_parameters = {'accommodation': 1.0}
+
+
+class _BasePopulation(object):
+
+	def __len__(self):
+		return self.size
+
+	def __getitem__(self, index):
+		return PopulationView(self, index)
+
+	def set(self, **parameters):
+		parameters = dict((name, _values(value, self.size)) for name, value in parameters.items())
+		self._engine.set(indices=self._indices, **parameters)
+
+	def get(self, parameter_name, gather=False):
+		if parameter_name in ('v', 'u'):
+			values = getattr(self._engine, parameter_name)
+		else:
+			values = self._engine.parameters[parameter_name]
+		if self._indices is None:
+			return values.copy()
+		return values[self._indices]
+
+	def initialize(self, **initial_values):
+		for variable, value in initial_values.items():
+			value = _values(value, self.size)
+			self._engine.initialize(variable, value, self._indices)
+
+	def inject(self, current_source):
+		current_source.inject_into(self)
+
+	@property
+	def _key(self):
+		"""Key of the recordings made through this population or view, see record()."""
+		return None if self._indices is None else self._indices.tobytes()
+
+	def record(self, variables, to_file=None, sampling_interval=None, snapshot=()):
+		"""
+		Record `variables` of these cells. The recorders are kept by the parent
+		population, by variable and cells, so that get_data() of the population,
+		or of any view of it, returns what was recorded through another view.
+
+		`to_file` and `sampling_interval` apply to 'v' and 'u' only: spikes are
+		kept in memory, at the time step of the simulation, so recording them
+		with `to_file` raises ValueError. With 'spikes', `snapshot` ('v' and/or
+		'u') also keeps the values of these variables at each spike, just before
+		the reset: get_data() gives them as the array_annotations of the spike
+		trains.
+		"""
+		recordings = self._recordings
+		if variables is None:
+			stopped = [key for key in recordings if key[1] == self._key]
+			for recorder in set(recordings[key] for key in stopped):
+				self._engine.recorders.remove(recorder)
+			for key in stopped:
+				del recordings[key]
+			return
+		if variables == 'all':
+			variables = self._celltype.recordable
+		elif isinstance(variables, str):
+			variables = [variables]
+		for variable in variables:
+			if variable not in self._celltype.recordable:
+				raise ValueError("Izhikevich cells can not record '%s'" % variable)
+		snapshot = tuple(snapshot)
+		for variable in snapshot:
+			if variable not in ('v', 'u'):
+				raise ValueError("Only 'v' and 'u' can be kept at each spike, not '%s'" % variable)
+		if snapshot and 'spikes' not in variables:
+			raise ValueError("snapshot is only for recording 'spikes'")
+		if snapshot and ('spikes', self._key) in recordings:
+			if set(snapshot).difference(recordings[('spikes', self._key)].snapshot):
+				raise ValueError("The spikes of %s are already recorded without %s: call record(None) first" % (
+					self.label, ", ".join(snapshot)))
+		if 'spikes' in variables:
+			if to_file is not None:
+				raise ValueError("Spikes can not be streamed to a file: record them in a separate call, without to_file")
+			if sampling_interval is not None:
+				warnings.warn("sampling_interval does not apply to spikes, which are recorded at every time step")
+		variables = [variable for variable in variables if (variable, self._key) not in recordings]
+		if 'spikes' in variables:
+			variables.remove('spikes')
+			recordings[('spikes', self._key)] = self._engine.add_recorder(SpikeRecorder(self._indices, snapshot))
+		if not variables:
+			return
+		if isinstance(to_file, str):
+			# stream the samples to this directory during the run instead of keeping them in memory
+			recorder = StreamingRecorder(to_file, variables, self._indices, sampling_interval)
+		else:
+			recorder = StateRecorder(variables, self._indices, sampling_interval)
+		self._engine.add_recorder(recorder)
+		for variable in variables:
+			recordings[(variable, self._key)] = recorder
+
+	def _sources(self, variable):
+		"""
+		(recorder, columns, positions) for each recorder of `variable` that holds
+		cells of this population or view: `columns` are the cells it records (in
+		its own numbering) that no earlier recorder has, and `positions` their
+		places here. For the recorder made by record() on these very cells,
+		columns and positions are None.
+		"""
+		recordings = self._recordings
+		if (variable, self._key) in recordings:
+			return [(recordings[(variable, self._key)], None, None)]
+		size = self._engine.size
+		position = np.full(size, -1, dtype=np.intp)
+		position[np.arange(size) if self._indices is None else self._indices] = np.arange(self.size)
+		covered = np.zeros(self.size, dtype=bool)
+		sources = []
+		for (name, key), recorder in recordings.items():
+			if name != variable:
+				continue
+			recorded = np.arange(size) if recorder.indices is None else np.asarray(recorder.indices)
+			columns = np.flatnonzero(position[recorded] >= 0)
+			columns = columns[~covered[position[recorded[columns]]]]
+			if columns.size:
+				covered[position[recorded[columns]]] = True
+				sources.append((recorder, columns, position[recorded[columns]]))
+		if not sources:
+			raise ValueError("No cell of %s has recorded '%s'" % (self.label, variable))
+		return sources
+
+	def _signal(self, variable):
+		sources = self._sources(variable)
+		timestep = self._engine.timestep
+		if sources[0][1] is None:
+			return sources[0][0].signal(variable, timestep)
+		signals = [recorder.signal(variable, timestep) for recorder, columns, positions in sources]
+		if len(set((len(signal), signal.t_start, signal.sampling_period) for signal in signals)) > 1:
+			raise ValueError("The cells of %s were recorded at different times: get their '%s' from the populations "
+							 "or views that recorded them" % (self.label, variable))
+		positions = np.concatenate([positions for recorder, columns, positions in sources])
+		order = np.argsort(positions)
+		values = np.concatenate([np.asarray(signal)[:, columns] for signal, (recorder, columns, positions)
+								 in zip(signals, sources)], axis=1)[:, order]
+		return AnalogSignal(values, variable, signals[0].sampling_period, signals[0].t_start, signals[0].units,
+							channel_index=positions[order])
+
+	def get_data(self, variables='all', gather=True, clear=False):
+		if variables == 'all':
+			variables = []
+			for variable in sorted(set(name for name, key in self._recordings)):
+				try:
+					self._sources(variable)
+				except ValueError:
+					continue
+				variables.append(variable)
+		elif isinstance(variables, str):
+			variables = [variables]
+		signals = [self._signal(variable) for variable in variables if variable != 'spikes']
+		spiketrains = []
+		if 'spikes' in variables:
+			# values at each spike, if every recorder of the spikes of these cells kept them
+			snapshot = [variable for variable in ('v', 'u')
+						if all(variable in source[0].snapshot for source in self._sources('spikes'))]
+			cells, times, snapshots = self._spikes(snapshot)
+			order = np.argsort(cells, kind='mergesort')
+			boundaries = np.searchsorted(cells[order], np.arange(1, self.size))
+			values = dict((variable, np.split(snapshots[variable][order], boundaries)) for variable in snapshot)
+			spiketrains = [SpikeTrain(train, get_current_time(), source_index=index,
+									  array_annotations=dict((variable, values[variable][index]) for variable in snapshot))
+						   for index, train in enumerate(np.split(times[order], boundaries))]
+		if clear:
+			for recorder in set(source[0] for variable in variables for source in self._sources(variable)):
+				recorder.clear()
+		return Block(segments=[Segment(analogsignals=signals, spiketrains=spiketrains)], name=self.label)
+
+	def get_spikes(self):
+		"""Compact (cell index, spike time) arrays of all recorded spikes, in chronological order."""
+		cells, times, snapshots = self._spikes()
+		return cells, times
+
+	def _spikes(self, snapshot=()):
+		"""The arrays of get_spikes(), and a dict of the values of the variables `snapshot` at each spike."""
+		sources = self._sources('spikes')
+		if sources[0][1] is None:
+			recorder = sources[0][0]
+			cells, times = recorder.data()
+			return cells, times, dict((variable, recorder.snapshots(variable)) for variable in snapshot)
+		all_cells = []
+		all_times = []
+		all_values = dict((variable, []) for variable in snapshot)
+		for recorder, columns, positions in sources:
+			cells, times = recorder.data()
+			local = np.full(self._engine.size if recorder.indices is None else len(recorder.indices), -1, dtype=np.int64)
+			local[columns] = positions
+			selected = local[cells] >= 0
+			all_cells.append(local[cells[selected]].astype(np.int32))
+			all_times.append(times[selected])
+			for variable in snapshot:
+				all_values[variable].append(recorder.snapshots(variable)[selected])
+		cells = np.concatenate(all_cells)
+		times = np.concatenate(all_times)
+		order = np.argsort(times, kind='mergesort')
+		return cells[order], times[order], dict((variable, np.concatenate(values)[order])
+												for variable, values in all_values.items())
+
+	def write_data(self, io, variables='all', gather=True, clear=False):
+		"""
+		Save what get_data() returns to the file `io`, in NumPy's .npz format:
+		the samples of each state variable as <variable>, of shape (samples,
+		cells), with <variable>.t_start and <variable>.sampling_period, and the
+		spikes as spikes.cells and spikes.times, in chronological order, with
+		spikes.v and spikes.u if they were kept at each spike (see record()).
+		"""
+		segment = self.get_data(variables, gather, clear).segments[0]
+		arrays = {}
+		for signal in segment.analogsignals:
+			arrays[signal.name] = np.asarray(signal)
+			arrays[signal.name + '.t_start'] = np.float64(signal.t_start)
+			arrays[signal.name + '.sampling_period'] = np.float64(signal.sampling_period)
+		if segment.spiketrains:
+			cells = np.concatenate([np.full(len(train), index, dtype=np.int32)
+									for index, train in enumerate(segment.spiketrains)])
+			times = np.concatenate([train.times for train in segment.spiketrains])
+			order = np.argsort(times, kind='mergesort')
+			arrays['spikes.cells'] = cells[order]
+			arrays['spikes.times'] = times[order]
+			for variable in segment.spiketrains[0].array_annotations:
+				values = np.concatenate([train.array_annotations[variable] for train in segment.spiketrains])
+				arrays['spikes.' + variable] = values[order]
+		directory = os.path.dirname(io)
+		if directory and not os.path.isdir(directory):
+			os.makedirs(directory)
+		with open(io, 'wb') as f:
+			np.savez(f, **arrays)
+
+	def get_v(self, gather=True, compatible_output=True):
+		return self.get_data('v', gather)
+
+
+class Population(_BasePopulation):
+
+	def __init__(self, size, cellclass, cellparams=None, structure=None, initial_values={}, label=None):
+		if isinstance(cellclass, type):
+			cellclass = cellclass(**(cellparams or {}))
+		self.size = size
+		self.celltype = self._celltype = cellclass
+		self.label = label or "population%d" % len(state.populations)
+		self._indices = None
+		self._recordings = {}
+		parameters = dict((name, _values(value, size)) for name, value in cellclass.parameter_space.items())
+		self._engine = Engine(size, parameters, timestep=state.timestep, dtype=state.dtype)
+		self._engine.step_count = state.step_count
+		self.initialize(**initial_values)
+		state.populations.append(self)
+
+	@property
+	def local_size(self):
+		return self.size
+
+	def all(self):
+		return iter(range(self.size))
+
+
+class PopulationView(_BasePopulation):
+
+	def __init__(self, parent, selector, label=None):
+		if isinstance(parent, PopulationView):
+			self._indices = parent._indices[selector]
+			parent = parent.parent
+		else:
+			self._indices = np.arange(parent.size)[selector]
+		self.parent = parent
+		self._celltype = parent._celltype
+		self.celltype = parent.celltype
+		if self._indices.ndim == 0:
+			self._indices = self._indices.reshape(1)
+		self.size = len(self._indices)
+		self.label = label or "view of %s" % parent.label
+
+	@property
+	def _engine(self):
+		return self.parent._engine
+
+	@property
+	def _recordings(self):
+		return self.parent._recordings
+
+
+class StaticSynapse(object):
+	"""
+	Delta synapse: a spike raises v of the target by `weight` (mV) after `delay`
+	(ms, min_delay by default). Either may be a scalar, one value per connection
+	or a RandomDistribution.
+	"""
+
+	def __init__(self, weight=0.0, delay=None):
+		self.weight = weight
+		self.delay = delay
+
+
+class TsodyksMarkramSynapse(StaticSynapse):
+	"""StaticSynapse with short-term depression and facilitation (see synapses.STPSynapses)."""
+
+	def __init__(self, U=0.5, tau_rec=100.0, tau_facil=0.0, weight=0.0, delay=None):
+		StaticSynapse.__init__(self, weight, delay)
+		self.U = U
+		self.tau_rec = tau_rec
+		self.tau_facil = tau_facil
+
+
+def _numpy_rng(rng):
+	# PyNN's NumpyRNG wraps a numpy RandomState as .rng
+	return getattr(rng, 'rng', rng) or np.random
+
+
+def _without_self_connections(sources, targets, allowed, same):
+	if allowed or not same:
+		return sources, targets
+	keep = sources != targets
+	return sources[keep], targets[keep]
+
+
+class AllToAllConnector(object):
+
+	def __init__(self, allow_self_connections=True):
+		self.allow_self_connections = allow_self_connections
+
+	def connections(self, pre_size, post_size, same):
+		sources = np.repeat(np.arange(pre_size), post_size)
+		targets = np.tile(np.arange(post_size), pre_size)
+		return _without_self_connections(sources, targets, self.allow_self_connections, same) + (None, None)
+
+
+class FixedProbabilityConnector(object):
+
+	def __init__(self, p_connect, allow_self_connections=True, rng=None):
+		self.p_connect = p_connect
+		self.allow_self_connections = allow_self_connections
+		self.rng = rng
+
+	def connections(self, pre_size, post_size, same):
+		rng = _numpy_rng(self.rng)
+		sources = []
+		targets = []
+		rows = max(1, 2 ** 24 // max(1, post_size))
+		for start in range(0, pre_size, rows):
+			block_sources, block_targets = np.nonzero(rng.rand(min(rows, pre_size - start), post_size) < self.p_connect)
+			sources.append(block_sources + start)
+			targets.append(block_targets)
+		sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.intp)
+		targets = np.concatenate(targets) if targets else np.zeros(0, dtype=np.intp)
+		return _without_self_connections(sources, targets, self.allow_self_connections, same) + (None, None)
+
+
+class FixedNumberPostConnector(object):
+	"""Each presynaptic cell connects to `n` postsynaptic cells chosen at random."""
+
+	def __init__(self, n, allow_self_connections=True, with_replacement=False, rng=None):
+		self.n = n
+		self.allow_self_connections = allow_self_connections
+		self.with_replacement = with_replacement
+		self.rng = rng
+
+	def connections(self, pre_size, post_size, same):
+		rng = _numpy_rng(self.rng)
+		exclude_self = same and not self.allow_self_connections
+		choices = post_size - 1 if exclude_self else post_size
+		if self.n > choices and not self.with_replacement:
+			raise ValueError("Can not choose %d distinct targets among %d cells" % (self.n, choices))
+		sources = np.repeat(np.arange(pre_size), self.n)
+		if self.with_replacement:
+			targets = rng.randint(0, choices, pre_size * self.n)
+		else:
+			targets = np.empty((pre_size, self.n), dtype=np.intp)
+			rows = max(1, 2 ** 24 // max(1, choices))
+			for start in range(0, pre_size, rows):
+				stop = min(start + rows, pre_size)
+				targets[start:stop] = rng.rand(stop - start, choices).argpartition(self.n - 1, axis=1)[:, :self.n]
+			targets = targets.reshape(-1)
+		if exclude_self:
+			# skip the presynaptic cell itself
+			targets += targets >= sources
+		return sources, targets, None, None
+
+
+class FromListConnector(object):
+	"""Connections given as (i, j), (i, j, weight) or (i, j, weight, delay) tuples."""
+
+	def __init__(self, conn_list, column_names=None):
+		self.conn_list = conn_list
+
+	def connections(self, pre_size, post_size, same):
+		connections = np.asarray(self.conn_list, dtype=float).reshape(len(self.conn_list), -1)
+		columns = [connections[:, k] if connections.shape[1] > k else None for k in (2, 3)]
+		return (connections[:, 0].astype(np.intp), connections[:, 1].astype(np.intp)) + tuple(columns)
+
+
+def _connection_values(value, n):
+	if hasattr(value, 'next') and not isinstance(value, (int, float)):
+		return np.asarray(value.next(n), dtype=float)
+	return np.broadcast_to(np.asarray(value, dtype=float), (n,))
+
+
+class Projection(object):
+	"""
+	Static delta synapses from the cells of one Population (or PopulationView)
+	to those of another, stored and delivered as synapses.Synapses. With
+	receptor_type 'inhibitory', the weights lower v.
+	"""
+
+	def __init__(self, presynaptic_population, postsynaptic_population, connector, synapse_type=None,
+				 receptor_type='excitatory', label=None):
+		self.pre = presynaptic_population
+		self.post = postsynaptic_population
+		self.receptor_type = receptor_type
+		self.label = label
+		synapse_type = synapse_type or StaticSynapse()
+		same = self.pre._engine is self.post._engine and np.array_equal(_cell_indices(self.pre),
+			_cell_indices(self.post))
+		sources, targets, weights, delays = connector.connections(self.pre.size, self.post.size, same)
+		n = len(sources)
+		if weights is None:
+			weights = _connection_values(synapse_type.weight, n)
+		if delays is None:
+			delays = _connection_values(state.min_delay if synapse_type.delay is None else synapse_type.delay, n)
+		if receptor_type == 'inhibitory':
+			weights = -np.abs(weights)
+		if isinstance(synapse_type, TsodyksMarkramSynapse):
+			synapse_class = STPSynapses
+			parameters = {'U': synapse_type.U, 'tau_rec': synapse_type.tau_rec, 'tau_fac': synapse_type.tau_facil}
+		else:
+			synapse_class = Synapses
+			parameters = {}
+		self._synapses = synapse_class.from_connections(self.pre._engine.size, self.post._engine.size,
+			_cell_indices(self.pre)[sources], _cell_indices(self.post)[targets], weights, delays, state.timestep,
+			**parameters)
+		self._synapses.connect(self.pre._engine, self.post._engine)
+		state.projections.append(self)
+
+	def __len__(self):
+		return len(self._synapses)
+
+	def size(self, gather=True):
+		return len(self)
+
+	def get(self, attribute_name, format='list', gather=True):
+		"""'weight' or 'delay' of every connection, as (i, j, value) tuples or a (pre, post) array."""
+		synapses = self._synapses
+		values = {'weight': synapses.weights.astype(float), 'delay': synapses.delays_ms()}[attribute_name]
+		sources = _local_indices(self.pre)[synapses.sources()]
+		targets = _local_indices(self.post)[synapses.indices]
+		if format == 'array':
+			array = np.full((self.pre.size, self.post.size), np.nan)
+			array[sources, targets] = values
+			return array
+		return list(zip(sources.tolist(), targets.tolist(), values.tolist()))
+
+
+def _cell_indices(cells):
+	"""Indices in their engine of the cells of a Population or PopulationView."""
+	if cells._indices is None:
+		return np.arange(cells.size)
+	return cells._indices
+
+
+def _local_indices(cells):
+	"""Position of each cell of the engine in `cells` (-1 if not in it)."""
+	local = np.full(cells._engine.size, -1, dtype=np.intp)
+	local[_cell_indices(cells)] = np.arange(cells.size)
+	return local
+
+
+def create(cellclass, cellparams=None, n=1):
+	return Population(n, cellclass, cellparams)
+
+
+def initialize(cells, **initial_values):
+	cells.initialize(**initial_values)
+
+
+def record(variables, source, filename=None, sampling_interval=None):
+	"""Record `variables` of `source`; with `filename`, end() writes them to that file (see write_data())."""
+	source.record(variables, sampling_interval=sampling_interval)
+	if filename is not None:
+		state.write_on_end.append((source, variables, filename))
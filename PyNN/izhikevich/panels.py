@@ -0,0 +1,347 @@
+"""
+The 20 sub-plots (A-T) of Fig. 1 of Izhikevich (2004), expressed as data.
+
+Each panel is a dict holding the same values as the corresponding block of
+izhikevich2004.py:
+
+	'parameters'		a, b, c, d and the initial i_offset
+	'initial_values'	v and u at t = 0
+	'steps'			(time, i_offset) pairs, i.e. the neuron.set(i_offset=...)
+				calls made between successive run() calls
+	'ramps'			linearly ramped currents, described with the same
+				attributes as rampGeneratorDL in NeuroML2/WhichModel.nml
+	'duration'		total simulated time (ms)
+	'stimulus_trace'	(times, values) of the stimulus drawn below the trace
+	'generalized_parameters', 'generalized_initial_values'
+				the same for the GeneralizedIzhikevich cell type, with
+				the exact model of figure1.m: it differs from the
+				standard one for panels G and L (X, Y, Z) and R
+				(accommodation), which izhikevich2004.py approximates
+
+run_panel() simulates one panel on its own, as izhikevich2004.py does, while
+run_batched() simulates all of them as a single Population, one cell per panel,
+in one run, and splits the recorded membrane potential back per panel. Both
+accept a `phases` object whose phase(name) context manager is entered around
+the 'setup', 'build', 'run' and 'get_data' phases, e.g. to time them (see
+benchmark.PhaseTimer).
+
+"""
+
+from contextlib import contextmanager
+
+import numpy as np
+
+from izhikevich.sources import ramp_current_source
+
+
+TIMESTEP = 0.01
+
+
+def _pulses(onsets, width, amplitude, baseline=0.0):
+	steps = []
+	for onset in onsets:
+		steps.append((onset, amplitude))
+		steps.append((onset + width, baseline))
+	return steps
+
+
+GENERALIZED_DEFAULTS = {'X': 0.04, 'Y': 5.0, 'Z': 140.0, 'accommodation': 0.0}
+
+
+def _panel(label, title, subplot, a, b, c, d, v_init, duration, stimulus_trace,
+		I=0.0, u_init=None, steps=(), ramps=(), xlim=None, ylim=None, generalized=None):
+	if u_init is None:
+		u_init = b * v_init
+	# figure1.m values, where they differ from those of izhikevich2004.py
+	exact = dict(a=a, b=b, c=c, d=d, v_init=v_init, u_init=u_init)
+	exact.update(GENERALIZED_DEFAULTS)
+	if generalized:
+		exact['u_init'] = None
+		exact.update(generalized)
+	if exact['u_init'] is None:
+		exact['u_init'] = exact['b'] * exact['v_init']
+	return {
+		'label': label,
+		'title': title,
+		'subplot': subplot,
+		'parameters': {'a': a, 'b': b, 'c': c, 'd': d, 'i_offset': I},
+		'initial_values': {'u': u_init, 'v': v_init},
+		'steps': list(steps),
+		'ramps': list(ramps),
+		'duration': duration,
+		'stimulus_trace': stimulus_trace,
+		'generalized_parameters': {'a': exact['a'], 'b': exact['b'], 'c': exact['c'], 'd': exact['d'], 'i_offset': I,
+			'X': exact['X'], 'Y': exact['Y'], 'Z': exact['Z'], 'accommodation': exact['accommodation']},
+		'generalized_initial_values': {'u': exact['u_init'], 'v': exact['v_init']},
+		'xlim': xlim,
+		'ylim': ylim,
+	}
+
+
+def _ramp(delay, duration, start_amplitude, finish_amplitude, baseline_amplitude=0.0):
+	return {
+		'delay': delay,
+		'duration': duration,
+		'start_amplitude': start_amplitude,
+		'finish_amplitude': finish_amplitude,
+		'baseline_amplitude': baseline_amplitude,
+	}
+
+
+K_T1 = 400 / 10.0
+K_T2 = K_T1 + 20
+K_T3 = 0.7 * 400
+K_T4 = K_T3 + 40
+
+L_T1 = 100 / 11.0
+L_T2 = L_T1 + 5
+L_T3 = 0.7 * 100
+L_T4 = L_T3 + 10
+
+
+PANELS = [
+	_panel('A', '(A) Tonic spiking', 1, 0.02, 0.2, -65.0, 6.0, -70.0, 100.0,
+		([0, 10, 10, 100], [-90, -90, -80, -80]),
+		steps=[(10.0, 14.0)]),
+
+	_panel('B', '(B) Phasic spiking', 2, 0.02, 0.25, -65.0, 6.0, -64.0, 200.0,
+		([0, 20, 20, 200], [-90, -90, -80, -80]),
+		steps=[(20.0, 0.5)]),
+
+	_panel('C', '(C) Tonic bursting', 3, 0.02, 0.2, -50.0, 2.0, -70.0, 220.0,
+		([0, 22, 22, 220], [-90, -90, -80, -80]),
+		steps=[(22.0, 15.0)]),
+
+	_panel('D', '(D) Phasic bursting', 4, 0.02, 0.25, -55.0, 0.05, -64.0, 200.0,
+		([0, 20, 20, 200], [-90, -90, -80, -80]),
+		steps=[(20.0, 0.6)]),
+
+	_panel('E', '(E) Mixed mode', 5, 0.02, 0.2, -55.0, 4.0, -70.0, 160.0,
+		([0, 16, 16, 160], [-90, -90, -80, -80]),
+		steps=[(16.0, 10.0)]),
+
+	_panel('F', '(F) SFA', 6, 0.01, 0.2, -65.0, 8.0, -70.0, 85.0,
+		([0, 8.5, 8.5, 85], [-90, -90, -80, -80]),
+		steps=[(8.5, 30.0)]),
+
+	_panel('G', '(G) Class 1 excitable', 7, 0.02, 0.2, -65.0, 6.0, -70.0, 300.0,
+		([0, 30, 300, 300], [-90, -90, -70, -90]),
+		ramps=[_ramp(30.0, 270.0, 0.0, 0.075 * 270)],
+		xlim=(0.0, 300.0), ylim=(-95.0, 30.0),
+		generalized=dict(b=-0.1, c=-55.0, d=6.0, v_init=-60.0, X=0.04, Y=4.1, Z=108.0)),
+
+	_panel('H', '(H) Class 2 excitable', 8, 0.2, 0.26, -65.0, 0.0, -64.0, 300.0,
+		([0, 30, 300, 300], [-90, -90, -70, -90]),
+		I=-0.5,
+		ramps=[_ramp(30.0, 270.0, -0.5, -0.5 + 0.015 * 270, -0.5)],
+		xlim=(0.0, 300.0), ylim=(-95.0, 30.0)),
+
+	_panel('I', '(I) Spike latency', 9, 0.02, 0.2, -65.0, 6.0, -70.0, 100.0,
+		([0, 10, 10, 13, 13, 100], [-90, -90, -80, -80, -90, -90]),
+		steps=_pulses([10.0], 3.0, 6.71)),
+
+	_panel('J', '(J) Subthreshold oscillation', 10, 0.05, 0.26, -60.0, 0.0, -62.0, 200.0,
+		([0, 20, 20, 25, 25, 200], [-90, -90, -80, -80, -90, -90]),
+		steps=_pulses([20.0], 5.0, 2.0)),
+
+	_panel('K', '(K) Resonator', 11, 0.1, 0.26, -60.0, -1.0, -62.0, 400.0,
+		([0, K_T1, K_T1, (K_T1+8), (K_T1+8), K_T2, K_T2, (K_T2+8), (K_T2+8), K_T3, K_T3, (K_T3+8), (K_T3+8), K_T4, K_T4, (K_T4+8), (K_T4+8), 400],
+		 [-90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90]),
+		steps=_pulses([K_T1, K_T2, K_T3, K_T4], 4.0, 0.65)),
+
+	_panel('L', '(L) Integrator', 12, 0.02, -0.1, -55.0, 6.0, -60.0, 100.0,
+		([0, L_T1, L_T1, (L_T1+2), (L_T1+2), L_T2, L_T2, (L_T2+2), (L_T2+2), L_T3, L_T3, (L_T3+2), (L_T3+2), L_T4, L_T4, (L_T4+2), (L_T4+2), 100],
+		 [-90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90]),
+		steps=_pulses([L_T1, L_T2, L_T3, L_T4], 2.0, 9.0),
+		generalized=dict(X=0.04, Y=4.1, Z=108.0)),
+
+	_panel('M', '(M) Rebound spike', 13, 0.03, 0.25, -60.0, 4.0, -64.0, 200.0,
+		([0, 20, 20, 25, 25, 200], [-85, -85, -90, -90, -85, -85]),
+		steps=_pulses([20.0], 5.0, -15.0)),
+
+	_panel('N', '(N) Rebound burst', 14, 0.03, 0.25, -52.0, 0.0, -64.0, 200.0,
+		([0, 20, 20, 25, 25, 200], [-85, -85, -90, -90, -85, -85]),
+		steps=_pulses([20.0], 5.0, -15.0)),
+
+	_panel('O', '(O) Threshold variability', 15, 0.03, 0.25, -60.0, 4.0, -64.0, 100.0,
+		([0, 10, 10, 15, 15, 70, 70, 75, 75, 80, 80, 85, 85, 100], [-85, -85, -80, -80, -85, -85, -90, -90, -85, -85, -80, -80, -85, -85]),
+		steps=_pulses([10.0], 5.0, 1.0) + _pulses([70.0], 5.0, -6.0) + _pulses([80.0], 5.0, 1.0)),
+
+	_panel('P', '(P) Bistability', 16, 0.1, 0.26, -60.0, 0.0, -61.0, 300.0,
+		([0, 300.0/8, 300.0/8, (300.0/8 + 5), (300.0/8 + 5), 216, 216, 221, 221, 300], [-90, -90, -80, -80, -90, -90, -80, -80, -90, -90]),
+		I=0.24,
+		steps=_pulses([300.0 / 8, 208.0], 5.0, 1.24, baseline=0.24)),
+
+	_panel('Q', '(Q) DAP', 17, 1.0, 0.18, -60.0, -21.0, -70.0, 50.0,
+		([0, 9, 9, 11, 11, 50], [-90, -90, -80, -80, -90, -90]),
+		steps=_pulses([9.0], 2.0, 20.0)),
+
+	_panel('R', '(R) Accomodation', 18, 0.02, 1.0, -55.0, 4.0, -65.0, 400.0,
+		([0, 200, 200, 300, 312.5, 312.5, 400], [-90, -78, -90, -90, -84, -90, -90]),
+		u_init=-16.0,
+		ramps=[_ramp(0.0, 200.0, 0.0, 8.0), _ramp(300.0, 12.5, 0.0, 4.0)],
+		xlim=(0.0, 400.0), ylim=(-95.0, 30.0),
+		generalized=dict(u_init=-16.0, accommodation=1.0)),
+
+	_panel('S', '(S) Inhibition-induced spiking', 19, -0.02, -1.0, -60.0, 8.0, -63.8, 350.0,
+		([0, 50, 50, 250, 250, 350], [-80, -80, -90, -90, -80, -80]),
+		I=80.0,
+		steps=[(50.0, 75.0), (220.0, 80.0)]),
+
+	# Modifying parameter d from -2.0 to -0.7 in order to reproduce Fig. 1
+	_panel('T', '(T) Inhibition-induced bursting', 20, -0.026, -1.0, -45.0, -0.7, -63.8, 350.0,
+		([0, 50, 50, 250, 250, 350], [-80, -80, -90, -90, -80, -80]),
+		I=80.0,
+		steps=[(50.0, 75.0), (250.0, 80.0)]),
+]
+
+
+def get_panels(labels=None):
+	"""Return the panels with the given labels (all of them by default), in figure order."""
+	if labels is None:
+		return list(PANELS)
+	labels = [label.upper() for label in labels]
+	unknown = set(labels).difference(panel['label'] for panel in PANELS)
+	if unknown:
+		raise ValueError("Unknown panel(s): %s" % ", ".join(sorted(unknown)))
+	return [panel for panel in PANELS if panel['label'] in labels]
+
+
+def i_offset_at(panel, t):
+	"""i_offset of a panel's cell from time t onwards, following its 'steps' schedule."""
+	value = panel['parameters']['i_offset']
+	for time, amplitude in panel['steps']:
+		if time <= t:
+			value = amplitude
+	return value
+
+
+class _Untimed(object):
+
+	@contextmanager
+	def phase(self, name):
+		yield
+
+
+_UNTIMED = _Untimed()
+
+
+def cell_model(sim, panel):
+	"""
+	Cell type, parameters and initial values with which `sim` simulates
+	`panel`: the exact model of figure1.m if `sim` has the GeneralizedIzhikevich
+	cell type (as the numpy backend does), the standard Izhikevich model with
+	the parameters of izhikevich2004.py otherwise.
+	"""
+	if hasattr(sim, 'GeneralizedIzhikevich'):
+		return sim.GeneralizedIzhikevich, panel['generalized_parameters'], panel['generalized_initial_values']
+	return sim.Izhikevich, panel['parameters'], panel['initial_values']
+
+
+def inject_ramp(sim, ramp, cells, timestep=TIMESTEP):
+	source = ramp_current_source(sim, timestep=timestep, **ramp)
+	source.inject_into(cells)
+	return source
+
+
+def run_panel(sim, panel, timestep=TIMESTEP, variable='v', phases=None, **setup_options):
+	"""
+	Simulate a single panel on its own, as its block in izhikevich2004.py does.
+
+	Returns the (times, v) arrays of the recorded membrane potential or, if
+	`variable` is 'spikes', only the array of spike times. `setup_options` are
+	passed on to sim.setup(), e.g. dtype=np.float32 for numpysim.
+	"""
+	phases = phases or _UNTIMED
+	with phases.phase('setup'):
+		sim.setup(timestep=timestep, min_delay=0.5, **setup_options)
+
+	with phases.phase('build'):
+		cell_type, parameters, initial_values = cell_model(sim, panel)
+		neuron = sim.create(cell_type(**parameters))
+		neuron.initialize(**initial_values)
+		for ramp in panel['ramps']:
+			inject_ramp(sim, ramp, neuron, timestep)
+
+		neuron.record(variable)
+
+	with phases.phase('run'):
+		for time, amplitude in panel['steps']:
+			sim.run_until(time)
+			neuron.set(i_offset=amplitude)
+		sim.run_until(panel['duration'])
+
+	with phases.phase('get_data'):
+		data = neuron.get_data().segments[0]
+		if variable == 'spikes':
+			result = np.asarray(data.spiketrains[0])
+		else:
+			vm = data.filter(name='v')[0]
+			result = np.asarray(vm.times), np.asarray(vm)[:, 0]
+	sim.end()
+	return result
+
+
+def run_batched(sim, panels=None, timestep=TIMESTEP, variable='v', phases=None, **setup_options):
+	"""
+	Simulate the given panels (all of them by default) as one Population with
+	one cell per panel, using the PyNN simulator module `sim`.
+
+	Every cell gets its own parameters (see cell_model()), initial values and
+	ramped currents, and i_offset is switched for the whole population at each
+	time at which any panel changes its stimulus. The population is run once, up to the longest
+	panel, and the recorded membrane potential is then split back per panel.
+
+	Returns a dict mapping each panel label to a (times, v) pair of arrays or,
+	if `variable` is 'spikes', to the array of its spike times: only spikes are
+	recorded then, which needs far less memory than recording v at every step.
+	`setup_options` are passed on to sim.setup().
+	"""
+	if panels is None:
+		panels = PANELS
+	phases = phases or _UNTIMED
+	with phases.phase('setup'):
+		sim.setup(timestep=timestep, min_delay=0.5, **setup_options)
+
+	with phases.phase('build'):
+		models = [cell_model(sim, panel) for panel in panels]
+		cell_type = models[0][0]
+		neuronParameters = dict(
+			(name, np.array([parameters[name] for model, parameters, initial_values in models]))
+			for name in models[0][1])
+		initialValues = dict(
+			(name, np.array([initial_values[name] for model, parameters, initial_values in models]))
+			for name in ('u', 'v'))
+
+		population = sim.Population(len(panels), cell_type(**neuronParameters), label="Fig. 1")
+		population.initialize(**initialValues)
+
+		for index, panel in enumerate(panels):
+			for ramp in panel['ramps']:
+				inject_ramp(sim, ramp, population[index:index + 1], timestep)
+
+		population.record(variable)
+
+	with phases.phase('run'):
+		change_times = sorted(set(time for panel in panels for time, amplitude in panel['steps']))
+		for time in change_times:
+			sim.run_until(time)
+			population.set(i_offset=np.array([i_offset_at(panel, time) for panel in panels]))
+		sim.run_until(max(panel['duration'] for panel in panels))
+
+	with phases.phase('get_data'):
+		data = population.get_data().segments[0]
+		results = {}
+		if variable == 'spikes':
+			for index, panel in enumerate(panels):
+				spike_times = np.asarray(data.spiketrains[index])
+				results[panel['label']] = spike_times[spike_times <= panel['duration']]
+		else:
+			vm = data.filter(name='v')[0]
+			times = np.asarray(vm.times)
+			signals = np.asarray(vm)
+			for index, panel in enumerate(panels):
+				mask = times <= panel['duration'] + 0.5 * timestep
+				results[panel['label']] = (times[mask], signals[mask, index])
+	sim.end()
+	return results
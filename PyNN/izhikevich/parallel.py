@@ -0,0 +1,79 @@
+"""
+Simulation of independent Fig. 1 panels in a pool of worker processes.
+
+Each (simulator, panel) pair is run by panels.run_panel() in a fresh worker
+process, so that no simulator state is shared between panels, and the recorded
+traces are sent back to the parent process for plotting, either through the
+pool's pipe or, given a `directory`, as .npy files that the parent
+memory-maps instead of copying.
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+from izhikevich import get_simulator
+from izhikevich.panels import run_panel, TIMESTEP
+
+
+def _save_result(directory, simulator_name, label, result):
+	"""Save a panel's result as .npy files in `directory`; return their paths."""
+	arrays = result if isinstance(result, tuple) else (result,)
+	paths = []
+	for number, array in enumerate(arrays):
+		path = os.path.join(directory, "%s_%s_%d.npy" % (simulator_name, label, number))
+		np.save(path, array)
+		paths.append(path)
+	return tuple(paths)
+
+
+def _load_result(paths):
+	arrays = tuple(np.load(path, mmap_mode='r') for path in paths)
+	return arrays if len(arrays) > 1 else arrays[0]
+
+
+def _run_panel_task(task):
+	simulator_name, panel, timestep, variable, directory = task
+	result = run_panel(get_simulator(simulator_name), panel, timestep, variable)
+	if directory is not None:
+		result = _save_result(directory, simulator_name, panel['label'], result)
+	return simulator_name, panel['label'], result
+
+
+def run_panels_parallel(simulator_names, panels, processes=None, timestep=TIMESTEP, variable='v', directory=None):
+	"""
+	Simulate every panel with every simulator in `simulator_names`, using a pool
+	of `processes` worker processes (one per CPU by default). `panels` may also
+	be a dict giving the list of panels to simulate with each simulator.
+
+	Returns a dict mapping each simulator name to a dict of (times, v), or of
+	spike times if `variable` is 'spikes', per panel label, as returned by
+	panels.run_batched(). If `directory` is given, the workers save the results
+	there and the returned arrays are read-only memory maps of those files.
+	"""
+	if isinstance(simulator_names, str):
+		simulator_names = [simulator_names]
+	if not isinstance(panels, dict):
+		panels = dict((simulator_name, panels) for simulator_name in simulator_names)
+	if directory is not None and not os.path.isdir(directory):
+		os.makedirs(directory)
+	tasks = [(simulator_name, panel, timestep, variable, directory) for simulator_name in simulator_names
+			for panel in panels[simulator_name]]
+	results = dict((simulator_name, {}) for simulator_name in simulator_names)
+	if not tasks:
+		return results
+	pool = multiprocessing.Pool(processes, maxtasksperchild=1)
+	try:
+		# longest panels first, so that the pool is not left waiting on one of them at the end
+		tasks.sort(key=lambda task: -task[1]['duration'])
+		outputs = pool.map(_run_panel_task, tasks, chunksize=1)
+	finally:
+		pool.close()
+		pool.join()
+
+	for simulator_name, label, result in outputs:
+		if directory is not None:
+			result = _load_result(result)
+		results[simulator_name][label] = result
+	return results
@@ -0,0 +1,83 @@
+"""
+Drawing of the 5x4 grid of Fig. 1, with the same styling as izhikevich2004.py.
+
+Traces are decimated to the pixel width of their axes before being drawn (see
+decimate.py), so that drawing costs the same whatever the time step. For
+unattended runs, use_offscreen_backend() and save_figure() render the figure
+once, into a PNG or SVG file, instead of on screen.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from izhikevich.decimate import decimate
+
+
+# Size of the whole figure when it is saved to a file, in inches at FIGURE_DPI
+FIGURE_SIZE = (16, 12)
+FIGURE_DPI = 100
+
+
+def use_offscreen_backend():
+	"""Draw with Agg, without a window, e.g. on a machine with no display."""
+	plt.switch_backend('agg')
+
+
+def axes_pixel_width(ax):
+	return max(1, int(round(ax.get_window_extent().width)))
+
+
+def _panel_axes(fig, panel):
+	ax1 = fig.add_subplot(5, 4, panel['subplot'])
+	ax1.get_xaxis().set_visible(False)
+	ax1.get_yaxis().set_visible(False)
+	ax1.spines['left'].set_color('None')
+	ax1.spines['right'].set_color('None')
+	ax1.spines['bottom'].set_color('None')
+	ax1.spines['top'].set_color('None')
+
+	if panel['xlim'] is not None:
+		ax1.set_xlim(panel['xlim'])
+	if panel['ylim'] is not None:
+		ax1.set_ylim(panel['ylim'])
+
+	ax1.set_title(panel['title'])
+	return ax1
+
+
+def plot_panel(fig, panel, times, v):
+	ax1 = _panel_axes(fig, panel)
+	times, v = decimate(times, v, axes_pixel_width(ax1))
+	stimulus_times, stimulus_values = panel['stimulus_trace']
+	ax1.plot(times, v, stimulus_times, stimulus_values)
+	return ax1
+
+
+def plot_spikes(fig, panel, spike_times):
+	"""Draw a panel's spikes as vertical lines from the reset value c up to 30 mV."""
+	ax1 = _panel_axes(fig, panel)
+	stimulus_times, stimulus_values = panel['stimulus_trace']
+	ax1.vlines(spike_times, panel['parameters']['c'], 30.0)
+	ax1.plot(stimulus_times, stimulus_values)
+	return ax1
+
+
+def plot_figure(panels, results, fig=None, variable='v'):
+	"""
+	Draw each panel's (times, v), or its spike times if `variable` is 'spikes',
+	from `results`, a dict keyed by panel label.
+	"""
+	if fig is None:
+		fig = plt.figure(1, facecolor='white')
+	for panel in panels:
+		if variable == 'spikes':
+			plot_spikes(fig, panel, results[panel['label']])
+		else:
+			times, v = results[panel['label']]
+			plot_panel(fig, panel, times, v)
+	return fig
+
+
+def save_figure(fig, filename):
+	"""Render `fig` once into `filename`, whose extension (.png, .svg, ...) gives the format."""
+	fig.savefig(filename, dpi=FIGURE_DPI, facecolor='white')
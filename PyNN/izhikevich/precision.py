@@ -0,0 +1,148 @@
+"""
+Accuracy of single-precision (float32) simulation, against double precision
+(float64), for the panels of Fig. 1 (see engine.Engine).
+
+compare_panels() simulates all panels once with each dtype, with the numpy
+backend, and compares, per panel, the number of spikes, the times of paired
+spikes (the k-th spike with float32 against the k-th with float64) and the
+membrane potential. Each panel is classed as
+
+	identical	the same spikes, at the same time steps
+	shifted		the same number of spikes, none moved by more than
+			`tolerance` ms
+	different	otherwise
+
+compare_speed() times the run of a large population (see
+benchmark.run_population()) with each dtype.
+
+	>>> report = precision_report()
+	>>> [panel['verdict'] for panel in report['panels']]
+
+Run as a script, this module prints the report and can save it as JSON:
+
+	python -m izhikevich.precision [--timestep MS] [--tolerance MS] [--cells N] [--duration MS] [--output FILE]
+"""
+
+import argparse
+import platform
+
+import numpy as np
+
+from izhikevich import numpysim
+from izhikevich.benchmark import PhaseTimer, run_population, write_report
+from izhikevich.panels import TIMESTEP, get_panels, run_batched
+
+
+TOLERANCE = 1.0
+VERDICTS = ('identical', 'shifted', 'different')
+
+
+def _compare_spikes(reference, spikes, timestep, tolerance):
+	paired = min(len(reference), len(spikes))
+	shifts = np.abs(spikes[:paired] - reference[:paired])
+	moved = np.flatnonzero(shifts > 0.5 * timestep)
+	result = {
+		'count_float64': len(reference),
+		'count_float32': len(spikes),
+		'max_shift': float(shifts.max()) if paired else 0.0,
+		'mean_shift': float(shifts.mean()) if paired else 0.0,
+		# time (float64) of the first spike moved to another time step, or missing
+		'first_difference': None,
+	}
+	if moved.size:
+		result['first_difference'] = float(reference[moved[0]])
+	elif len(reference) > paired:
+		result['first_difference'] = float(reference[paired])
+	elif len(spikes) > paired:
+		result['first_difference'] = float(spikes[paired])
+	if len(reference) != len(spikes) or result['max_shift'] > tolerance:
+		result['verdict'] = 'different'
+	elif moved.size:
+		result['verdict'] = 'shifted'
+	else:
+		result['verdict'] = 'identical'
+	return result
+
+
+def compare_panels(panels=None, timestep=TIMESTEP, tolerance=TOLERANCE):
+	"""A list of dicts comparing the spikes and v of each panel with float32 against float64."""
+	panels = panels or get_panels()
+	spikes = {}
+	traces = {}
+	for dtype in (np.float64, np.float32):
+		spikes[dtype] = run_batched(numpysim, panels, timestep, 'spikes', dtype=dtype)
+		traces[dtype] = run_batched(numpysim, panels, timestep, 'v', dtype=dtype)
+	results = []
+	for panel in panels:
+		label = panel['label']
+		result = {'label': label, 'title': panel['title']}
+		result.update(_compare_spikes(spikes[np.float64][label], spikes[np.float32][label], timestep, tolerance))
+		v64 = traces[np.float64][label][1]
+		v32 = traces[np.float32][label][1].astype(np.float64)
+		result['max_v_difference'] = float(np.abs(v32 - v64).max())
+		results.append(result)
+	return results
+
+
+def compare_speed(size, duration, timestep=TIMESTEP):
+	"""Time (s) of the run of `size` cells for `duration` ms with float64 and float32, and the speedup."""
+	times = {}
+	for dtype in (np.float64, np.float32):
+		phases = PhaseTimer()
+		run_population(numpysim, size, duration, timestep, phases=phases, dtype=dtype)
+		times[np.dtype(dtype).name] = phases.times['run']
+	return {
+		'size': size,
+		'duration': duration,
+		'run_float64': times['float64'],
+		'run_float32': times['float32'],
+		'speedup': times['float64'] / times['float32'],
+	}
+
+
+def precision_report(timestep=TIMESTEP, tolerance=TOLERANCE, size=100000, duration=100.0):
+	"""
+	The comparison of all panels and, unless `size` is 0, the speed of `size`
+	cells, as a dict that benchmark.write_report() saves as JSON.
+	"""
+	panels = compare_panels(timestep=timestep, tolerance=tolerance)
+	return {
+		'timestep': timestep,
+		'tolerance': tolerance,
+		'numpy': np.__version__,
+		'machine': platform.machine(),
+		'panels': panels,
+		'counts': dict((verdict, sum(panel['verdict'] == verdict for panel in panels)) for verdict in VERDICTS),
+		'speed': compare_speed(size, duration, timestep) if size else None,
+	}
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Spikes of the panels of Fig. 1 with float32, against float64")
+	parser.add_argument("--timestep", type=float, default=TIMESTEP)
+	parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+						help="largest shift of a spike (ms) for a panel to be 'shifted' rather than 'different'")
+	parser.add_argument("--cells", type=int, default=100000, help="cells of the speed comparison (0 to skip it)")
+	parser.add_argument("--duration", type=float, default=100.0, help="duration of the speed comparison (ms)")
+	parser.add_argument("--output", metavar="FILE", help="save the report to FILE, as JSON")
+	args = parser.parse_args(argv)
+
+	report = precision_report(args.timestep, args.tolerance, args.cells, args.duration)
+	print("panel  spikes (f64/f32)  max shift  mean shift  first difference  max |dv|   verdict")
+	for panel in report['panels']:
+		first = panel['first_difference']
+		print("%-5s %9d %6d %9.3f ms %8.3f ms %14s %9.3f mV  %s" % (
+			panel['label'], panel['count_float64'], panel['count_float32'], panel['max_shift'], panel['mean_shift'],
+			"-" if first is None else "%.2f ms" % first, panel['max_v_difference'], panel['verdict']))
+	print(", ".join("%d %s" % (report['counts'][verdict], verdict) for verdict in VERDICTS))
+	speed = report['speed']
+	if speed:
+		print("%d cells for %g ms: %.2f s with float64, %.2f s with float32 (x%.2f)" % (
+			speed['size'], speed['duration'], speed['run_float64'], speed['run_float32'], speed['speedup']))
+	if args.output:
+		write_report(report, args.output)
+		print("report saved to %s" % args.output)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,227 @@
+"""
+Opt-in profiling of the phases of a simulation script.
+
+A Profiler records, for every phase it is told about, the wall-clock time, the
+CPU time (user + system) and the change in resident memory of the process,
+and, if tracemalloc is tracing (e.g. PYTHONTRACEMALLOC=1), the change in
+memory allocated by Python. Phases nest: a phase begun while another is open
+is recorded under it, e.g. "C;run" for the run phase of panel C. Recording a
+phase costs a few microseconds, so profiling can be left on in batch jobs.
+
+Phases can be delimited with
+
+	with profiler.phase('run'):
+		...
+
+which makes a Profiler usable as the `phases` argument of panels.run_panel()
+and panels.run_batched(), or, for scripts written as a flat sequence of PyNN
+calls such as izhikevich2004.py, by instrument(), which wraps the simulator
+functions so that every setup() starts a new panel and create(), run(),
+get_data() and the code after it (plotting) start its successive phases,
+until the function it returns is called.
+
+write() saves the phases as JSON and CSV, and as "folded stacks" (one line per
+path of nested phases with its own time in microseconds) that flamegraph.pl
+or speedscope turn into a flame graph.
+"""
+
+import csv
+import functools
+import json
+import os
+import resource
+import sys
+from contextlib import contextmanager
+from timeit import default_timer
+
+try:
+	import tracemalloc
+except ImportError:  # Python 2
+	tracemalloc = None
+
+
+FIELDS = ('path', 'start', 'wall', 'cpu', 'memory', 'python_memory')
+
+_PAGE_SIZE = resource.getpagesize()
+
+
+def _cpu_time():
+	times = os.times()
+	return times[0] + times[1]
+
+
+def _resident_memory():
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * _PAGE_SIZE
+	except (IOError, OSError):
+		# no /proc: fall back to the peak resident set size
+		peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _python_memory():
+	if tracemalloc is not None and tracemalloc.is_tracing():
+		return tracemalloc.get_traced_memory()[0]
+	return None
+
+
+class Profiler(object):
+
+	def __init__(self):
+		self.events = []
+		self._open = []
+		self._origin = default_timer()
+
+	def _sample(self):
+		return default_timer(), _cpu_time(), _resident_memory(), _python_memory()
+
+	def begin(self, name):
+		self._open.append((name, self._sample()))
+
+	def end(self):
+		wall, cpu, memory, python_memory = self._sample()
+		name, start = self._open[-1]
+		path = ";".join(open_name for open_name, sample in self._open)
+		del self._open[-1]
+		event = {
+			'path': path,
+			'start': start[0] - self._origin,
+			'wall': wall - start[0],
+			'cpu': cpu - start[1],
+			'memory': memory - start[2],
+			'python_memory': None,
+		}
+		if python_memory is not None and start[3] is not None:
+			event['python_memory'] = python_memory - start[3]
+		self.events.append(event)
+
+	def switch(self, name):
+		"""End the innermost open phase, if any, and begin `name` in its place."""
+		if self._open:
+			self.end()
+		self.begin(name)
+
+	def restart(self, *path):
+		"""End all open phases and begin the nested phases `path`."""
+		self.finish()
+		for name in path:
+			self.begin(name)
+
+	def finish(self):
+		while self._open:
+			self.end()
+
+	@contextmanager
+	def phase(self, name):
+		self.begin(name)
+		try:
+			yield
+		finally:
+			self.end()
+
+	def totals(self):
+		"""Wall and CPU time and memory change summed per path, in order of first appearance."""
+		totals = {}
+		order = []
+		for event in self.events:
+			if event['path'] not in totals:
+				totals[event['path']] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'memory': 0}
+				order.append(event['path'])
+			total = totals[event['path']]
+			total['calls'] += 1
+			total['wall'] += event['wall']
+			total['cpu'] += event['cpu']
+			total['memory'] += event['memory']
+		return [(path, totals[path]) for path in order]
+
+	def folded(self):
+		"""Folded stacks: (path, own wall time in microseconds), excluding time in nested phases."""
+		own = {}
+		order = []
+		for path, total in self.totals():
+			own[path] = own.get(path, 0.0) + total['wall']
+			order.append(path)
+			if ";" in path:
+				parent = path.rsplit(";", 1)[0]
+				own[parent] = own.get(parent, 0.0) - total['wall']
+		return [(path, max(0, int(round(own[path] * 1e6)))) for path in order]
+
+	def summary(self):
+		lines = ["%-24s %6s %10s %10s %10s" % ("phase", "calls", "wall (s)", "cpu (s)", "mem (MB)")]
+		for path, total in self.totals():
+			lines.append("%-24s %6d %10.3f %10.3f %10.1f" % (path, total['calls'], total['wall'], total['cpu'],
+				total['memory'] / 1024.0 ** 2))
+		return "\n".join(lines)
+
+	def write(self, prefix):
+		"""Save the phases to <prefix>.json, <prefix>.csv and <prefix>.folded."""
+		with open(prefix + ".json", 'w') as f:
+			json.dump({'events': self.events, 'totals': self.totals()}, f, indent=1)
+		with open(prefix + ".csv", 'w') as f:
+			writer = csv.writer(f)
+			writer.writerow(FIELDS)
+			for event in self.events:
+				writer.writerow([event[field] for field in FIELDS])
+		with open(prefix + ".folded", 'w') as f:
+			for path, microseconds in self.folded():
+				f.write("%s %d\n" % (path, microseconds))
+
+
+def _switching(profiler, function, name, then=None):
+	@functools.wraps(function)
+	def wrapper(*args, **kwargs):
+		profiler.switch(name)
+		result = function(*args, **kwargs)
+		if then is not None:
+			profiler.switch(then)
+		return result
+	return wrapper
+
+
+def instrument(namespace, sim, profiler, labels=()):
+	"""
+	Wrap the setup(), create(), run() and run_until() functions imported into
+	`namespace` (a script's globals()) from the simulator module `sim`, and the
+	get_data() method of its Population, so that `profiler` records, for each
+	panel, the phases 'setup', 'build', 'run', 'get_data' and 'plotting'.
+
+	Panels are named after `labels`, in order, then numbered. Returns a
+	function that puts the original functions and method back; instrumenting
+	again before calling it raises ValueError, as get_data() would otherwise
+	be wrapped twice.
+	"""
+	if getattr(sim.Population.get_data, '_profiled', False):
+		raise ValueError("%s.Population is already instrumented" % sim.__name__)
+	labels = list(labels)
+	count = [0]
+	originals = dict((name, namespace[name]) for name in ('setup', 'create', 'run', 'run_until') if name in namespace)
+	get_data = sim.Population.__dict__.get('get_data')
+
+	def setup(*args, **kwargs):
+		number = count[0]
+		count[0] += 1
+		label = labels[number] if number < len(labels) else str(number + 1)
+		profiler.restart(label, 'setup')
+		return sim.setup(*args, **kwargs)
+
+	namespace['setup'] = functools.wraps(sim.setup)(setup)
+	for name, phase in (('create', 'build'), ('run', 'run'), ('run_until', 'run')):
+		if name in namespace:
+			namespace[name] = _switching(profiler, namespace[name], phase)
+	wrapper = _switching(profiler, sim.Population.get_data, 'get_data', then='plotting')
+	wrapper._profiled = True
+	sim.Population.get_data = wrapper
+
+	def restore():
+		for name in ('setup', 'create', 'run', 'run_until'):
+			if name in originals:
+				namespace[name] = originals[name]
+			else:
+				namespace.pop(name, None)
+		if get_data is None:
+			# inherited from a base class
+			del sim.Population.get_data
+		else:
+			sim.Population.get_data = get_data
+	return restore
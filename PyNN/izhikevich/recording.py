@@ -0,0 +1,586 @@
+"""
+Recording of state variables for the NumPy engine, and minimal stand-ins for the
+neo Block / Segment / AnalogSignal objects returned by PyNN's get_data(), so
+that plotting code written for PyNN works unchanged.
+
+A recorder is attached to an engine.Engine with engine.add_recorder(). Before
+each run the engine calls recorder.reserve(engine, n_steps), after every time
+step recorder.sample(engine), and at the end of the run recorder.flush().
+Recorders also provide checkpoint() and restore(arrays), to save and load
+what they have recorded so far (see checkpoint.py).
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+class AnalogSignal(np.ndarray):
+	"""Array of shape (samples, cells), with the sample times available as `.times` (ms)."""
+
+	def __new__(cls, signal, name, sampling_period, t_start=0.0, units='mV', channel_index=None):
+		obj = np.asarray(signal).view(cls)
+		obj.name = name
+		obj.sampling_period = sampling_period
+		obj.t_start = t_start
+		obj.units = units
+		obj.channel_index = channel_index
+		return obj
+
+	def __array_finalize__(self, obj):
+		if obj is None:
+			return
+		self.name = getattr(obj, 'name', None)
+		self.sampling_period = getattr(obj, 'sampling_period', None)
+		self.t_start = getattr(obj, 't_start', 0.0)
+		self.units = getattr(obj, 'units', None)
+		self.channel_index = getattr(obj, 'channel_index', None)
+
+	@property
+	def times(self):
+		return self.t_start + self.sampling_period * np.arange(self.shape[0])
+
+
+class SpikeTrain(np.ndarray):
+	"""Spike times (ms) of one cell, with `array_annotations`: arrays of one value per spike, by name."""
+
+	def __new__(cls, times, t_stop, source_index=None, array_annotations=None):
+		obj = np.asarray(times, dtype=float).view(cls)
+		obj.t_stop = t_stop
+		obj.name = 'spikes'
+		obj.annotations = {'source_index': source_index}
+		obj.array_annotations = array_annotations or {}
+		return obj
+
+	def __array_finalize__(self, obj):
+		if obj is None:
+			return
+		self.t_stop = getattr(obj, 't_stop', None)
+		self.name = getattr(obj, 'name', 'spikes')
+		self.annotations = getattr(obj, 'annotations', {})
+		self.array_annotations = getattr(obj, 'array_annotations', {})
+
+	@property
+	def times(self):
+		return np.asarray(self)
+
+
+class Segment(object):
+
+	def __init__(self, analogsignals=(), spiketrains=()):
+		self.analogsignals = list(analogsignals)
+		self.spiketrains = list(spiketrains)
+
+	def filter(self, name=None):
+		return [signal for signal in self.analogsignals
+				if name is None or signal.name == name]
+
+
+class Block(object):
+
+	def __init__(self, segments=(), name=None):
+		self.segments = list(segments)
+		self.name = name
+
+
+UNITS = {'v': 'mV', 'u': 'mV/ms'}
+
+
+class StateRecorder(object):
+	"""
+	Keeps the values of state variables ('v', 'u') of the cells `indices`
+	(all cells by default) every `sampling_interval` ms, in memory.
+	"""
+
+	def __init__(self, variables, indices=None, sampling_interval=None):
+		if isinstance(variables, str):
+			variables = [variables]
+		self.variables = list(variables)
+		self.indices = indices
+		self.sampling_interval = sampling_interval
+		self.interval_steps = 1
+		self.start_step = None
+		self._blocks = dict((variable, []) for variable in self.variables)
+		self._rows = 0
+
+	def _values(self, engine, variable):
+		values = getattr(engine, variable)
+		if self.indices is None:
+			return values
+		return values[self.indices]
+
+	def reserve(self, engine, n_steps):
+		if self.start_step is None:
+			if self.sampling_interval is not None:
+				self.interval_steps = max(1, int(round(self.sampling_interval / engine.timestep)))
+			self.start_step = engine.step_count
+			n_rows = 1 + n_steps // self.interval_steps
+		else:
+			for variable in self.variables:
+				self._blocks[variable][-1] = self._blocks[variable][-1][:self._rows]
+			n_rows = (engine.step_count + n_steps - self.start_step) // self.interval_steps + 1 - self.n_samples
+		width = len(self._values(engine, self.variables[0]))
+		for variable in self.variables:
+			self._blocks[variable].append(np.empty((n_rows, width), dtype=engine.v.dtype))
+		self._rows = 0
+		if self.n_samples == 0:
+			self.sample(engine)
+
+	@property
+	def n_samples(self):
+		blocks = self._blocks[self.variables[0]]
+		if not blocks:
+			return 0
+		return sum(len(block) for block in blocks[:-1]) + self._rows
+
+	def sample(self, engine):
+		if (engine.step_count - self.start_step) % self.interval_steps:
+			return
+		for variable in self.variables:
+			self._blocks[variable][-1][self._rows] = self._values(engine, variable)
+		self._rows += 1
+
+	def flush(self):
+		pass
+
+	def data(self, variable):
+		blocks = self._blocks[variable]
+		if not blocks:
+			return np.zeros((0, 0))
+		return np.concatenate(blocks[:-1] + [blocks[-1][:self._rows]])
+
+	def signal(self, variable, timestep):
+		return AnalogSignal(self.data(variable), name=variable,
+							sampling_period=timestep * self.interval_steps,
+							t_start=(self.start_step or 0) * timestep,
+							units=UNITS.get(variable))
+
+	def clear(self):
+		self.start_step = None
+		self._blocks = dict((variable, []) for variable in self.variables)
+		self._rows = 0
+
+	def checkpoint(self):
+		arrays = {
+			'start_step': np.int64(-1 if self.start_step is None else self.start_step),
+			'interval_steps': np.int64(self.interval_steps),
+		}
+		for variable in self.variables:
+			arrays['data.' + variable] = self.data(variable)
+		return arrays
+
+	def restore(self, arrays):
+		self.clear()
+		self.interval_steps = int(arrays['interval_steps'])
+		if arrays['start_step'] >= 0:
+			self.start_step = int(arrays['start_step'])
+			for variable in self.variables:
+				self._blocks[variable] = [arrays['data.' + variable].copy()]
+			self._rows = len(self._blocks[self.variables[0]][0])
+
+
+class SpikeStatisticsRecorder(object):
+	"""
+	Keeps per-cell spike statistics instead of spike times: the number of
+	spikes, the times of the first and last spike and the shortest and longest
+	interspike interval (NaN while undefined). Memory does not depend on the
+	number of spikes or on the simulated time.
+	"""
+
+	def __init__(self, size):
+		self.count = np.zeros(size, dtype=np.int64)
+		self.first_spike = np.full(size, np.nan)
+		self.last_spike = np.full(size, np.nan)
+		self.min_isi = np.full(size, np.nan)
+		self.max_isi = np.full(size, np.nan)
+
+	def reserve(self, engine, n_steps):
+		pass
+
+	def sample(self, engine):
+		spikes = engine.spikes
+		if not spikes.size:
+			return
+		t = engine.time
+		self.count[spikes] += 1
+		previous = self.last_spike[spikes]
+		first = np.isnan(previous)
+		self.first_spike[spikes[first]] = t
+		isi = t - previous[~first]
+		cells = spikes[~first]
+		self.min_isi[cells] = np.fmin(self.min_isi[cells], isi)
+		self.max_isi[cells] = np.fmax(self.max_isi[cells], isi)
+		self.last_spike[spikes] = t
+
+	def flush(self):
+		pass
+
+	def checkpoint(self):
+		return {'count': self.count, 'first_spike': self.first_spike, 'last_spike': self.last_spike,
+				'min_isi': self.min_isi, 'max_isi': self.max_isi}
+
+	def restore(self, arrays):
+		for name in ('count', 'first_spike', 'last_spike', 'min_isi', 'max_isi'):
+			getattr(self, name)[:] = arrays[name]
+
+	@property
+	def mean_isi(self):
+		with np.errstate(invalid='ignore', divide='ignore'):
+			return np.where(self.count > 1, (self.last_spike - self.first_spike) / (self.count - 1), np.nan)
+
+
+NPY_HEADER_SIZE = 128
+
+
+def _write_npy_header(f, dtype, shape):
+	"""
+	Write, at the start of `f`, a .npy (version 1.0) header of fixed size, so
+	that it can be rewritten in place with a larger shape as samples are appended.
+	"""
+	header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (dtype.str, tuple(shape))
+	header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + "\n"
+	f.seek(0)
+	f.write(b"\x93NUMPY\x01\x00")
+	f.write(np.array(len(header), dtype='<u2').tobytes())
+	f.write(header.encode('latin1'))
+
+
+class StreamingRecorder(object):
+	"""
+	Writes the values of state variables of the cells `indices` (all cells by
+	default) every `sampling_interval` ms to `directory`, in chunks of
+	`chunk_size` samples, so that memory use does not grow with the simulated
+	time. Each variable goes to its own .npy file of shape (samples, cells),
+	to which every chunk is appended, time-major, and whose header is updated
+	after each chunk; index.json describes the recording. Read it with
+	StreamedRecording, or np.load(<variable>.npy, mmap_mode='r').
+
+	After clear() (e.g. get_data(clear=True)), the next run is written to new
+	files, <variable>.<generation>.npy, and index.json then describes them:
+	the files of earlier runs are left as they are, so that StreamedRecordings
+	and windows of them that are still in use keep their samples.
+	"""
+
+	def __init__(self, directory, variables, indices=None, sampling_interval=None, chunk_size=1000):
+		if isinstance(variables, str):
+			variables = [variables]
+		self.directory = directory
+		self.variables = list(variables)
+		self.indices = indices
+		self.sampling_interval = sampling_interval
+		self.chunk_size = chunk_size
+		self.interval_steps = 1
+		self.start_step = None
+		self.n_samples = 0
+		self.generation = 0
+		self._buffers = {}
+		self._rows = 0
+
+	def _values(self, engine, variable):
+		values = getattr(engine, variable)
+		if self.indices is None:
+			return values
+		return values[self.indices]
+
+	def filename(self, variable):
+		if self.generation == 0:
+			return "%s.npy" % variable
+		return "%s.%d.npy" % (variable, self.generation)
+
+	def path(self, variable):
+		return os.path.join(self.directory, self.filename(variable))
+
+	def reserve(self, engine, n_steps):
+		if self.start_step is not None:
+			return
+		if self.sampling_interval is not None:
+			self.interval_steps = max(1, int(round(self.sampling_interval / engine.timestep)))
+		self.start_step = engine.step_count
+		self.timestep = engine.timestep
+		width = len(self._values(engine, self.variables[0]))
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		for variable in self.variables:
+			self._buffers[variable] = np.empty((self.chunk_size, width), dtype=engine.v.dtype)
+			with open(self.path(variable), 'wb') as f:
+				_write_npy_header(f, self._buffers[variable].dtype, (0, width))
+		self._write_index()
+		self.sample(engine)
+
+	def sample(self, engine):
+		if (engine.step_count - self.start_step) % self.interval_steps:
+			return
+		for variable in self.variables:
+			self._buffers[variable][self._rows] = self._values(engine, variable)
+		self._rows += 1
+		if self._rows == self.chunk_size:
+			self.flush()
+
+	def flush(self):
+		if not self._rows:
+			return
+		n_samples = self.n_samples + self._rows
+		for variable in self.variables:
+			buffer = self._buffers[variable]
+			with open(self.path(variable), 'r+b') as f:
+				f.seek(0, os.SEEK_END)
+				buffer[:self._rows].tofile(f)
+				f.flush()
+				# the new shape is written once the samples are in the file, so readers never see missing rows
+				_write_npy_header(f, buffer.dtype, (n_samples, buffer.shape[1]))
+		self.n_samples = n_samples
+		self._rows = 0
+		self._write_index()
+
+	def _write_index(self):
+		buffer = self._buffers[self.variables[0]]
+		index = {
+			'variables': self.variables,
+			'dtype': buffer.dtype.str,
+			'width': buffer.shape[1],
+			'n_samples': self.n_samples,
+			'generation': self.generation,
+			'files': dict((variable, self.filename(variable)) for variable in self.variables),
+			'sampling_period': self.timestep * self.interval_steps,
+			't_start': self.start_step * self.timestep,
+			'units': dict((variable, UNITS.get(variable)) for variable in self.variables),
+		}
+		with open(os.path.join(self.directory, 'index.json'), 'w') as f:
+			json.dump(index, f)
+
+	def signal(self, variable, timestep):
+		return StreamedRecording(self.directory).window(variable)
+
+	def clear(self):
+		if self.start_step is not None:
+			self.generation += 1
+		self.start_step = None
+		self.n_samples = 0
+		self._rows = 0
+
+	def checkpoint(self):
+		"""Where the files end: the samples themselves are already in them."""
+		if self.start_step is None:
+			return {'start_step': np.int64(-1), 'generation': np.int64(self.generation)}
+		self.flush()
+		buffer = self._buffers[self.variables[0]]
+		return {
+			'start_step': np.int64(self.start_step),
+			'generation': np.int64(self.generation),
+			'interval_steps': np.int64(self.interval_steps),
+			'timestep': np.float64(self.timestep),
+			'n_samples': np.int64(self.n_samples),
+			'width': np.int64(buffer.shape[1]),
+			'dtype': np.array(buffer.dtype.str),
+		}
+
+	def restore(self, arrays):
+		"""Continue the files, dropping any samples written after the checkpoint."""
+		self.clear()
+		self.generation = int(arrays['generation'])
+		if arrays['start_step'] < 0:
+			return
+		self.start_step = int(arrays['start_step'])
+		self.interval_steps = int(arrays['interval_steps'])
+		self.timestep = float(arrays['timestep'])
+		self.n_samples = int(arrays['n_samples'])
+		dtype = np.dtype(str(arrays['dtype']))
+		width = int(arrays['width'])
+		for variable in self.variables:
+			self._buffers[variable] = np.empty((self.chunk_size, width), dtype=dtype)
+			size = NPY_HEADER_SIZE + self.n_samples * width * dtype.itemsize
+			with open(self.path(variable), 'r+b') as f:
+				if os.fstat(f.fileno()).st_size < size:
+					raise ValueError("%s has fewer than the %d samples of the checkpoint" % (
+						self.path(variable), self.n_samples))
+				f.truncate(size)
+				_write_npy_header(f, dtype, (self.n_samples, width))
+		self._write_index()
+
+
+class StreamedRecording(object):
+	"""
+	Read access to the files written by a StreamingRecorder. The files are
+	memory-mapped: windows of time and traces of single cells are views into
+	them, so nothing is read from disk until the values are used, and several
+	processes reading the same recording share the operating system's page
+	cache. A StreamedRecording is pickled as its directory, so it can be sent
+	to worker processes cheaply.
+	"""
+
+	def __init__(self, directory):
+		self.directory = directory
+		self.refresh()
+
+	def refresh(self):
+		"""Re-read the index, e.g. to see the samples written since by a running simulation."""
+		with open(os.path.join(self.directory, 'index.json')) as f:
+			index = json.load(f)
+		self.variables = index['variables']
+		self.dtype = np.dtype(index['dtype'])
+		self.width = index['width']
+		self.n_samples = index['n_samples']
+		self.sampling_period = index['sampling_period']
+		self.t_start = index['t_start']
+		self.units = index['units']
+		self.files = index['files']
+		self._arrays = {}
+
+	def __getstate__(self):
+		return {'directory': self.directory}
+
+	def __setstate__(self, state):
+		self.__init__(state['directory'])
+
+	def array(self, variable):
+		"""All samples of `variable`, as a read-only memory-mapped array of shape (samples, cells)."""
+		if variable not in self._arrays:
+			if self.n_samples == 0:
+				array = np.zeros((0, self.width), dtype=self.dtype)
+			else:
+				array = np.load(os.path.join(self.directory, self.files[variable]), mmap_mode='r')
+			self._arrays[variable] = array[:self.n_samples]
+		return self._arrays[variable]
+
+	def _sample_index(self, t):
+		return int(np.clip(np.ceil((t - self.t_start) / self.sampling_period - 1e-9), 0, self.n_samples))
+
+	def times(self, start=0, stop=None):
+		if stop is None:
+			stop = self.n_samples
+		return self.t_start + self.sampling_period * np.arange(start, stop)
+
+	def window(self, variable, t_start=None, t_stop=None, cells=None):
+		"""
+		Samples of `variable` with t_start <= t < t_stop, for the given cells (all
+		by default). Without `cells`, or with a slice, the result is a view of the file.
+		"""
+		start = 0 if t_start is None else self._sample_index(t_start)
+		stop = self.n_samples if t_stop is None else self._sample_index(t_stop)
+		rows = self.array(variable)[start:stop]
+		if cells is not None:
+			rows = rows[:, cells]
+		return AnalogSignal(rows, name=variable, sampling_period=self.sampling_period,
+							t_start=self.t_start + start * self.sampling_period,
+							units=self.units.get(variable))
+
+	def iter_chunks(self, variable, chunk_size=1000, cells=None):
+		"""Yield (times, samples) pairs of at most `chunk_size` samples, in order."""
+		array = self.array(variable)
+		for start in range(0, self.n_samples, chunk_size):
+			stop = min(start + chunk_size, self.n_samples)
+			rows = array[start:stop]
+			if cells is not None:
+				rows = rows[:, cells]
+			yield self.times(start, stop), rows
+
+	def cell(self, variable, index):
+		"""Whole trace of one cell, as a (strided) view of the file."""
+		return self.array(variable)[:, index]
+
+
+class SpikeRecorder(object):
+	"""
+	Records only spikes, i.e. resets of v after crossing the threshold, as
+	compact (cell index, time) arrays, optionally with the values of 'v'
+	and/or 'u' at the time of each spike (just before the reset). Memory grows
+	with the number of spikes, not with the simulated time.
+
+	If `indices` is given, only those cells are recorded and they are numbered
+	by their position in `indices`.
+	"""
+
+	def __init__(self, indices=None, snapshot=()):
+		self.indices = indices
+		self.snapshot = tuple(snapshot)
+		self.timestep = None
+		self._local = None
+		self.clear()
+
+	def clear(self):
+		# spikes of recent time steps, one entry per step with spikes ...
+		self._cells = []
+		self._steps = []
+		self._counts = []
+		self._snapshots = dict((variable, []) for variable in self.snapshot)
+		# ... regularly merged into larger arrays
+		self._cell_blocks = []
+		self._time_blocks = []
+
+	def reserve(self, engine, n_steps):
+		self.timestep = engine.timestep
+		if self.indices is not None and self._local is None:
+			self._local = np.full(engine.size, -1, dtype=np.int64)
+			self._local[self.indices] = np.arange(len(self._local[self.indices]))
+
+	def sample(self, engine):
+		spikes = engine.spikes
+		if not spikes.size:
+			return
+		selected = None
+		if self._local is not None:
+			local = self._local[spikes]
+			selected = local >= 0
+			spikes = local[selected]
+			if not spikes.size:
+				return
+		self._cells.append(spikes.astype(np.int32))
+		self._steps.append(engine.step_count)
+		self._counts.append(spikes.size)
+		for variable in self.snapshot:
+			values = getattr(engine, 'spike_' + variable)
+			if selected is not None:
+				values = values[selected]
+			self._snapshots[variable].append(values.copy())
+		if len(self._steps) >= 4096:
+			self._merge()
+
+	def _merge(self):
+		self._cell_blocks.append(np.concatenate(self._cells))
+		self._time_blocks.append(np.repeat(np.asarray(self._steps, dtype=float) * self.timestep, self._counts))
+		self._cells = []
+		self._steps = []
+		self._counts = []
+		for variable in self.snapshot:
+			self._snapshots[variable] = [np.concatenate(self._snapshots[variable])]
+
+	def flush(self):
+		pass
+
+	def data(self):
+		"""Arrays of the cell index and time (ms) of every spike, in chronological order."""
+		if self._steps:
+			self._merge()
+		if not self._cell_blocks:
+			return np.zeros(0, dtype=np.int32), np.zeros(0)
+		return np.concatenate(self._cell_blocks), np.concatenate(self._time_blocks)
+
+	def checkpoint(self):
+		cells, times = self.data()
+		arrays = {'cells': cells, 'times': times, 'timestep': np.float64(self.timestep or 0.0)}
+		for variable in self.snapshot:
+			arrays['snapshot.' + variable] = self.snapshots(variable)
+		return arrays
+
+	def restore(self, arrays):
+		self.clear()
+		self.timestep = float(arrays['timestep']) or None
+		self._cell_blocks = [arrays['cells']]
+		self._time_blocks = [arrays['times']]
+		for variable in self.snapshot:
+			self._snapshots[variable] = [arrays['snapshot.' + variable]]
+
+	def snapshots(self, variable):
+		values = self._snapshots[variable]
+		return np.concatenate(values) if values else np.zeros(0)
+
+	def spiketrains(self, size, t_stop):
+		"""One SpikeTrain per cell, for cells 0 to size - 1, with the snapshots as array_annotations."""
+		cells, times = self.data()
+		order = np.argsort(cells, kind='mergesort')
+		boundaries = np.searchsorted(cells[order], np.arange(1, size))
+		values = dict((variable, np.split(self.snapshots(variable)[order], boundaries)) for variable in self.snapshot)
+		return [SpikeTrain(train, t_stop, source_index=index,
+						   array_annotations=dict((variable, values[variable][index]) for variable in self.snapshot))
+				for index, train in enumerate(np.split(times[order], boundaries))]
@@ -0,0 +1,147 @@
+"""
+Current sources for the NumPy engine, with the same constructors as their PyNN
+counterparts.
+
+A source is stateless: engine.Engine asks it for its amplitude at a given time
+step, so the same source may be injected into several cells or populations.
+"""
+
+import numpy as np
+
+
+class CurrentSource(object):
+
+	def amplitude_at(self, step, timestep):
+		"""Amplitude of the source during time step `step` (i.e. from t = step * timestep)."""
+		raise NotImplementedError
+
+	def inject_into(self, cells):
+		"""Inject this source into a Population, a PopulationView or a list of them."""
+		if hasattr(cells, '_engine'):
+			cells = [cells]
+		for target in cells:
+			target._engine.inject(self, target._indices)
+
+
+class DCSource(CurrentSource):
+	"""Constant amplitude from `start` until `stop` (ms)."""
+
+	def __init__(self, amplitude=1.0, start=0.0, stop=None):
+		self.amplitude = float(amplitude)
+		self.start = float(start)
+		self.stop = stop
+
+	def amplitude_at(self, step, timestep):
+		if step < int(round(self.start / timestep)):
+			return 0.0
+		if self.stop is not None and step >= int(round(self.stop / timestep)):
+			return 0.0
+		return self.amplitude
+
+
+class StepCurrentSource(CurrentSource):
+	"""The amplitude changes to amplitudes[i] at times[i] (ms) and is zero before times[0]."""
+
+	def __init__(self, times=(), amplitudes=()):
+		self.times = np.asarray(times, dtype=float)
+		self.amplitudes = np.asarray(amplitudes, dtype=float)
+		if self.times.shape != self.amplitudes.shape:
+			raise ValueError("times and amplitudes must have the same length")
+		if np.any(np.diff(self.times) < 0):
+			raise ValueError("times must be increasing")
+		self._steps = {}
+
+	def _change_steps(self, timestep):
+		if timestep not in self._steps:
+			self._steps[timestep] = np.rint(self.times / timestep).astype(np.int64)
+		return self._steps[timestep]
+
+	def amplitude_at(self, step, timestep):
+		k = np.searchsorted(self._change_steps(timestep), step, side='right')
+		if k == 0:
+			return 0.0
+		return self.amplitudes[k - 1]
+
+
+class PiecewiseLinearCurrentSource(CurrentSource):
+	"""
+	Amplitude interpolated linearly between the breakpoints (times[i], amplitudes[i]),
+	zero before times[0] and held at amplitudes[-1] after times[-1]. A breakpoint
+	time may be repeated to make a jump, the amplitude changing at that time.
+
+	Only the breakpoints are stored; the amplitude is computed at each time step.
+	"""
+
+	def __init__(self, times=(), amplitudes=()):
+		self.times = np.asarray(times, dtype=float)
+		self.amplitudes = np.asarray(amplitudes, dtype=float)
+		if self.times.shape != self.amplitudes.shape:
+			raise ValueError("times and amplitudes must have the same length")
+		if np.any(np.diff(self.times) < 0):
+			raise ValueError("times must be non-decreasing")
+
+	def amplitude_at(self, step, timestep):
+		t = step * timestep
+		k = np.searchsorted(self.times, t, side='right')
+		if k == 0:
+			return 0.0
+		if k == len(self.times):
+			return self.amplitudes[-1]
+		t0, t1 = self.times[k - 1], self.times[k]
+		a0, a1 = self.amplitudes[k - 1], self.amplitudes[k]
+		return a0 + (a1 - a0) * (t - t0) / (t1 - t0)
+
+	def to_steps(self, timestep):
+		"""
+		Times and amplitudes of an equivalent StepCurrentSource, with one
+		breakpoint per time step along sloped segments and one per flat segment,
+		for simulators that have no piecewise-linear source.
+		"""
+		times = []
+		amplitudes = []
+		n = len(self.times)
+		for i in range(n):
+			t0, a0 = self.times[i], self.amplitudes[i]
+			if i + 1 < n and self.times[i + 1] == t0:
+				continue
+			if i + 1 < n and self.amplitudes[i + 1] != a0:
+				t1, a1 = self.times[i + 1], self.amplitudes[i + 1]
+				segment_times = t0 + timestep * np.arange(int(round((t1 - t0) / timestep)))
+				times.append(segment_times)
+				amplitudes.append(a0 + (a1 - a0) * (segment_times - t0) / (t1 - t0))
+			else:
+				times.append([t0])
+				amplitudes.append([a0])
+		return np.concatenate(times), np.concatenate(amplitudes)
+
+
+class RampCurrentSource(PiecewiseLinearCurrentSource):
+	"""
+	Same as rampGeneratorDL in NeuroML2/WhichModel.nml: baseline_amplitude, except
+	from `delay` to `delay` + `duration` (ms), during which the amplitude goes
+	linearly from start_amplitude to finish_amplitude.
+	"""
+
+	def __init__(self, delay=0.0, duration=0.0, start_amplitude=0.0, finish_amplitude=0.0, baseline_amplitude=0.0):
+		self.delay = delay
+		self.duration = duration
+		self.start_amplitude = start_amplitude
+		self.finish_amplitude = finish_amplitude
+		self.baseline_amplitude = baseline_amplitude
+		stop = delay + duration
+		PiecewiseLinearCurrentSource.__init__(self,
+			times=[0.0, delay, delay, stop, stop],
+			amplitudes=[baseline_amplitude, baseline_amplitude, start_amplitude, finish_amplitude, baseline_amplitude])
+
+
+def ramp_current_source(sim, delay, duration, start_amplitude, finish_amplitude, baseline_amplitude=0.0, timestep=None):
+	"""
+	A RampCurrentSource for the simulator module `sim`: the compact source if
+	`sim` provides one (numpy), otherwise the equivalent StepCurrentSource at
+	the resolution `timestep` (the simulator's time step by default).
+	"""
+	if hasattr(sim, 'RampCurrentSource'):
+		return sim.RampCurrentSource(delay, duration, start_amplitude, finish_amplitude, baseline_amplitude)
+	ramp = RampCurrentSource(delay, duration, start_amplitude, finish_amplitude, baseline_amplitude)
+	times, amplitudes = ramp.to_steps(timestep or sim.get_time_step())
+	return sim.StepCurrentSource(times=times, amplitudes=amplitudes)
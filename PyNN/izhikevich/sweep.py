@@ -0,0 +1,208 @@
+"""
+Sweeps over the parameters a, b, c, d and i_offset of the Izhikevich cell.
+
+Every point of the sweep is one cell. The points are simulated in chunks of
+`chunk_size` cells, each chunk as one engine.Engine population, and the chunks
+are spread over a pool of worker processes. Only per-cell spike statistics
+are kept, not traces. As in the panels of Fig. 1, each cell starts at v_init,
+u = b * v_init, with no input, and i_offset is switched on at `onset`; spikes
+are counted from then on. Up to `onset`, points that differ only by i_offset
+are the same: each distinct (a, b, c, d) is simulated once, and its state at
+`onset` forked into all its points (see engine.Engine.fork()).
+
+	>>> points = parameter_grid(a=0.02, b=np.linspace(0.1, 0.3, 100), c=-65.0,
+	...                         d=np.linspace(0, 8, 100), i_offset=[5.0, 10.0])
+	>>> results = sweep(points, duration=200.0, onset=20.0)
+	>>> counts = as_map(results, 'spike_count', (100, 100, 2))
+
+stimulus_sweep() does the same for the stimulus of a panel of Fig. 1 (see
+panels.py), e.g. over the amplitude or the timing of its current steps: the
+stretch before the earliest change of the stimulus is simulated once, and
+all variants are continued from there together, as one population.
+
+	>>> spikes = stimulus_sweep(panel, amplitude_schedules(panel, np.linspace(0, 20, 1000)))
+
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from izhikevich.engine import Engine
+from izhikevich.panels import TIMESTEP, i_offset_at
+from izhikevich.recording import SpikeStatisticsRecorder, SpikeRecorder, StateRecorder
+from izhikevich.sources import RampCurrentSource
+
+
+PARAMETERS = ('a', 'b', 'c', 'd', 'i_offset')
+
+RESULT_DTYPE = [(name, float) for name in PARAMETERS] + [
+	('spike_count', np.int64),
+	('first_spike_latency', float),
+	('mean_isi', float),
+	('min_isi', float),
+	('max_isi', float),
+	('last_spike', float),
+	('behaviour', np.int8),
+]
+
+# Coarse classes of the response to the step of current, see classify()
+SILENT, PHASIC, TONIC_SPIKING, TONIC_BURSTING = range(4)
+BEHAVIOURS = ('silent', 'phasic', 'tonic spiking', 'tonic bursting')
+
+
+def parameter_grid(**axes):
+	"""
+	All combinations of the values given for a, b, c, d and i_offset (each a
+	scalar or a sequence), as a dict of flat arrays. The last parameter varies
+	fastest, so the results can be reshaped to (len(a), len(b), ...).
+	"""
+	values = [np.atleast_1d(np.asarray(axes[name], dtype=float)) for name in PARAMETERS]
+	grids = np.meshgrid(*values, indexing='ij')
+	return dict((name, grid.ravel()) for name, grid in zip(PARAMETERS, grids))
+
+
+def classify(results, duration, onset, burst_ratio=2.5):
+	"""
+	Coarse behaviour of each point: SILENT if it never spikes, PHASIC if it
+	stops spiking during the second half of the stimulation, TONIC_BURSTING if
+	its longest interspike interval is more than `burst_ratio` times the mean
+	one (long pauses between bursts of short intervals), and TONIC_SPIKING
+	otherwise.
+	"""
+	behaviour = np.full(len(results), TONIC_SPIKING, dtype=np.int8)
+	with np.errstate(invalid='ignore'):
+		behaviour[results['max_isi'] > burst_ratio * results['mean_isi']] = TONIC_BURSTING
+		behaviour[~(results['last_spike'] >= onset + 0.5 * (duration - onset))] = PHASIC
+	behaviour[results['spike_count'] == 0] = SILENT
+	return behaviour
+
+
+def simulate_chunk(parameters, duration, onset, v_init=-70.0, timestep=0.01):
+	"""Simulate one chunk of points as a single population and return its results."""
+	size = len(parameters['a'])
+	cells = np.column_stack([parameters[name] for name in ('a', 'b', 'c', 'd')])
+	distinct, inverse = np.unique(cells, axis=0, return_inverse=True)
+	cell_parameters = dict(zip(('a', 'b', 'c', 'd'), distinct.T))
+	prefix = Engine(len(distinct), cell_parameters, {'v': v_init, 'u': cell_parameters['b'] * v_init}, timestep=timestep)
+	prefix.run_until(onset)
+	engine = prefix.fork(inverse.reshape(-1))
+
+	statistics = engine.add_recorder(SpikeStatisticsRecorder(size))
+	engine.set(i_offset=parameters['i_offset'])
+	engine.run_until(duration)
+
+	results = np.zeros(size, dtype=RESULT_DTYPE)
+	for name in PARAMETERS:
+		results[name] = parameters[name]
+	results['spike_count'] = statistics.count
+	results['first_spike_latency'] = statistics.first_spike - onset
+	results['mean_isi'] = statistics.mean_isi
+	results['min_isi'] = statistics.min_isi
+	results['max_isi'] = statistics.max_isi
+	results['last_spike'] = statistics.last_spike
+	results['behaviour'] = classify(results, duration, onset)
+	return results
+
+
+def _simulate_chunk_task(task):
+	return simulate_chunk(*task)
+
+
+def sweep(points, duration=200.0, onset=20.0, v_init=-70.0, timestep=0.01, chunk_size=100000, processes=None):
+	"""
+	Simulate every point of `points` (a dict of equal-length arrays for a, b, c,
+	d and i_offset, e.g. from parameter_grid()) and return a structured array
+	with the parameters and spike statistics of each point, in the same order.
+
+	`processes` is the number of worker processes (one per CPU by default; 1 to
+	simulate in this process).
+	"""
+	points = dict((name, np.asarray(points[name], dtype=float)) for name in PARAMETERS)
+	n_points = len(points['a'])
+	tasks = []
+	for start in range(0, n_points, chunk_size):
+		chunk = dict((name, values[start:start + chunk_size]) for name, values in points.items())
+		tasks.append((chunk, duration, onset, v_init, timestep))
+
+	if processes == 1 or len(tasks) == 1:
+		chunks = [_simulate_chunk_task(task) for task in tasks]
+	else:
+		pool = multiprocessing.Pool(processes)
+		try:
+			chunks = pool.map(_simulate_chunk_task, tasks, chunksize=1)
+		finally:
+			pool.close()
+			pool.join()
+	if not chunks:
+		return np.zeros(0, dtype=RESULT_DTYPE)
+	return np.concatenate(chunks)
+
+
+def amplitude_schedules(panel, amplitudes):
+	"""
+	The 'steps' of `panel` with the stimulus, i.e. every i_offset other than
+	the initial one, set to each of `amplitudes` in turn.
+	"""
+	baseline = panel['parameters']['i_offset']
+	return [[(time, value if value == baseline else amplitude) for time, value in panel['steps']]
+			for amplitude in amplitudes]
+
+
+def timing_schedules(panel, shifts, first=0):
+	"""
+	The 'steps' of `panel` with those from the `first` on delayed by each of
+	`shifts` (ms) in turn, e.g. to vary the interval between two pulses.
+	"""
+	return [[(time + shift if i >= first else time, value) for i, (time, value) in enumerate(panel['steps'])]
+			for shift in shifts]
+
+
+def stimulus_sweep(panel, schedules, timestep=TIMESTEP, variable='spikes'):
+	"""
+	Simulate the cell of a panel of Fig. 1, with the exact model of figure1.m
+	and the panel's ramps, once with each of `schedules` (lists of (time,
+	i_offset), as the panel's 'steps') as its stimulus.
+
+	Everything up to the earliest time in any of the schedules is the same for
+	all of them: it is simulated once, with one cell, whose state is then
+	forked into one cell per schedule, and those are run on together as one
+	population. Returns one array of spike times per schedule or, if
+	`variable` is 'v', the times and the membrane potential of shape
+	(samples, schedules).
+	"""
+	times = [time for schedule in schedules for time, amplitude in schedule]
+	onset = min(times + [panel['duration']])
+	engine = Engine(1, panel['generalized_parameters'], panel['generalized_initial_values'], timestep)
+	for ramp in panel['ramps']:
+		engine.inject(RampCurrentSource(**ramp))
+	new_recorder = SpikeRecorder if variable == 'spikes' else lambda: StateRecorder('v')
+	prefix = engine.add_recorder(new_recorder())
+	engine.run_until(onset)
+
+	engine = engine.fork(np.zeros(len(schedules), dtype=np.intp))
+	recorder = engine.add_recorder(new_recorder())
+	variants = [dict(panel, steps=schedule) for schedule in schedules]
+	for time in sorted(set(times)):
+		engine.run_until(time)
+		engine.set(i_offset=np.array([i_offset_at(variant, time) for variant in variants]))
+	engine.run_until(panel['duration'])
+
+	if variable == 'spikes':
+		prefix_times = prefix.data()[1]
+		cells, spike_times = recorder.data()
+		order = np.argsort(cells, kind='mergesort')
+		trains = np.split(spike_times[order], np.searchsorted(cells[order], np.arange(1, len(schedules))))
+		return [np.concatenate([prefix_times, train]) for train in trains]
+	head = np.repeat(prefix.data('v'), len(schedules), axis=1).reshape(-1, len(schedules))
+	tail = recorder.data('v').reshape(-1, len(schedules))
+	if len(head) and len(tail):
+		# the forked recorder starts with a sample at the onset, the last one of the prefix
+		tail = tail[1:]
+	v = np.concatenate([head, tail])
+	return timestep * np.arange(len(v)), v
+
+
+def as_map(results, field, shape):
+	"""One field of the results of a sweep over a parameter_grid(), reshaped to the grid."""
+	return results[field].reshape(shape)
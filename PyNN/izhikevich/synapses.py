@@ -0,0 +1,327 @@
+"""
+Synaptic delivery between populations of the NumPy engine.
+
+Synapses are static and current-based with delta kinetics, as for PyNN's (and
+NEST's) Izhikevich cell: a spike raises v of each target cell by the weight of
+the synapse, `delay` ms after the spike. Connectivity is stored in compressed
+sparse row (CSR) form, one row per presynaptic cell:
+
+	indptr		int64, the synapses of presynaptic cell i are indptr[i]:indptr[i + 1]
+	indices		int32, the postsynaptic cell of each synapse
+	weights		float32
+	delays		int16 (int32 if needed), in time steps, only if the synapses
+			have different delays
+
+Spikes are added to a ring buffer of the input to each postsynaptic cell at each
+of the coming time steps, so that delivering a spike only touches the
+rows of the cells that spiked: the cost of a time step grows with the number of
+spikes times the fan-out, not with the number of synapses.
+
+A Synapses object is a recorder (see recording.py) of the presynaptic engine,
+from which it takes the spikes of every step, and an input (see
+engine.Engine.add_input()) of the postsynaptic engine; connect() attaches it to
+both. Delays must be at least one time step, and the presynaptic engine may run
+ahead of the postsynaptic one by at most the shortest delay.
+"""
+
+import numpy as np
+
+
+def rows_of(indptr, cells):
+	"""Indices of the synapses of `cells`, i.e. the concatenated CSR rows."""
+	starts = indptr[cells]
+	lengths = indptr[np.asarray(cells) + 1] - starts
+	total = int(lengths.sum())
+	if total == 0:
+		return np.zeros(0, dtype=np.int64)
+	offsets = np.cumsum(lengths) - lengths
+	return np.arange(total) + np.repeat(starts - offsets, lengths)
+
+
+def to_csr(pre_size, sources, *columns):
+	"""Sort connections by presynaptic cell: return indptr and `columns` in that order."""
+	sources = np.asarray(sources, dtype=np.int64)
+	order = np.argsort(sources, kind='mergesort')
+	indptr = np.zeros(pre_size + 1, dtype=np.int64)
+	np.cumsum(np.bincount(sources, minlength=pre_size), out=indptr[1:])
+	return (indptr,) + tuple(None if column is None else np.asarray(column)[order] for column in columns)
+
+
+def _accumulate(buffer, index, values, accumulation='auto'):
+	"""
+	buffer[index] += values, for repeated indices, with np.bincount or np.add.at,
+	whichever is faster for their number ('auto'), or always with np.bincount,
+	so that the order of the additions does not depend on the number of values.
+	"""
+	if accumulation == 'bincount' or len(index) > len(buffer) // 8:
+		buffer += np.bincount(index, values, minlength=len(buffer))
+	else:
+		np.add.at(buffer, index, values)
+
+
+class Synapses(object):
+
+	def __init__(self, indptr, indices, weights, post_size, delays=1.0, timestep=0.1, accumulation='auto'):
+		self.indptr = np.asarray(indptr, dtype=np.int64)
+		self.indices = np.asarray(indices, dtype=np.int32)
+		self.weights = np.asarray(weights, dtype=np.float32)
+		self.post_size = post_size
+		self.timestep = timestep
+		self.accumulation = accumulation
+		delay_steps = np.rint(np.asarray(delays, dtype=float) / timestep).astype(np.int64)
+		if delay_steps.size == 0:
+			delay_steps = np.ones(1, dtype=np.int64)
+		if np.any(delay_steps < 1):
+			raise ValueError("Synaptic delays must be at least one time step (%g ms)" % timestep)
+		if delay_steps.ndim == 0 or np.all(delay_steps == delay_steps.flat[0]):
+			self.delay_steps = int(delay_steps.flat[0])
+			self.delays = None
+		else:
+			self.delay_steps = None
+			self.delays = delay_steps.astype(np.int16 if delay_steps.max() <= np.iinfo(np.int16).max else np.int32)
+		self.min_delay_steps = self.delay_steps or int(self.delays.min())
+		# the presynaptic engine may be ahead of the postsynaptic one by up to the shortest delay
+		n_slots = 2 * self.delay_steps if self.delays is None else int(self.delays.max()) + int(self.delays.min())
+		self.buffer = np.zeros((n_slots, post_size))
+		self._filled = np.zeros(n_slots, dtype=bool)
+
+	@classmethod
+	def from_connections(cls, pre_size, post_size, sources, targets, weights, delays=1.0, timestep=0.1, **parameters):
+		"""
+		Synapses from one entry per connection; `weights` and `delays` may also be
+		scalars. Other parameters are passed on to the constructor.
+		"""
+		n = len(sources)
+		weights = np.broadcast_to(np.asarray(weights, dtype=np.float32), (n,))
+		delays = np.asarray(delays, dtype=float)
+		if delays.ndim:
+			indptr, targets, weights, delays = to_csr(pre_size, sources, targets, weights, delays)
+		else:
+			indptr, targets, weights = to_csr(pre_size, sources, targets, weights)
+		return cls(indptr, targets, weights, post_size, delays, timestep, **parameters)
+
+	def __len__(self):
+		return len(self.indices)
+
+	def connect(self, pre_engine, post_engine):
+		pre_engine.add_recorder(self)
+		post_engine.add_input(self)
+		return self
+
+	def sources(self):
+		"""Presynaptic cell of each synapse."""
+		return np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+
+	def delays_ms(self):
+		if self.delays is None:
+			return np.full(len(self.indices), self.delay_steps * self.timestep)
+		return self.delays * self.timestep
+
+	def schedule(self, cells, step):
+		"""
+		Add the spikes of `cells`, emitted during the time step that ended with
+		step count `step`, to the input of the steps at which they arrive.
+		"""
+		synapses = rows_of(self.indptr, cells)
+		if not synapses.size:
+			return
+		efficacies = self.efficacy(cells, synapses, step)
+		n_slots = len(self.buffer)
+		if self.delays is None:
+			slot = (step - 1 + self.delay_steps) % n_slots
+			_accumulate(self.buffer[slot], self.indices[synapses], efficacies, self.accumulation)
+			self._filled[slot] = True
+		else:
+			slots = (step - 1 + self.delays[synapses]) % n_slots
+			_accumulate(self.buffer.reshape(-1), slots * self.post_size + self.indices[synapses], efficacies,
+						self.accumulation)
+			self._filled[slots] = True
+
+	def efficacy(self, cells, synapses, step):
+		"""Amounts delivered by `synapses`, the synapses of `cells`, which spiked at step count `step`."""
+		return self.weights[synapses]
+
+	def checkpoint(self):
+		"""The spikes on their way, as a dict of arrays (see checkpoint.py)."""
+		return {'buffer': self.buffer, 'filled': self._filled}
+
+	def restore(self, arrays):
+		if arrays['buffer'].shape != self.buffer.shape:
+			raise ValueError("The checkpoint has a ring buffer of shape %s, not %s" % (
+				arrays['buffer'].shape, self.buffer.shape))
+		self.buffer[:] = arrays['buffer']
+		self._filled[:] = arrays['filled']
+
+	# recorder protocol, on the presynaptic engine
+
+	def reserve(self, engine, n_steps):
+		pass
+
+	def sample(self, engine):
+		if engine.spikes.size:
+			self.schedule(engine.spikes, engine.step_count)
+
+	def flush(self):
+		pass
+
+	# input protocol, on the postsynaptic engine
+
+	def arrivals(self, engine):
+		"""
+		The row of the ring with the input arriving during the coming step of
+		`engine`, which the caller sets to zero once used, or None if there is none.
+		"""
+		slot = engine.step_count % len(self.buffer)
+		if not self._filled[slot]:
+			return None
+		self._filled[slot] = False
+		return self.buffer[slot]
+
+	def add_current(self, engine, I):
+		received = self.arrivals(engine)
+		if received is not None:
+			# a jump of `weight` in v over one forward-Euler step
+			received *= 1.0 / engine.timestep
+			I += received
+			received[:] = 0.0
+
+
+# Parameters of the stpSynapse of neuroConstruct/cellMechanisms/STP_NML2 (ms, mV), see read_stp_synapse()
+STP_NML2 = {
+	'U': 0.5,
+	'tau_rec': 120.0,
+	'tau_fac': 0.0,
+	'tau_rise': 0.1,
+	'tau_decay': 2.0,
+	'e_rev': 0.0,
+}
+
+
+def read_stp_synapse(filename):
+	"""Parameters of the (first) stpSynapse of a NeuroML2 file, for STPSynapses."""
+	import xml.etree.ElementTree as ElementTree
+	from izhikevich.lems import quantity
+
+	for element in ElementTree.parse(filename).getroot().iter():
+		if element.tag.rsplit('}', 1)[-1] == 'stpSynapse':
+			plasticity = [child for child in element if child.tag.rsplit('}', 1)[-1] == 'plasticity'][0]
+			return {
+				'U': quantity(plasticity.get('initReleaseProb')),
+				'tau_rec': quantity(plasticity.get('tauRec')),
+				'tau_fac': quantity(plasticity.get('tauFac', '0ms')),
+				'tau_rise': quantity(element.get('tauRise')),
+				'tau_decay': quantity(element.get('tauDecay')),
+				'e_rev': quantity(element.get('erev')),
+			}
+	raise ValueError("No stpSynapse in %s" % filename)
+
+
+class STPSynapses(Synapses):
+	"""
+	Synapses with short-term depression and facilitation (Tsodyks-Markram, in
+	the form of NEST's tsodyks2_synapse). A spike arriving `dt` ms after the
+	previous one of its presynaptic cell has the efficacy weight * u * x, with
+
+		x = 1 - (1 - x' (1 - u')) exp(-dt / tau_rec)
+		u = U + u' (1 - U) exp(-dt / tau_fac)	(u = U if tau_fac is 0)
+
+	x' and u' being their values at the previous spike. x (and u, only kept
+	if tau_fac > 0) are float32 arrays with one value per synapse, updated only
+	for the synapses of cells that spike, and the time of the last spike is
+	kept per presynaptic cell.
+
+	Without tau_decay, synapses are delta synapses, as in Synapses. Otherwise
+	each spike adds its efficacy, as peak conductance, to a double-exponential
+	conductance g (time constants tau_rise and tau_decay) per postsynaptic cell,
+	giving the current g (e_rev - v), as NeuroML2's expTwoSynapse:
+	STPSynapses.from_connections(..., **STP_NML2) gives the stpSynapse of
+	STP_NML2.
+	"""
+
+	def __init__(self, indptr, indices, weights, post_size, delays=1.0, timestep=0.1, U=0.5, tau_rec=100.0,
+				 tau_fac=0.0, tau_rise=None, tau_decay=None, e_rev=0.0, accumulation='auto'):
+		Synapses.__init__(self, indptr, indices, weights, post_size, delays, timestep, accumulation)
+		self.U = U
+		self.tau_rec = tau_rec
+		self.tau_fac = tau_fac
+		self.x = np.ones(len(self.indices), dtype=np.float32)
+		self.u = np.full(len(self.indices), U, dtype=np.float32) if tau_fac > 0 else None
+		self.last_spike = np.full(len(self.indptr) - 1, np.iinfo(np.int64).min // 2, dtype=np.int64)
+
+		self.tau_rise = tau_rise
+		self.tau_decay = tau_decay
+		self.e_rev = e_rev
+		if tau_decay is not None:
+			tau_rise = tau_rise or 0.0
+			if tau_rise > 0:
+				peak = tau_rise * tau_decay / (tau_decay - tau_rise) * np.log(tau_decay / tau_rise)
+				self._normalization = 1.0 / (np.exp(-peak / tau_decay) - np.exp(-peak / tau_rise))
+			else:
+				self._normalization = 1.0
+			self._rise_decay = np.exp(-timestep / tau_rise) if tau_rise > 0 else 0.0
+			self._decay = np.exp(-timestep / tau_decay)
+			self.rise = np.zeros(post_size)
+			self.fall = np.zeros(post_size)
+			self._g = np.empty(post_size)
+			self._active = False
+
+	def efficacy(self, cells, synapses, step):
+		lengths = self.indptr[cells + 1] - self.indptr[cells]
+		elapsed = (step - self.last_spike[cells]) * self.timestep
+		self.last_spike[cells] = step
+		x = self.x[synapses]
+		if self.u is None:
+			u = self.U
+			x *= 1.0 - u
+		else:
+			u = self.u[synapses]
+			x *= 1.0 - u
+			u *= (1.0 - self.U) * np.repeat(np.exp(-elapsed / self.tau_fac), lengths).astype(np.float32)
+			u += self.U
+			self.u[synapses] = u
+		# recovery of the resources since the previous spike, in closed form
+		x -= 1.0
+		x *= np.repeat(np.exp(-elapsed / self.tau_rec), lengths).astype(np.float32)
+		x += 1.0
+		self.x[synapses] = x
+		x *= u
+		x *= self.weights[synapses]
+		return x
+
+	def checkpoint(self):
+		arrays = Synapses.checkpoint(self)
+		arrays.update(x=self.x, last_spike=self.last_spike)
+		if self.u is not None:
+			arrays['u'] = self.u
+		if self.tau_decay is not None:
+			arrays.update(rise=self.rise, fall=self.fall, active=np.bool_(self._active))
+		return arrays
+
+	def restore(self, arrays):
+		Synapses.restore(self, arrays)
+		self.x[:] = arrays['x']
+		self.last_spike[:] = arrays['last_spike']
+		if self.u is not None:
+			self.u[:] = arrays['u']
+		if self.tau_decay is not None:
+			self.rise[:] = arrays['rise']
+			self.fall[:] = arrays['fall']
+			self._active = bool(arrays['active'])
+
+	def add_current(self, engine, I):
+		if self.tau_decay is None:
+			return Synapses.add_current(self, engine, I)
+		received = self.arrivals(engine)
+		if received is not None:
+			received *= self._normalization
+			self.rise += received
+			self.fall += received
+			received[:] = 0.0
+			self._active = True
+		if self._active:
+			g = self._g
+			np.subtract(self.fall, self.rise, out=g)
+			g *= self.e_rev - engine.v
+			I += g
+			self.rise *= self._rise_decay
+			self.fall *= self._decay
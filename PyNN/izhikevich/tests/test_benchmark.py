@@ -0,0 +1,15 @@
+"""Tests of the benchmark runner."""
+
+from izhikevich.benchmark import run_benchmarks
+
+
+def test_a_failing_case_is_recorded_and_the_others_still_run():
+	cases = [
+		{'simulator': 'numpy', 'case': 'panel', 'panel': 'A', 'duration': 100.0, 'timestep': 0.1, 'variable': 'w'},
+		{'simulator': 'numpy', 'case': 'population', 'size': 10, 'duration': 50.0, 'timestep': 0.1,
+		 'variable': 'spikes'},
+	]
+	failed, succeeded = run_benchmarks(cases)['results']
+	assert failed['error'].startswith('ValueError')
+	assert 'error' not in succeeded
+	assert succeeded['n_spikes'] > 0
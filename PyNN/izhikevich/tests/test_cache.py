@@ -0,0 +1,40 @@
+"""Tests of the result cache."""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from izhikevich import cache
+from izhikevich.cache import ResultCache
+
+
+def test_a_failed_write_leaves_no_temporary_file(tmp_path, monkeypatch):
+	results = ResultCache(str(tmp_path))
+	results.put('kept', v=np.arange(3.0))
+
+	def savez(f, **arrays):
+		f.write(b"partial")
+		raise IOError("No space left on device")
+
+	monkeypatch.setattr(cache.np, 'savez', savez)
+	with pytest.raises(IOError):
+		results.put('failed', v=np.arange(3.0))
+	assert os.listdir(str(tmp_path)) == ['kept.npz']
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+	results = ResultCache(str(tmp_path))
+	stale = tmp_path / 'stale.npz.tmp'
+	recent = tmp_path / 'recent.npz.tmp'
+	stale.write_bytes(b"x" * 100)
+	recent.write_bytes(b"x" * 100)
+	old = time.time() - 2 * cache.STALE_SECONDS
+	os.utime(str(stale), (old, old))
+
+	results.evict()
+	assert sorted(os.listdir(str(tmp_path))) == ['recent.npz.tmp']
+	os.utime(str(recent), (old, old))
+	results.invalidate()
+	assert os.listdir(str(tmp_path)) == []
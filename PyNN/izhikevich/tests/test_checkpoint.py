@@ -0,0 +1,61 @@
+"""Tests of saving and restoring the state of a simulation (checkpoint.py)."""
+
+import os
+
+import numpy as np
+
+from izhikevich import numpysim as sim
+
+
+def build(directory):
+	"""Two populations, with STP and static projections, a step current and a streamed recording."""
+	sim.setup(timestep=0.1, min_delay=0.5)
+	excitatory = sim.Population(40, sim.Izhikevich(i_offset=np.linspace(2.0, 12.0, 40)))
+	inhibitory = sim.Population(10, sim.Izhikevich(a=0.1, d=2.0))
+	excitatory.initialize(v=-65.0, u=-13.0)
+	inhibitory.initialize(v=-65.0, u=-13.0)
+	source = sim.StepCurrentSource(times=[50.0, 150.0, 210.0], amplitudes=[8.0, 2.0, 12.0])
+	source.inject_into(inhibitory)
+	sim.Projection(excitatory, inhibitory, sim.FixedProbabilityConnector(0.3, rng=np.random.RandomState(1)),
+				   sim.TsodyksMarkramSynapse(U=0.3, tau_rec=80.0, tau_facil=150.0, weight=4.0, delay=1.5))
+	sim.Projection(inhibitory, excitatory, sim.FixedProbabilityConnector(0.5, rng=np.random.RandomState(2)),
+				   sim.StaticSynapse(weight=2.0, delay=0.7), receptor_type='inhibitory')
+	# recurrent synapses with delays of 0.5 to 3 ms
+	rng = np.random.RandomState(3)
+	connections = [(i, j, 1.0, 0.5 + 0.1 * rng.randint(26)) for i in range(40) for j in range(40) if rng.rand() < 0.1]
+	sim.Projection(excitatory, excitatory, sim.FromListConnector(connections))
+	excitatory.record('spikes')
+	excitatory.record('v', to_file=directory)
+	inhibitory.record(['spikes', 'v'])
+	return excitatory, inhibitory
+
+
+def results(excitatory, inhibitory):
+	return (excitatory.get_spikes(), inhibitory.get_spikes(),
+			np.array(excitatory.get_data('v').segments[0].analogsignals[0]),
+			np.array(inhibitory.get_data('v').segments[0].analogsignals[0]))
+
+
+def test_restore_continues_exactly(tmpdir):
+	cells = build(str(tmpdir.mkdir('continuous')))
+	sim.run_until(300.0)
+	continuous = results(*cells)
+
+	# run to 120 ms, then, as after an interruption, build the same model again and continue from the checkpoint
+	filename = os.path.join(str(tmpdir), 'run.npz')
+	directory = str(tmpdir.mkdir('interrupted'))
+	build(directory)
+	sim.run_until(120.0, checkpoint=filename, checkpoint_interval=50.0)
+	sim.run_until(160.0)
+	cells = build(directory)
+	assert sim.restore_checkpoint(filename) == 120.0
+	sim.run_until(300.0)
+	restored = results(*cells)
+
+	assert len(continuous[0][0]) > 0 and len(continuous[1][0]) > 0
+	for expected, actual in zip(continuous[:2], restored[:2]):
+		assert np.array_equal(expected[0], actual[0])
+		assert np.array_equal(expected[1], actual[1])
+	for expected, actual in zip(continuous[2:], restored[2:]):
+		assert expected.shape == actual.shape == (3001, expected.shape[1])
+		assert np.array_equal(expected, actual)
@@ -0,0 +1,71 @@
+"""Tests of the min/max envelope of traces, against a brute-force reference."""
+
+import numpy as np
+import pytest
+
+from izhikevich.decimate import Envelope, decimate
+
+
+def brute_force(times, values, samples_per_bin):
+	"""First sample, min and max of each bucket of `samples_per_bin` samples in time order, and last sample."""
+	rows = [(times[0], values[0])]
+	for start in range(0, len(times), samples_per_bin):
+		bucket = slice(start, start + samples_per_bin)
+		low = start + int(np.argmin(values[bucket]))
+		high = start + int(np.argmax(values[bucket]))
+		rows += [(times[i], values[i]) for i in sorted([low, high])]
+	rows.append((times[-1], values[-1]))
+	return np.array([t for t, v in rows]), np.array([v for t, v in rows])
+
+
+def expected(times, values, samples_per_bin):
+	"""brute_force() of a trace, or of each cell of a (samples, cells) array, as Envelope.result() gives it."""
+	if values.ndim == 1:
+		return brute_force(times, values, samples_per_bin)
+	columns = [brute_force(times, values[:, cell], samples_per_bin) for cell in range(values.shape[1])]
+	return np.column_stack([t for t, v in columns]), np.column_stack([v for t, v in columns])
+
+
+def _trace(shape, seed=1):
+	rng = np.random.RandomState(seed)
+	times = 0.1 * np.arange(shape[0])
+	return times, rng.normal(size=shape).cumsum(axis=0)
+
+
+def _chunks(n, seed=2):
+	"""Uneven chunk boundaries, including chunks of a single sample."""
+	rng = np.random.RandomState(seed)
+	sizes = rng.choice([1, 2, 3, 17, 64, 250, 999], size=n)
+	bounds = np.concatenate([[0], np.cumsum(sizes)])
+	return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if start < n]
+
+
+@pytest.mark.parametrize('shape', [(10007,), (10007, 3)])
+def test_streamed_envelope_matches_brute_force(shape):
+	times, values = _trace(shape)
+	envelope = Envelope(16)
+	for start, stop in _chunks(len(times)):
+		envelope.add(times[start:stop], values[start:stop])
+		# the envelope of what has arrived so far, with the current bucket size
+		result_times, result_values = envelope.result()
+		reference_times, reference_values = expected(times[:stop], values[:stop], envelope.samples_per_bin)
+		assert np.array_equal(result_times, reference_times)
+		assert np.array_equal(result_values, reference_values)
+	assert 16 <= -(-len(times) // envelope.samples_per_bin) <= 32
+	assert np.array_equal(result_values.min(axis=0), values.min(axis=0))
+	assert np.array_equal(result_values.max(axis=0), values.max(axis=0))
+	assert np.all(np.diff(result_times, axis=0) >= 0)
+
+
+@pytest.mark.parametrize('shape', [(10007,), (10007, 3)])
+def test_streamed_envelope_matches_decimate(shape):
+	times, values = _trace(shape)
+	n_bins = 40
+	envelope = Envelope(n_bins, -(-len(times) // n_bins))
+	for start, stop in _chunks(len(times)):
+		envelope.add(times[start:stop], values[start:stop])
+	decimated_times, decimated_values = decimate(times, values, n_bins)
+	result_times, result_values = envelope.result()
+	assert np.array_equal(result_times, decimated_times)
+	assert np.array_equal(result_values, decimated_values)
+	assert np.array_equal(decimated_values, expected(times, values, -(-len(times) // n_bins))[1])
@@ -0,0 +1,13 @@
+"""Tests of the distributed network (distributed.py)."""
+
+from izhikevich.distributed import BLOCK_SIZE, launch, simulate
+
+
+def test_results_do_not_depend_on_the_number_of_ranks():
+	# several blocks of cells, so that every rank owns some, with spikes crossing between ranks
+	size = 3 * BLOCK_SIZE + 100
+	records = [launch(simulate, n_ranks, size, 100.0, 50)[0] for n_ranks in (1, 2, 3)]
+	assert records[0]['spikes'] > 0
+	for record in records[1:]:
+		assert record['spikes'] == records[0]['spikes']
+		assert record['digest'] == records[0]['digest']
@@ -0,0 +1,112 @@
+"""
+Regression tests of engine.Engine and of the numpy backend against a scalar
+forward-Euler reference and against each other.
+"""
+
+import numpy as np
+import pytest
+
+from izhikevich import numpysim
+from izhikevich.engine import Engine
+from izhikevich.panels import TIMESTEP, get_panels, run_batched, run_panel
+from izhikevich.recording import SpikeRecorder, StateRecorder, StreamingRecorder, StreamedRecording
+from izhikevich.sources import RampCurrentSource
+from izhikevich.synapses import Synapses
+
+
+def euler_reference(panel, timestep=TIMESTEP):
+	"""Spike times of a panel's cell, one cell and one time step at a time, in plain Python."""
+	p = panel['generalized_parameters']
+	v = panel['generalized_initial_values']['v']
+	u = panel['generalized_initial_values']['u']
+	changes = [(int(round(time / timestep)), amplitude) for time, amplitude in panel['steps']]
+	ramps = [RampCurrentSource(**ramp) for ramp in panel['ramps']]
+	spikes = []
+	for step in range(int(round(panel['duration'] / timestep))):
+		I = p['i_offset']
+		for change, amplitude in changes:
+			if change <= step:
+				I = amplitude
+		for ramp in ramps:
+			I += ramp.amplitude_at(step, timestep)
+		dv = ((p['X'] * v + p['Y']) * v + p['Z'] - u + I) * timestep
+		if p['accommodation']:
+			du = p['a'] * p['b'] * (v + 65.0) * timestep
+		else:
+			du = p['a'] * (p['b'] * v - u) * timestep
+		v += dv
+		u += du
+		if v >= 30.0:
+			spikes.append((step + 1) * timestep)
+			v = p['c']
+			u += p['d']
+	return np.array(spikes)
+
+
+def engine_spikes(panel, timestep=TIMESTEP):
+	engine = Engine(1, panel['generalized_parameters'], panel['generalized_initial_values'], timestep)
+	for ramp in panel['ramps']:
+		engine.inject(RampCurrentSource(**ramp))
+	recorder = engine.add_recorder(SpikeRecorder())
+	for time, amplitude in panel['steps']:
+		engine.run_until(time)
+		engine.set(i_offset=amplitude)
+	engine.run_until(panel['duration'])
+	return recorder.data()[1]
+
+
+def test_panel_a_spike_times():
+	spikes = engine_spikes(get_panels(['A'])[0])
+	assert np.allclose(spikes, [12.65, 16.16, 29.01, 56.03, 82.8])
+
+
+@pytest.mark.parametrize('label', ['A', 'G', 'R'])
+def test_engine_matches_scalar_euler(label):
+	# A: the standard model, G: X, Y, Z of figure1.m and a ramp, R: accommodation and a ramp
+	panel = get_panels([label])[0]
+	reference = euler_reference(panel)
+	spikes = engine_spikes(panel)
+	assert len(reference) > 0
+	assert len(spikes) == len(reference)
+	assert np.allclose(spikes, reference)
+
+
+def test_run_batched_matches_run_panel():
+	panels = get_panels()
+	batched_spikes = run_batched(numpysim, panels, variable='spikes')
+	batched_v = run_batched(numpysim, panels)
+	for panel in panels:
+		spikes = run_panel(numpysim, panel, variable='spikes')
+		times, v = run_panel(numpysim, panel)
+		assert np.array_equal(batched_spikes[panel['label']], spikes), panel['label']
+		batched_times, batched = batched_v[panel['label']]
+		assert np.allclose(batched_times, times), panel['label']
+		assert np.allclose(batched, np.asarray(v).reshape(batched.shape)), panel['label']
+
+
+def test_float32_engine_keeps_its_state_and_recordings_in_float32(tmp_path):
+	engine = Engine(3, {'i_offset': np.array([10.0, 0.0, 0.0])}, timestep=0.1, dtype=np.float32)
+	engine.inject(RampCurrentSource(10.0, 30.0, 0.0, 5.0), np.array([2]))
+	synapses = Synapses.from_connections(3, 3, [0, 0], [1, 2], 20.0, delays=[1.0, 2.5], timestep=0.1)
+	synapses.connect(engine, engine)
+	state = engine.add_recorder(StateRecorder(['v', 'u']))
+	streamed = engine.add_recorder(StreamingRecorder(str(tmp_path), ['v', 'u'], chunk_size=64))
+	spikes = engine.add_recorder(SpikeRecorder(snapshot=('v', 'u')))
+	engine.run(100.0)
+
+	arrays = [engine.v, engine.u, engine._I] + list(engine.parameters.values())
+	arrays += [state.data('v'), state.data('u'), spikes.snapshots('v'), spikes.snapshots('u')]
+	recording = StreamedRecording(str(tmp_path))
+	arrays += [recording.array('v'), recording.array('u')]
+	for array in arrays:
+		assert array.dtype == np.float32
+	# the synapses and the ramp reached their targets
+	cells, times = spikes.data()
+	assert set(cells) == set([0, 1, 2])
+	assert len(state.data('v')) == recording.n_samples == 1001
+
+
+def test_float32_run_batched_panel_a():
+	spikes = run_batched(numpysim, get_panels(['A']), variable='spikes', dtype=np.float32)['A']
+	assert len(spikes) == 5
+	assert np.allclose(spikes, [12.65, 16.16, 29.01, 56.03, 82.8], atol=0.5)
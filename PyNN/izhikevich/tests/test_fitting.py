@@ -0,0 +1,36 @@
+"""Tests of the spike-train distance used by the fit (fitting.py)."""
+
+import numpy as np
+import pytest
+
+from izhikevich.fitting import padded, van_rossum
+
+
+TARGET = np.array([10.0, 400.0, 800.0])
+
+
+@pytest.mark.parametrize('n', [1, 2, 5])
+def test_isolated_spikes_add_sqrt_n(n):
+	# far apart from each other and from the target, with respect to tau = 5 ms
+	extra = 1000.0 + 200.0 * np.arange(n)
+	longer = np.concatenate([TARGET, extra])
+	shorter = TARGET[:max(0, len(TARGET) - n)]
+	trains = np.full((3, len(longer)), np.nan)
+	trains[0, :len(TARGET)] = TARGET
+	trains[1] = longer
+	trains[2, :len(shorter)] = shorter
+	distances = van_rossum(trains, TARGET, tau=5.0)
+	assert distances[0] == 0.0
+	assert np.isclose(distances[1], np.sqrt(n), rtol=1e-6)
+	if n <= len(TARGET):
+		assert np.isclose(distances[2], np.sqrt(n), rtol=1e-6)
+
+
+def test_spikes_beyond_max_spikes_count_as_isolated():
+	times = 300.0 * np.arange(300)
+	trains, dropped = padded(np.zeros(300, dtype=np.int64), times, 2, max_spikes=200)
+	assert trains.shape == (2, 200)
+	assert list(dropped) == [100, 0]
+	distances = van_rossum(trains, [], tau=5.0, dropped=dropped)
+	assert np.isclose(distances[0], np.sqrt(300), rtol=1e-6)
+	assert distances[1] == 0.0
@@ -0,0 +1,80 @@
+"""Tests of the LEMS compiler, against the engine."""
+
+import os
+
+import numpy as np
+import pytest
+
+from izhikevich import lems
+from izhikevich.engine import Engine
+from izhikevich.recording import SpikeRecorder
+from izhikevich.sources import StepCurrentSource, RampCurrentSource
+
+
+LEMS_FILE = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'NeuroML2', 'LEMS_WhichModel.xml')
+
+
+@pytest.fixture(scope='module')
+def results():
+	return lems.Simulation(lems.load(LEMS_FILE)).run([])
+
+
+def _engine_spikes(parameters, v, u, sources, duration=400.0):
+	engine = Engine(1, parameters, {'v': v, 'u': u}, 0.01)
+	for source in sources:
+		engine.inject(source)
+	spikes = engine.add_recorder(SpikeRecorder())
+	engine.run(duration)
+	return spikes.data()[1]
+
+
+@pytest.mark.parametrize('population, parameters, v, u, sources', [
+	# izhikevichCell
+	('popA', dict(a=0.02, b=0.2, c=-65.0, d=6.0), -70.0, -14.0, [StepCurrentSource([10.0, 100.0], [14.0, 0.0])]),
+	# generalizedIzhikevichCell
+	('popG', dict(a=0.02, b=-0.1, c=-55.0, d=6.0, X=0.04, Y=4.1, Z=108.0), -60.0, 6.0,
+	 [RampCurrentSource(30.0, 270.0, 0.0, 20.25, 0.0)]),
+	# accomodationIzhikevichCell
+	('popR', dict(a=0.02, b=1.0, c=-55.0, d=4.0, accommodation=1.0), -65.0, -16.0,
+	 [RampCurrentSource(0.0, 200.0, 0.0, 8.0, 0.0), RampCurrentSource(300.0, 12.5, 0.0, 4.0, 0.0)]),
+])
+def test_net1_spikes_match_the_engine(results, population, parameters, v, u, sources):
+	expected = _engine_spikes(parameters, v, u, sources)
+	assert len(expected) > 0
+	assert np.allclose(results.spike_times(population), expected, rtol=0, atol=1e-9)
+
+
+def test_expressions_follow_the_precedence_of_lems():
+	rename = {'x': 'x', 'y': 'y'}
+	x = np.array([1.0, 2.0, 3.0])
+	y = np.array([2.0, 2.0, 2.0])
+	namespace = {'np': np, 'x': x, 'y': y}
+	assert np.array_equal(eval(lems.compile_expression("-x^2 + 3 * y / 2", rename), namespace), -x ** 2 + 3 * y / 2)
+	assert np.array_equal(eval(lems.compile_expression("x .gt. 1 .and. .not. x .geq. y + 1", rename), namespace),
+						  [False, True, False])
+	assert np.allclose(eval(lems.compile_expression("exp(-(x - y)) * abs(y - 3)", rename), namespace),
+					   np.exp(-(x - y)))
+
+
+@pytest.mark.parametrize('text', ["x +", "(x + 1", "x y", "x + 1)", "f(x)", "z * 2", "x $ 2", ""])
+def test_bad_expressions_raise_value_error(text):
+	with pytest.raises(ValueError):
+		lems.compile_expression(text, {'x': 'x'})
+
+
+def test_bad_expression_in_a_component_type_is_reported(tmp_path):
+	filename = tmp_path / 'bad.xml'
+	filename.write_text("""<Lems>
+	<ComponentType name="leaky">
+		<Parameter name="tau" dimension="time"/>
+		<Dynamics>
+			<StateVariable name="v" dimension="voltage"/>
+			<TimeDerivative variable="v" value="-v / (tau"/>
+		</Dynamics>
+	</ComponentType>
+	<leaky id="cell" tau="10ms"/>
+	<network id="net"><population id="pop" component="cell" size="2"/></network>
+	<Simulation id="sim" length="1ms" step="0.1ms" target="net"/>
+</Lems>""")
+	with pytest.raises(ValueError, match="tau"):
+		lems.Simulation(lems.load(str(filename)))
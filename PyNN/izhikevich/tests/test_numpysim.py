@@ -0,0 +1,113 @@
+"""Tests of the PyNN API of the numpy backend."""
+
+import numpy as np
+import pytest
+
+from izhikevich import numpysim as sim
+
+
+def _population():
+	sim.setup(timestep=0.1)
+	population = sim.Population(30, sim.Izhikevich(i_offset=np.linspace(0.0, 20.0, 30)))
+	population.initialize(v=-70.0, u=-14.0)
+	return population
+
+
+def test_view_recordings_are_kept_by_the_parent():
+	population = _population()
+	population[10:20].record(['spikes', 'v'])
+	sim.run(200.0)
+	view = population[10:20].get_data().segments[0]
+	parent = population.get_data().segments[0]
+
+	sim.setup(timestep=0.1)
+	reference = _population()
+	reference.record(['spikes', 'v'])
+	sim.run(200.0)
+	whole = reference.get_data().segments[0]
+
+	assert len(view.spiketrains) == 10
+	for i in range(10):
+		assert np.array_equal(view.spiketrains[i], whole.spiketrains[10 + i])
+		assert np.array_equal(parent.spiketrains[10 + i], whole.spiketrains[10 + i])
+	assert sum(len(train) for train in parent.spiketrains) == sum(len(train) for train in view.spiketrains)
+	v = whole.filter(name='v')[0]
+	assert np.array_equal(view.filter(name='v')[0], v[:, 10:20])
+	assert np.array_equal(parent.filter(name='v')[0], v[:, 10:20])
+	assert list(parent.filter(name='v')[0].channel_index) == list(range(10, 20))
+
+
+def test_view_of_recorded_population():
+	population = _population()
+	population.record('spikes')
+	sim.run(100.0)
+	cells, times = population.get_spikes()
+	view_cells, view_times = population[25:].get_spikes()
+	selected = cells >= 25
+	assert view_times.size > 0
+	assert np.array_equal(view_cells, cells[selected] - 25)
+	assert np.array_equal(view_times, times[selected])
+
+
+def test_record_with_a_filename_writes_the_data_at_end(tmp_path):
+	filename = str(tmp_path / 'results' / 'spikes_and_v.npz')
+	population = _population()
+	sim.record(['spikes', 'v'], population, filename)
+	sim.run(100.0)
+	cells, times = population.get_spikes()
+	v = population.get_data('v').segments[0].analogsignals[0]
+	sim.end()
+
+	data = np.load(filename)
+	assert np.array_equal(data['spikes.cells'], cells)
+	assert np.array_equal(data['spikes.times'], times)
+	assert np.array_equal(data['v'], v)
+	assert data['v'].shape == (1001, 30)
+	assert data['v.sampling_period'] == 0.1
+
+
+def test_spikes_can_not_be_streamed(tmp_path):
+	population = _population()
+	with pytest.raises(ValueError):
+		population.record(['spikes', 'v'], to_file=str(tmp_path))
+	with pytest.warns(UserWarning):
+		population.record(['spikes', 'v'], sampling_interval=1.0)
+
+
+def test_spike_snapshots_are_returned_by_get_data(tmp_path):
+	population = _population()
+	population.record('spikes', snapshot=('v', 'u'))
+	population[:15].record('v')
+	sim.run(100.0)
+	trains = population.get_data('spikes').segments[0].spiketrains
+	view_trains = population[10:20].get_data('spikes').segments[0].spiketrains
+	v = population[:15].get_data('v').segments[0].analogsignals[0]
+
+	# v just before the reset, i.e. above the threshold, and after it c = -65 mV
+	spiking = [index for index in range(15) if len(trains[index])]
+	assert spiking
+	for index in spiking:
+		train = trains[index]
+		assert sorted(train.array_annotations) == ['u', 'v']
+		assert len(train.array_annotations['v']) == len(train)
+		assert np.all(train.array_annotations['v'] >= 30.0)
+		steps = np.rint(np.asarray(train) / 0.1).astype(int)
+		assert np.all(v[steps, index] == -65.0)
+	for index in range(10):
+		assert np.array_equal(view_trains[index].array_annotations['u'], trains[10 + index].array_annotations['u'])
+
+	filename = str(tmp_path / 'spikes.npz')
+	population.write_data(filename, 'spikes')
+	data = np.load(filename)
+	assert len(data['spikes.v']) == len(data['spikes.times']) == sum(len(train) for train in trains)
+
+
+def test_snapshot_only_of_v_and_u_with_spikes():
+	population = _population()
+	with pytest.raises(ValueError):
+		population.record('spikes', snapshot=('w',))
+	with pytest.raises(ValueError):
+		population.record('v', snapshot=('v',))
+	population.record('spikes')
+	with pytest.raises(ValueError):
+		population.record('spikes', snapshot=('v',))
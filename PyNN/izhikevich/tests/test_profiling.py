@@ -0,0 +1,35 @@
+"""Tests of the profiling of the phases of a script."""
+
+import pytest
+
+from izhikevich import numpysim as sim
+from izhikevich.profiling import Profiler, instrument
+
+
+def _script(namespace):
+	namespace['setup'](timestep=0.1)
+	population = namespace['create'](sim.Izhikevich, {'i_offset': 10.0}, n=2)
+	population.record('spikes')
+	namespace['run'](50.0)
+	return population.get_data()
+
+
+def test_instrument_records_the_phases_and_can_be_undone():
+	namespace = {'setup': sim.setup, 'create': sim.create, 'run': sim.run}
+	get_data = sim.Population.get_data
+	profiler = Profiler()
+	restore = instrument(namespace, sim, profiler, labels="A")
+	with pytest.raises(ValueError):
+		instrument(dict(namespace), sim, Profiler())
+	_script(namespace)
+	profiler.finish()
+	assert [path for path, total in profiler.totals()] == ['A;setup', 'A;build', 'A;run', 'A;get_data',
+														   'A;plotting', 'A']
+
+	restore()
+	assert namespace == {'setup': sim.setup, 'create': sim.create, 'run': sim.run}
+	assert sim.Population.get_data is get_data
+	assert 'get_data' not in sim.Population.__dict__
+	events = len(profiler.events)
+	_script(namespace)
+	assert len(profiler.events) == events
@@ -0,0 +1,36 @@
+"""Tests of the recorders of the engine."""
+
+import numpy as np
+
+from izhikevich import numpysim as sim
+from izhikevich.recording import StreamedRecording
+
+
+def _population():
+	sim.setup(timestep=0.1)
+	population = sim.Population(5, sim.Izhikevich(i_offset=np.linspace(0.0, 20.0, 5)))
+	population.initialize(v=-70.0, u=-14.0)
+	return population
+
+
+def test_streamed_recordings_survive_a_rerun(tmp_path):
+	directory = str(tmp_path / 'v')
+	population = _population()
+	population.record('v', to_file=directory)
+	sim.run(100.0)
+	first = population.get_data(clear=True).segments[0].analogsignals[0]
+	recording = StreamedRecording(directory)
+	expected = np.array(first)
+
+	population.initialize(v=-65.0, u=-13.0)
+	sim.run(100.0)
+	second = population.get_data().segments[0].analogsignals[0]
+
+	# the earlier recording still reads its own samples, from its own files
+	assert np.array_equal(first, expected)
+	assert np.array_equal(recording.window('v'), expected)
+	assert len(expected) == 1001
+	assert len(second) == 1001
+	assert second.t_start == 100.0
+	assert np.all(second[0] == -65.0)
+	assert np.array_equal(StreamedRecording(directory).array('v'), second)
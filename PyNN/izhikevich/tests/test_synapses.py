@@ -0,0 +1,87 @@
+"""Tests of synaptic delivery (synapses.py)."""
+
+import numpy as np
+import pytest
+
+from izhikevich.engine import Engine
+from izhikevich.recording import SpikeRecorder
+from izhikevich.synapses import Synapses, STPSynapses
+
+TIMESTEP = 0.1
+
+
+class CurrentProbe(object):
+	"""An input that keeps the total input current of every step, added after the synapses."""
+
+	def __init__(self):
+		self.currents = []
+
+	def add_current(self, engine, I):
+		self.currents.append(I.copy())
+
+
+@pytest.mark.parametrize('delays', [[TIMESTEP, 1.0, 7.3], [2.0, 2.0, 2.0]])
+def test_spikes_arrive_after_delay(delays):
+	# one presynaptic cell, spiking regularly, connected to three cells with the given delays
+	pre = Engine(1, {'i_offset': 15.0}, timestep=TIMESTEP)
+	spikes = pre.add_recorder(SpikeRecorder())
+	post = Engine(3, timestep=TIMESTEP)
+	weights = [1.0, 2.0, 3.0]
+	synapses = Synapses.from_connections(1, 3, [0, 0, 0], [0, 1, 2], weights, delays, TIMESTEP)
+	synapses.connect(pre, post)
+	probe = post.add_input(CurrentProbe())
+	for step in range(2000):
+		pre.run_steps(1)
+		post.run_steps(1)
+
+	spike_steps = np.rint(spikes.data()[1] / TIMESTEP).astype(int)
+	assert len(spike_steps) > 3
+	currents = np.array(probe.currents)
+	for j, delay in enumerate(delays):
+		# a spike during the step ending at step count k raises v at time k + delay:
+		# its current flows during the step that starts at k + delay - 1
+		expected = spike_steps - 1 + int(round(delay / TIMESTEP))
+		expected = expected[expected < len(currents)]
+		assert np.array_equal(np.flatnonzero(currents[:, j]), expected)
+		assert np.allclose(currents[expected, j] * TIMESTEP, weights[j])
+
+
+def tsodyks2_reference(spike_steps, U, tau_rec, tau_fac, timestep=TIMESTEP):
+	"""Efficacy (u x) of each spike, with x and u integrated exactly over every time step in between."""
+	x = 1.0  # resources available now
+	facilitation = 0.0  # u of the last spike, decayed since
+	efficacies = []
+	recover = np.exp(-timestep / tau_rec)
+	decay = np.exp(-timestep / tau_fac) if tau_fac > 0 else 0.0
+	for step in range(1, max(spike_steps) + 1):
+		x = 1.0 - (1.0 - x) * recover
+		facilitation *= decay
+		if step in spike_steps:
+			u = U + facilitation * (1.0 - U) if tau_fac > 0 else U
+			efficacies.append(u * x)
+			x -= u * x
+			facilitation = u
+	return np.array(efficacies)
+
+
+@pytest.mark.parametrize('U, tau_rec, tau_fac', [(0.5, 100.0, 0.0), (0.1, 50.0, 200.0)])
+def test_stp_efficacies_match_tsodyks2(U, tau_rec, tau_fac):
+	spike_steps = [100, 150, 170, 400, 410, 1200, 3000]
+	weights = [1.0, 2.5]
+	synapses = STPSynapses.from_connections(1, 2, [0, 0], [0, 1], weights, TIMESTEP, TIMESTEP,
+											U=U, tau_rec=tau_rec, tau_fac=tau_fac)
+	post = Engine(2, timestep=TIMESTEP)
+	post.add_input(synapses)
+	probe = post.add_input(CurrentProbe())
+	for step in range(1, max(spike_steps) + 2):
+		post.run_steps(1)
+		if step in spike_steps:
+			synapses.schedule(np.array([0]), step)
+
+	currents = np.array(probe.currents) * TIMESTEP
+	assert np.array_equal(np.flatnonzero(currents[:, 0]), spike_steps)
+	reference = tsodyks2_reference(spike_steps, U, tau_rec, tau_fac)
+	for j, weight in enumerate(weights):
+		assert np.allclose(currents[spike_steps, j], weight * reference, rtol=1e-5)
+	# depression (or facilitation) did happen
+	assert not np.allclose(reference, reference[0])
@@ -0,0 +1,26 @@
+"""Tests of the batched threshold search (threshold.py)."""
+
+import numpy as np
+
+from izhikevich.panels import get_panels
+from izhikevich.threshold import TOLERANCE, panel_parameters, pulse_threshold, rheobase
+
+
+def test_k_ary_search_matches_bisection():
+	parameters, initial_values = panel_parameters(get_panels(['I', 'A', 'K']))
+	k_ary = pulse_threshold(parameters, initial_values)
+	bisection = pulse_threshold(parameters, initial_values, k=1, max_rounds=40)
+	assert k_ary['bracketed'].all() and bisection['bracketed'].all()
+	assert np.allclose(k_ary['threshold'], bisection['threshold'], atol=2 * TOLERANCE)
+	# panel I: a 3 ms pulse of 6.71, as in izhikevich2004.py, is just above the threshold
+	assert abs(k_ary['threshold'][0] - 6.686) < 2 * TOLERANCE
+	# the amplitude just below the threshold does fail, at both ends of the search
+	assert (k_ary['below'] < k_ary['threshold']).all()
+	assert (k_ary['threshold'] - k_ary['below'] <= TOLERANCE).all()
+
+
+def test_unbracketed_thresholds_are_flagged():
+	# the cells of panels S and T (baseline i_offset 80) spike even at the lower end of the bracket
+	parameters, initial_values = panel_parameters(get_panels(['S', 'T']))
+	results = rheobase(parameters, initial_values)
+	assert not results['bracketed'].any()
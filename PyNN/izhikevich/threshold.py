@@ -0,0 +1,216 @@
+"""
+Batched search of the current thresholds of Izhikevich cells, for many
+parameter sets at once, instead of finding them by trial and error (as the
+i_offset of panel I was).
+
+	rheobase()		the smallest step of current after which each cell
+				spikes
+	pulse_threshold()	the smallest pulse of current of a given width after
+				which each cell spikes, and the latency of its first
+				spike at that amplitude (panel I)
+	bistability_threshold()	the smallest pulse after which each cell keeps
+				spiking, long after the pulse (panel P)
+	search()		the search they share, for any of these stimuli
+
+Each round of search() simulates `k` candidate amplitudes per parameter set,
+evenly spaced within its bracket, as one population, and narrows every
+bracket to the interval between the last candidate that fails and the first
+that succeeds: by a factor of k + 1 per round (k = 1 is bisection). The
+stretch before the stimulus is the same in every round: it is simulated once
+per parameter set, and its final state forked into the candidates (see
+engine.Engine.fork()). The response is assumed to switch only once within
+the bracket.
+
+	>>> parameters, initial_values = panel_parameters(get_panels())
+	>>> results = rheobase(parameters, initial_values)
+	>>> results['threshold'], results['latency']
+
+Run as a script, this module prints the three thresholds of every panel:
+
+	python -m izhikevich.threshold [--k K] [--tolerance I] [--timestep MS]
+"""
+
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+from izhikevich.engine import Engine
+from izhikevich.recording import SpikeStatisticsRecorder
+
+
+RESULT_DTYPE = [
+	('threshold', float),  # the first amplitude found to succeed, within `tolerance`
+	('below', float),  # the last one found to fail
+	('latency', float),  # of the first spike after the onset, at `threshold`
+	('bracketed', bool),  # False if the bracket given did not contain the threshold
+]
+
+ONSET = 20.0
+WINDOW = 100.0
+TOLERANCE = 0.001
+TIMESTEP = 0.01
+
+
+def panel_parameters(panels):
+	"""
+	Parameters and initial values of the cells of `panels` (see panels.py), as
+	dicts of arrays, with the exact model of figure1.m.
+	"""
+	parameters = dict((name, np.array([panel['generalized_parameters'][name] for panel in panels]))
+					  for name in panels[0]['generalized_parameters'])
+	initial_values = dict((name, np.array([panel['generalized_initial_values'][name] for panel in panels]))
+						  for name in ('v', 'u'))
+	return parameters, initial_values
+
+
+def _succeeds(statistics, criterion, onset, end, window, persistence):
+	if criterion == 'spike':
+		return statistics.count > 0
+	if criterion == 'persistent':
+		# spiking from the end of the stimulus to the end of the window
+		with np.errstate(invalid='ignore'):
+			return (statistics.first_spike <= end + persistence) & (statistics.last_spike >= onset + window - persistence)
+	raise ValueError("Unknown criterion '%s'" % criterion)
+
+
+def search(parameters, initial_values, bracket, width=None, criterion='spike', onset=ONSET, window=WINDOW,
+		   persistence=None, k=15, tolerance=TOLERANCE, max_rounds=20, timestep=TIMESTEP):
+	"""
+	Find, for each parameter set, the smallest amplitude of the stimulus for
+	which the cell succeeds. The stimulus takes i_offset from its baseline
+	(parameters['i_offset'], 0 by default) to the amplitude at `onset` ms, for
+	`width` ms or to the end. With criterion 'spike', a cell succeeds if it
+	spikes within `window` ms of the onset; with 'persistent', if it spikes
+	both within `persistence` ms of the end of the pulse and during the last
+	`persistence` ms of the window.
+
+	`bracket` is (first, last), scalars or one value per set: amplitudes go
+	from `first`, which should fail, to `last`, which should succeed, and may
+	decrease, e.g. for the inhibitory pulses of rebound spikes. Returns a
+	structured array of RESULT_DTYPE.
+	"""
+	parameters = dict((name, np.asarray(values, dtype=float)) for name, values in parameters.items())
+	size = len(parameters['a'])
+	baseline = np.broadcast_to(parameters.get('i_offset', 0.0), (size,))
+	first, last = [np.array(np.broadcast_to(np.asarray(value, dtype=float), (size,))) for value in bracket]
+	if persistence is None:
+		persistence = 0.25 * window
+
+	prefix = Engine(size, parameters, initial_values, timestep)
+	prefix.run_until(onset)
+
+	results = np.zeros(size, dtype=RESULT_DTYPE)
+	results['threshold'] = np.nan
+	results['below'] = np.nan
+	results['latency'] = np.nan
+	# the first round tries both ends of the bracket, the following ones only points between them
+	fractions = np.linspace(0.0, 1.0, max(k, 2))
+	active = np.arange(size)
+	for iteration in range(max_rounds):
+		n = len(active)
+		amplitudes = first[active, np.newaxis] + (last - first)[active, np.newaxis] * fractions
+		engine = prefix.fork(np.repeat(active, len(fractions)))
+		statistics = engine.add_recorder(SpikeStatisticsRecorder(engine.size))
+		engine.set(i_offset=amplitudes.reshape(-1))
+		if width is not None:
+			engine.run_until(onset + width)
+			engine.set(i_offset=np.repeat(baseline[active], len(fractions)))
+		engine.run_until(onset + window)
+
+		end = onset + (window if width is None else width)
+		succeeded = _succeeds(statistics, criterion, onset, end, window, persistence).reshape(n, -1)
+		latency = (statistics.first_spike - onset).reshape(n, -1)
+		any_success = succeeded.any(axis=1)
+		j = np.argmax(succeeded, axis=1)
+		rows = np.arange(n)
+		if iteration == 0:
+			# not bracketed: the last end fails, or the first one already succeeds
+			bracketed = any_success & (j > 0)
+			results['bracketed'][active] = bracketed
+			results['threshold'][active[any_success & (j == 0)]] = first[active[any_success & (j == 0)]]
+			results['latency'][active[any_success & (j == 0)]] = latency[any_success & (j == 0), 0]
+		else:
+			# `last` is known to succeed
+			bracketed = np.ones(n, dtype=bool)
+			j = np.where(any_success, j, len(fractions))
+		upper = np.where(j < len(fractions), amplitudes[rows, np.minimum(j, len(fractions) - 1)], last[active])
+		lower = np.where(j > 0, amplitudes[rows, np.maximum(j - 1, 0)], first[active])
+		found = j < len(fractions)
+		results['latency'][active[bracketed & found]] = latency[rows, np.minimum(j, len(fractions) - 1)][bracketed & found]
+		first[active] = lower
+		last[active] = upper
+		results['threshold'][active[bracketed]] = upper[bracketed]
+		results['below'][active[bracketed]] = lower[bracketed]
+
+		active = active[bracketed & (np.abs(upper - lower) > tolerance)]
+		if not active.size:
+			break
+		fractions = np.arange(1, k + 1) / (k + 1.0)
+	return results
+
+
+def rheobase(parameters, initial_values, bracket=(0.0, 100.0), **options):
+	"""The smallest step of current after which each cell spikes (see search())."""
+	return search(parameters, initial_values, bracket, **options)
+
+
+def pulse_threshold(parameters, initial_values, width=3.0, bracket=(0.0, 100.0), **options):
+	"""
+	The smallest pulse of current of `width` ms after which each cell spikes,
+	and the latency of the spike, as for panel I (see search()).
+	"""
+	return search(parameters, initial_values, bracket, width=width, **options)
+
+
+def bistability_threshold(parameters, initial_values, width=5.0, bracket=None, window=150.0, **options):
+	"""
+	The smallest pulse of current of `width` ms after which each cell starts
+	spiking and is still spiking at the end of `window` ms, i.e. switches to
+	its spiking state, as for panel P (see search()). The amplitudes are those
+	of i_offset during the pulse, its baseline included, and by default go from
+	the baseline to 10 above it.
+	"""
+	if bracket is None:
+		baseline = np.asarray(parameters.get('i_offset', 0.0), dtype=float)
+		bracket = (baseline, baseline + 10.0)
+	return search(parameters, initial_values, bracket, width=width, criterion='persistent', window=window,
+				  **options)
+
+
+def _format(results, i, field, format="%.3f"):
+	"""A field of one result, or n/a if the bracket did not contain the threshold."""
+	if not results['bracketed'][i]:
+		return "n/a"
+	return format % results[field][i]
+
+
+def main(argv=None):
+	from izhikevich.panels import get_panels
+
+	parser = argparse.ArgumentParser(description="Current thresholds of the cells of the panels of Fig. 1")
+	parser.add_argument("--k", type=int, default=15, help="candidate amplitudes per cell and round")
+	parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+	parser.add_argument("--timestep", type=float, default=TIMESTEP)
+	args = parser.parse_args(argv)
+
+	panels = get_panels()
+	parameters, initial_values = panel_parameters(panels)
+	options = dict(k=args.k, tolerance=args.tolerance, timestep=args.timestep)
+	start = default_timer()
+	results = [
+		rheobase(parameters, initial_values, **options),
+		pulse_threshold(parameters, initial_values, **options),
+		bistability_threshold(parameters, initial_values, **options),
+	]
+	wall = default_timer() - start
+	print("panel   rheobase   3 ms pulse  (latency)   bistability (5 ms pulse)")
+	for i, panel in enumerate(panels):
+		print("%-5s %10s %12s %12s %12s" % (
+			panel['label'], _format(results[0], i, 'threshold'), _format(results[1], i, 'threshold'),
+			_format(results[1], i, 'latency', "%.2f ms"), _format(results[2], i, 'threshold')))
+	print("%d cells, %.1f s; n/a: not within the bracket searched" % (len(panels), wall))
+
+
+if __name__ == '__main__':
+	main()
@@ -22,15 +22,49 @@ Original implementation references:
 #############################################
 
 
+import os
+import sys
+
 from pyNN.random import RandomDistribution, NumpyRNG
 from pyNN.utility import get_script_args, Timer, ProgressBar, init_logging, normalized_filename
 import matplotlib.pyplot as plt
 import numpy as np
 
+from izhikevich import backend_module, get_simulator
+from izhikevich.sources import ramp_current_source
+from izhikevich.decimate import decimate
+from izhikevich.plotting import axes_pixel_width, use_offscreen_backend, save_figure, FIGURE_SIZE
+from izhikevich.profiling import Profiler, instrument
+
+
+# neuron, nest, brian, ..., or numpy for the native NumPy engine in izhikevich/numpysim.py
+simulator_name = sys.argv[1]
+
+# Optionally, a .png or .svg file: the figure is then drawn off-screen, once at
+# the end, and saved to it instead of being shown and redrawn after each sub-plot
+output_file = sys.argv[2] if len(sys.argv) > 2 else None
+
+if output_file:
+	use_offscreen_backend()
+	plt.figure(1, facecolor='white', figsize=FIGURE_SIZE)
+
+
+def show_panel(fig):
+	if not output_file:
+		plt.ion()
+		plt.show(block=False)
+		fig.canvas.draw()
 
-simulator_name = get_script_args(1)[0]  
+exec("from %s import *" % backend_module(simulator_name))
+sim = get_simulator(simulator_name)
 
-exec("from pyNN.%s import *" % simulator_name)
+# Set IZHIKEVICH_PROFILE to a file name prefix to record the wall and CPU time and
+# the memory used by each phase (setup, build, run, get_data, plotting) of each
+# sub-plot in <prefix>.json, <prefix>.csv and <prefix>.folded
+profile_prefix = os.environ.get('IZHIKEVICH_PROFILE')
+if profile_prefix:
+	profiler = Profiler()
+	restore_simulator = instrument(globals(), sim, profiler, labels="ABCDEFGHIJKLMNOPQRST")
 
 print("\n")
 print "Starting PyNN with simulator: %s"%simulator_name
@@ -100,7 +134,6 @@ run(90)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 1)
 ax1.get_xaxis().set_visible(False)
@@ -113,10 +146,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(A) Tonic spiking')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 10, 10, 100],[-90, -90,-80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 10, 10, 100],[-90, -90,-80, -80]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -159,7 +192,6 @@ run(180)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 2)
 ax1.get_xaxis().set_visible(False)
@@ -172,10 +204,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(B) Phasic spiking')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 20, 20, 200],[-90, -90,-80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 20, 20, 200],[-90, -90,-80, -80]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 #############################################
@@ -218,7 +250,6 @@ run(198)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 3)
 ax1.get_xaxis().set_visible(False)
@@ -231,10 +262,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(C) Tonic bursting')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 22, 22, 220],[-90, -90,-80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 22, 22, 220],[-90, -90,-80, -80]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 #############################################
@@ -276,7 +307,6 @@ run(180)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 4)
 ax1.get_xaxis().set_visible(False)
@@ -289,10 +319,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(D) Phasic bursting')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 20, 20, 200],[-90, -90,-80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 20, 20, 200],[-90, -90,-80, -80]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 #############################################
@@ -335,7 +365,6 @@ run(160 - 16)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 
 ax1 = fig.add_subplot(5, 4, 5)
@@ -349,10 +378,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(E) Mixed mode')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 16, 16, 160],[-90, -90,-80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 16, 16, 160],[-90, -90,-80, -80]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 #######################################################
@@ -394,7 +423,6 @@ run(85 - 8.5)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 6)
 ax1.get_xaxis().set_visible(False)
@@ -407,10 +435,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(F) SFA')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 8.5, 8.5, 85],[-90, -90,-80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 8.5, 8.5, 85],[-90, -90,-80, -80]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 ############################################
@@ -451,35 +479,29 @@ neuronParameters = 	{
 initialValues = {'u': u_init, 'v': v_init}
 
 cell_type = Izhikevich(**neuronParameters)
+
+if hasattr(sim, 'GeneralizedIzhikevich'):
+	# exact model and parameters of figure1.m (see the note above)
+	b = -0.1
+	c = -55.0
+	v_init = -60.0
+	neuronParameters.update(b=b, c=c, X=0.04, Y=4.1, Z=108.0)
+	initialValues = {'u': b * v_init, 'v': v_init}
+	cell_type = sim.GeneralizedIzhikevich(**neuronParameters)
+
 neuron = create(cell_type)
 neuron.initialize(**initialValues)
 
 neuron.record('v')
 
-totalTimes = np.zeros(0)
-totalAmps = np.zeros(0)
-
-times = np.linspace(0.0, 30.0, int(1 + (30.0 - 0.0) / timeStep))
-amps = np.linspace(0.0, 0.0, int(1 + (30.0 - 0.0) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-injectedCurrent = StepCurrentSource(times=times, amplitudes=amps)
-injectedCurrent.inject_into(neuron)
-
-times = np.linspace(30 + timeStep, 300, int((300 - 30) / timeStep))
-amps = np.linspace(0.075 * timeStep, 0.075 * (300 - 30), int((300 - 30) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-injectedCurrent = StepCurrentSource(times=times, amplitudes=amps)
+injectedCurrent = ramp_current_source(sim, delay=30.0, duration=270.0,
+				start_amplitude=0.0, finish_amplitude=0.075 * (300 - 30))
 injectedCurrent.inject_into(neuron)
 
 run(300)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 7)
 ax1.get_xaxis().set_visible(False)
@@ -495,10 +517,10 @@ plt.ylim((-95.0, 30.0))
 ax1.set_title('(G) Class 1 excitable')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 30, 300, 300],[-90, -90, -70, -90])
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 30, 300, 300],[-90, -90, -70, -90])
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -537,20 +559,9 @@ neuron.initialize(**initialValues)
 neuron.record('v')
 
 
-totalTimes = np.zeros(0)
-totalAmps = np.zeros(0)
-
-times = np.linspace(0.0, 30.0, int(1 + (30.0 - 0.0) / timeStep))
-amps = np.linspace(-0.5, -0.5, int(1 + (30.0 - 0.0) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-times = np.linspace(30 + timeStep, 300, int((300 - 30) / timeStep))
-amps = np.linspace(-0.5 + 0.015 * timeStep, -0.5 + 0.015 * (300 - 30), int((300 - 30) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-injectedCurrent = StepCurrentSource(times=totalTimes, amplitudes=totalAmps)
+injectedCurrent = ramp_current_source(sim, delay=30.0, duration=270.0,
+				start_amplitude=-0.5, finish_amplitude=-0.5 + 0.015 * (300 - 30),
+				baseline_amplitude=-0.5)
 injectedCurrent.inject_into(neuron)
 
 
@@ -558,7 +569,6 @@ run(300)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 8)
 ax1.get_xaxis().set_visible(False)
@@ -574,10 +584,10 @@ plt.ylim((-95.0, 30.0))
 ax1.set_title('(H) Class 2 excitable')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 30, 300, 300],[-90, -90,-70, -90]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 30, 300, 300],[-90, -90,-70, -90]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 #########################################
@@ -633,7 +643,6 @@ run(100 - 13)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 9)
 ax1.get_xaxis().set_visible(False)
@@ -646,10 +655,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(I) Spike latency')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 10, 10, 13, 13, 100],[-90, -90, -80, -80, -90, -90]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 10, 10, 13, 13, 100],[-90, -90, -80, -80, -90, -90]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -705,7 +714,6 @@ run(200 - 25)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 10)
 ax1.get_xaxis().set_visible(False)
@@ -718,10 +726,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(J) Subthreshold oscillation')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 20, 20, 25, 25, 200],[-90, -90, -80, -80, -90, -90]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 20, 20, 25, 25, 200],[-90, -90, -80, -80, -90, -90]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -823,7 +831,6 @@ simulatedTime = simulatedTime + simTime
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 11)
 ax1.get_xaxis().set_visible(False)
@@ -836,10 +843,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(K) Resonator')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, T1, T1, (T1+8), (T1+8), T2, T2, (T2+8), (T2+8), T3, T3, (T3+8), (T3+8), T4, T4, (T4+8), (T4+8), 400], [-90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, T1, T1, (T1+8), (T1+8), T2, T2, (T2+8), (T2+8), T3, T3, (T3+8), (T3+8), T4, T4, (T4+8), (T4+8), 400], [-90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 ####################################
@@ -889,6 +896,10 @@ initialValues = {'u': u_init, 'v': v_init}
 
 cell_type = Izhikevich(**neuronParameters)
 
+if hasattr(sim, 'GeneralizedIzhikevich'):
+	# exact model of figure1.m (see the note above)
+	cell_type = sim.GeneralizedIzhikevich(X=0.04, Y=4.1, Z=108.0, **neuronParameters)
+
 
 neuron = create(cell_type)
 
@@ -951,7 +962,6 @@ simulatedTime = simulatedTime + simTime
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 12)
 ax1.get_xaxis().set_visible(False)
@@ -964,10 +974,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(L) Integrator')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, T1, T1, (T1+2), (T1+2), T2, T2, (T2+2), (T2+2), T3, T3, (T3+2), (T3+2), T4, T4, (T4+2), (T4+2), 100], [-90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, T1, T1, (T1+2), (T1+2), T2, T2, (T2+2), (T2+2), T3, T3, (T3+2), (T3+2), T4, T4, (T4+2), (T4+2), 100], [-90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90, -80, -80, -90, -90]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -1022,7 +1032,6 @@ run(200 - 25)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 13)
 ax1.get_xaxis().set_visible(False)
@@ -1035,10 +1044,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(M) Rebound spike')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 20, 20, 25, 25, 200],[-85, -85, -90, -90, -85, -85]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 20, 20, 25, 25, 200],[-85, -85, -90, -90, -85, -85]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 ######################################
@@ -1092,7 +1101,6 @@ run(200 - 25)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 14)
 ax1.get_xaxis().set_visible(False)
@@ -1105,10 +1113,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(N) Rebound burst')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 20, 20, 25, 25, 200],[-85, -85, -90, -90, -85, -85]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 20, 20, 25, 25, 200],[-85, -85, -90, -90, -85, -85]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -1191,7 +1199,6 @@ run(simTime)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 15)
 ax1.get_xaxis().set_visible(False)
@@ -1204,10 +1211,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(O) Threshold variability')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 10, 10, 15, 15, 70, 70, 75, 75, 80, 80, 85, 85, 100],[-85, -85, -80 , -80 , -85 , -85, -90, -90, -85, -85, -80 , -80 , -85, -85]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 10, 10, 15, 15, 70, 70, 75, 75, 80, 80, 85, 85, 100],[-85, -85, -80 , -80 , -85 , -85, -90, -90, -85, -85, -80 , -80 , -85, -85]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 ######################################
@@ -1281,7 +1288,6 @@ simulatedTime = simulatedTime + simTime
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 16)
 ax1.get_xaxis().set_visible(False)
@@ -1294,10 +1300,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(P) Bistability')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 300.0/8, 300.0/8, (300.0/8 + 5), (300.0/8 + 5), 216, 216, 221, 221, 300],[-90, -90, -80, -80, -90, -90, -80, -80, -90, -90]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 300.0/8, 300.0/8, (300.0/8 + 5), (300.0/8 + 5), 216, 216, 221, 221, 300],[-90, -90, -80, -80, -90, -90, -80, -80, -90, -90]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -1354,7 +1360,6 @@ simulatedTime = simulatedTime + simTime
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 17)
 ax1.get_xaxis().set_visible(False)
@@ -1367,10 +1372,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(Q) DAP')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 9, 9, 11, 11, 50],[-90, -90, -80, -80, -90, -90]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 9, 9, 11, 11, 50],[-90, -90, -80, -80, -90, -90]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -1402,39 +1407,27 @@ neuronParameters = 	{
 initialValues = {'u': u_init, 'v': v_init}
 
 cell_type = Izhikevich(**neuronParameters)
+
+if hasattr(sim, 'AccommodationIzhikevich'):
+	# exact model of figure1.m, in which du/dt = a * b * (v + 65)
+	cell_type = sim.AccommodationIzhikevich(**neuronParameters)
 neuron = create(cell_type)
 neuron.initialize(**initialValues)
 
 neuron.record('v')
 
 
-totalTimes = np.zeros(0)
-totalAmps = np.zeros(0)
-
-times = np.linspace(0.0, 200.0, int(1 + (200.0 - 0.0) / timeStep))
-amps = np.linspace(0.0, 8.0, int(1 + (200.0 - 0.0) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-times = np.linspace(200 + timeStep, 300, int((300 - 200) / timeStep))
-amps = np.linspace(0.0, 0.0, int((300 - 200) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-times = np.linspace(300 + timeStep, 312.5, int((312.5 - 300) / timeStep))
-amps = np.linspace(0.0, 4.0, int((312.5 - 300) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-times = np.linspace(312.5 + timeStep, 400, int((400 - 312.5) / timeStep))
-amps = np.linspace(0.0, 0.0, int((400 - 312.5) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
+injectedCurrent = ramp_current_source(sim, delay=0.0, duration=200.0,
+				start_amplitude=0.0, finish_amplitude=8.0)
+injectedCurrent.inject_into(neuron)
 
-injectedCurrent = StepCurrentSource(times=totalTimes, amplitudes=totalAmps)
+injectedCurrent = ramp_current_source(sim, delay=300.0, duration=12.5,
+				start_amplitude=0.0, finish_amplitude=4.0)
 injectedCurrent.inject_into(neuron)
 
+totalTimes = [0, 200, 200, 300, 312.5, 312.5, 400]
+totalAmps = np.array([0, 8, 0, 0, 4, 0, 0])
+
 
 run(400.0)
 
@@ -1442,7 +1435,6 @@ run(400.0)
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 
 ax1 = fig.add_subplot(5, 4, 18)
@@ -1463,10 +1455,10 @@ plt.ylim((-95.0, 30.0))
 ax1.set_title('(R) Accomodation')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, totalTimes,1.5 * totalAmps - 90);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, totalTimes,1.5 * totalAmps - 90);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -1527,7 +1519,6 @@ simulatedTime = simulatedTime + simTime
 
 data = neuron.get_data().segments[0]
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 ax1 = fig.add_subplot(5, 4, 19)
 ax1.get_xaxis().set_visible(False)
@@ -1540,10 +1531,10 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(S) Inhibition-induced spiking')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 50, 50, 250, 250, 350],[-80, -80, -90, -90, -80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 50, 50, 250, 250, 350],[-80, -80, -90, -90, -80, -80]);
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -1610,7 +1601,6 @@ simulatedTime = simulatedTime + simTime
 data = neuron.get_data().segments[0]
 
 
-plt.ion()
 fig = plt.figure(1, facecolor='white')
 
 ax1 = fig.add_subplot(5, 4, 20)
@@ -1627,12 +1617,12 @@ ax1.spines['top'].set_color('None')
 ax1.set_title('(T) Inhibition-induced bursting')
 
 vm = data.filter(name='v')[0]
-plt.plot(vm.times, vm, [0, 50, 50, 250, 250, 350],[-80, -80, -90, -90, -80, -80]);
+times, vm = decimate(vm.times, vm, axes_pixel_width(ax1))
+plt.plot(times, vm, [0, 50, 50, 250, 250, 350],[-80, -80, -90, -90, -80, -80]);
 
 
 
-plt.show(block=False)
-fig.canvas.draw()
+show_panel(fig)
 
 
 
@@ -1640,7 +1630,18 @@ fig.canvas.draw()
 
 
 
-raw_input("Simulation finished... Press enter to exit...")
+if profile_prefix:
+	profiler.restart('figure', 'plotting')
+if output_file:
+	save_figure(fig, output_file)
+	print "Figure saved to %s" % output_file
+if profile_prefix:
+	profiler.finish()
+	restore_simulator()
+	profiler.write(profile_prefix)
+	print(profiler.summary())
+if not output_file:
+	raw_input("Simulation finished... Press enter to exit...")
 
 
 
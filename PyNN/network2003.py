@@ -0,0 +1,59 @@
+"""
+Simulates the 80/20 random network of Izhikevich (2003), "Simple Model of
+Spiking Neurons", at each of the given sizes, on the NumPy engine (see
+izhikevich/network.py), and reports the time steps and spikes simulated per
+second of wall-clock time.
+
+Usage:
+
+	python network2003.py [--sizes N ...] [--duration MS] [--fanout K] [--timestep MS]
+	                      [--seed S] [--output FILE] [--raster FILE]
+
+With --raster, the first size is also simulated once more, recording its
+spikes, and drawn as a raster plot into FILE, as in Fig. 3 of the paper.
+"""
+
+import argparse
+
+from izhikevich.benchmark import write_report
+from izhikevich.network import Network, benchmark_sizes, SIZES, DEFAULT_FANOUT, TIMESTEP
+
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), metavar="N",
+					help="numbers of cells (default: %s)" % " ".join(map(str, SIZES)))
+parser.add_argument("--duration", type=float, default=1000.0, help="simulated time (ms)")
+parser.add_argument("--fanout", type=int, default=DEFAULT_FANOUT, help="synapses per cell (default: %(default)s)")
+parser.add_argument("--timestep", type=float, default=TIMESTEP)
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--output", metavar="FILE", help="write the results to FILE as JSON")
+parser.add_argument("--raster", metavar="FILE", help="save a raster plot of the first size to FILE")
+args = parser.parse_args()
+
+
+def progress(record):
+	print("%9d cells  build %7.2f s  run %8.2f s  %9.1f steps/s  %12.0f spikes/s  %5.1f Hz  peak %6.0f MB" % (
+		record['size'], record['build'], record['wall'], record['steps_per_second'],
+		record['spikes_per_second'], record['rate'], record['peak_memory'] / 1024.0 ** 2))
+
+
+records = benchmark_sizes(args.sizes, args.duration, args.fanout, args.timestep, args.seed, progress)
+if args.output:
+	write_report({'results': records}, args.output)
+	print("Results written to %s" % args.output)
+
+if args.raster:
+	from izhikevich.plotting import use_offscreen_backend, save_figure
+	import matplotlib.pyplot as plt
+	use_offscreen_backend()
+	network = Network(args.sizes[0], args.fanout, args.timestep, args.seed, record_spikes=True)
+	network.run(args.duration)
+	cells, times = network.spikes.data()
+	fig = plt.figure(facecolor='white')
+	ax = fig.add_subplot(1, 1, 1)
+	ax.plot(times, cells, ',k')
+	ax.axhline(network.n_excitatory, color='r', linewidth=0.5)
+	ax.set_xlabel("time (ms)")
+	ax.set_ylabel("cell")
+	save_figure(fig, args.raster)
+	print("Raster plot saved to %s" % args.raster)
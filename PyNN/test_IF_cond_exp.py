@@ -2,10 +2,13 @@
 
 from pyNN.random import RandomDistribution, NumpyRNG
 from pyNN.neuron import *
+import pyNN.neuron as sim
 from pyNN.utility import get_script_args, Timer, ProgressBar, init_logging, normalized_filename
 import matplotlib.pyplot as plt
 import numpy as np
 
+from izhikevich.sources import ramp_current_source
+
 
 timeStep = 0.01
 
@@ -53,20 +56,8 @@ neuron.initialize(neuron=rand_distr)
 neuron.record('v')
 
 
-totalTimes = np.zeros(0)
-totalAmps = np.zeros(0)
-
-times = np.linspace(0.0, 30.0, int(1 + (30.0 - 0.0) / timeStep))
-amps = np.linspace(0.0, 0.0, int(1 + (30.0 - 0.0) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-times = np.linspace(30 + timeStep, 300, int((300 - 30) / timeStep))
-amps = np.linspace(0.005 * timeStep, 0.005 * (300 - 30), int((300 - 30) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-injectedCurrent = StepCurrentSource(times=totalTimes, amplitudes=totalAmps)
+injectedCurrent = ramp_current_source(sim, delay=30.0, duration=270.0,
+				start_amplitude=0.0, finish_amplitude=0.005 * (300 - 30))
 injectedCurrent.inject_into(neuron)
 
 
@@ -1,12 +1,22 @@
 
 
+import sys
+
 from pyNN.random import RandomDistribution, NumpyRNG
-#from pyNN.neuron import *
-from pyNN.nest import *
 from pyNN.utility import get_script_args, Timer, ProgressBar, init_logging, normalized_filename
 import matplotlib.pyplot as plt
 import numpy as np
 
+from izhikevich import backend_module, get_simulator
+from izhikevich.sources import ramp_current_source
+
+
+# nest by default; neuron, or numpy for the native NumPy engine, can be given on the command line
+simulator_name = sys.argv[1] if len(sys.argv) > 1 else "nest"
+
+exec("from %s import *" % backend_module(simulator_name))
+sim = get_simulator(simulator_name)
+
 
 globalTimeStep = 0.01
 
@@ -48,20 +58,8 @@ neuron.initialize(**initialValues)
 neuron.record('v')
 
 
-totalTimes = np.zeros(0)
-totalAmps = np.zeros(0)
-
-times = np.linspace(0.0, 30.0, int(1 + (30.0 - 0.0) / timeStep))
-amps = np.linspace(0.0, 0.0, int(1 + (30.0 - 0.0) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-times = np.linspace(30 + timeStep, 300, int((300 - 30) / timeStep))
-amps = np.linspace(0.075 * timeStep, 0.075 * (300 - 30), int((300 - 30) / timeStep))
-totalTimes = np.append(totalTimes, times)
-totalAmps = np.append(totalAmps, amps)
-
-injectedCurrent = StepCurrentSource(times=totalTimes, amplitudes=totalAmps)
+injectedCurrent = ramp_current_source(sim, delay=30.0, duration=270.0,
+				start_amplitude=0.0, finish_amplitude=0.075 * (300 - 30))
 injectedCurrent.inject_into(neuron)
 
 